@@ -1,8 +1,16 @@
+import argparse
+
+from src.daemon import SOCKET_PATH
 from src.dashboard import KerneuralDashboard
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kerneural dashboard")
+    parser.add_argument("--attach", nargs="?", const=SOCKET_PATH, default=None,
+                        help="read-only console for a running daemon (python -m src.daemon)")
+    args = parser.parse_args()
+
     try:
-        dashboard = KerneuralDashboard()
+        dashboard = KerneuralDashboard(attach=args.attach)
         dashboard.start()
     except KeyboardInterrupt:
         print("\nSystem stopped.")
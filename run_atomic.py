@@ -1,8 +1,10 @@
 import argparse
 import sys
 import time
-from src.red_agent.atomic_client import AtomicClient
+from src.red_agent.atomic_client import MIRROR_PATH, AtomicClient
+from src.red_agent.session import ShellSession
 from src.utils.docker_helper import DockerHelper
+from src.utils.timeline import COMMAND_LOG, TimelineWriter
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -12,9 +14,14 @@ console = Console()
 def main():
     parser = argparse.ArgumentParser(description="Run Atomic Red Team tests in Kerneural Victim")
     parser.add_argument("technique_id", help="MITRE ATT&CK Technique ID (e.g., T1059.004)")
+    parser.add_argument("--session", action="store_true",
+                        help="run tests and cleanup in one persistent shell instead of one exec each")
+    parser.add_argument("--mirror", default=MIRROR_PATH,
+                        help="Local atomic-red-team checkout, atomics/ directory or tarball")
+    parser.add_argument("--offline", action="store_true", help="Never fetch techniques from GitHub")
     args = parser.parse_args()
 
-    client = AtomicClient()
+    client = AtomicClient(mirror=args.mirror, online=not args.offline)
     console.print(f"[bold blue]Fetching Atomic Tests for {args.technique_id}...[/bold blue]")
     
     tests = client.fetch_technique(args.technique_id)
@@ -62,13 +69,36 @@ def main():
             console.print("[red]Invalid input.[/red]")
             sys.exit(1)
 
+    session = ShellSession("victim") if args.session else None
+    # Recorded for src/blue_agent/correlation.py (coverage / time-to-detect)
+    command_log = TimelineWriter(COMMAND_LOG)
+
+    def run(command, phase):
+        start = time.time()
+        if session is None:
+            code, output = DockerHelper.exec_command("victim", command)
+        else:
+            result = session.run(command)
+            code, output = result.exit_code, result.output
+        command_log.write({'technique': args.technique_id, 'target': "victim", 'phase': phase,
+                           'command': command, 'start': start, 'end': time.time(), 'exit_code': code})
+        return code, output
+
+    try:
+        run_tests(tests_to_run, run)
+    finally:
+        command_log.close()
+        if session is not None:
+            session.close()
+
+def run_tests(tests_to_run, run):
     for test in tests_to_run:
         console.print(f"\n[bold green]Running Test: {test['name']}[/bold green]")
         console.print(f"[dim]Command: {test['commands']}[/dim]")
         
         # Execute
         console.print("[bold cyan]Executing in 'victim' container...[/bold cyan]")
-        code, output = DockerHelper.exec_command("victim", test['commands'])
+        code, output = run(test['commands'], 'attack')
         
         if code == 0:
             console.print("[bold green]Execution Successful![/bold green]")
@@ -80,7 +110,7 @@ def main():
         # Cleanup
         if test['cleanup']:
             console.print("[italic]Running cleanup...[/italic]")
-            DockerHelper.exec_command("victim", test['cleanup'])
+            run(test['cleanup'], 'cleanup')
             
         time.sleep(1)
 
@@ -1,14 +1,22 @@
 from src.red_agent.attacker import RedAgent
+import argparse
 import time
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the built-in attack scenarios against the victim")
+    parser.add_argument("--session", action="store_true",
+                        help="run all commands in one persistent shell instead of one exec each")
+    args = parser.parse_args()
 
-    attacker = RedAgent(target_container="victim")
-    attacker.execute_attack("T1059.004")
-    time.sleep(2)
+    attacker = RedAgent(target_container="victim", session=args.session)
+    try:
+        attacker.execute_attack("T1059.004")
+        time.sleep(2)
 
-    attacker.execute_attack("T1555")
+        attacker.execute_attack("T1555")
+    finally:
+        attacker.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import json
+
+from rich.console import Console
+from rich.table import Table
+
+from src.benchmark.harness import run_benchmark
+from src.benchmark.replay import MODES
+
+console = Console()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a Falco event corpus through the Kerneural pipeline")
+    parser.add_argument("corpus", nargs="?", default="logs/falco_events.json.backup", help="JSONL corpus to replay")
+    parser.add_argument("--mode", choices=MODES, default="fixed", help="Replay pacing")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Events per second (fixed/bursty)")
+    parser.add_argument("--burst", type=int, default=100, help="Events per burst (bursty)")
+    parser.add_argument("--speed", type=float, default=60.0, help="Time compression factor (realtime)")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus N times")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent analysis workers")
+    parser.add_argument("--batch-size", type=int, default=1, help="Events per LLM request")
+    parser.add_argument("--brain-latency", type=float, default=0.5, help="Stand-in LLM latency (seconds)")
+    parser.add_argument("--deploy-latency", type=float, default=0.001, help="Stand-in add_rule latency (seconds)")
+    parser.add_argument("--reload-latency", type=float, default=0.0, help="Stand-in Falco reload latency (seconds)")
+    parser.add_argument("--dedup-window", type=float, default=30.0, help="Dedup window (0 disables)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    console.print(f"[bold blue]Replaying {args.corpus} ({args.mode})...[/bold blue]")
+    result = run_benchmark(
+        args.corpus, mode=args.mode, rate=args.rate, burst=args.burst, speed=args.speed,
+        repeat=args.repeat, workers=args.workers, batch_size=args.batch_size,
+        brain_latency=args.brain_latency, deploy_latency=args.deploy_latency,
+        reload_latency=args.reload_latency, dedup_window=args.dedup_window,
+    )
+
+    table = Table(title="Kerneural Replay Benchmark")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", justify="right")
+    table.add_row("Events written / read", f"{result['events_written']} / {result['events_read']}")
+    table.add_row("Ingest throughput", f"{result['ingest_eps']:.0f} ev/s")
+    for p in (50, 95, 99):
+        table.add_row(f"Read latency p{p}", f"{result['read_latency_ms'][p]:.2f} ms")
+    for p in (50, 95, 99):
+        table.add_row(f"Event -> rule p{p}", f"{result['rule_latency_ms'][p]:.1f} ms")
+    table.add_row("Rules deployed / LLM calls", f"{result['rules_deployed']} / {result['llm_calls']}")
+    for name, depth in result['queue_depth'].items():
+        table.add_row(f"Queue {name} (max / mean)", f"{depth['max']} / {depth['mean']:.1f}")
+    table.add_row("Dropped", ", ".join(f"{k}={v}" for k, v in result['dropped'].items()))
+    table.add_row("Total time", f"{result['total_seconds']:.2f} s")
+    table.add_row("Peak RSS", f"{result['peak_rss_mb']:.1f} MB")
+    console.print(table)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+
+from rich.console import Console
+from rich.table import Table
+
+from src.red_agent.campaign import Campaign, CampaignRunner
+from src.utils.docker_client import get_client
+
+console = Console()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a paced attack campaign across victim containers")
+    parser.add_argument("campaign", help="Campaign YAML (see campaigns/example.yaml)")
+    parser.add_argument("--rate", type=float, help="Override attacks per second")
+    parser.add_argument("--workers", type=int, help="Override the number of attacks in flight")
+    parser.add_argument("--session", action="store_true", help="Use persistent shells in the targets")
+    parser.add_argument("--timeline", help="Timeline JSONL path (default: logs/campaigns/<name>-<time>.jsonl)")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    campaign = Campaign.from_file(args.campaign)
+    if args.rate is not None:
+        campaign.rate = args.rate
+    if args.workers is not None:
+        campaign.workers = args.workers
+    if args.session:
+        campaign.session = True
+
+    # Techniques may override the campaign targets: check every container the schedule uses
+    targets = campaign.all_targets()
+    client = get_client()
+    missing = [t for t in targets if not client.container_running(t)]
+    if missing:
+        console.print(f"[bold red]Target containers not running: {', '.join(missing)}[/bold red]")
+        sys.exit(1)
+
+    attacks = sum(1 for _ in campaign.schedule())
+    console.print(f"[bold blue]Campaign {campaign.name}: {attacks} attacks on {len(targets)} targets, "
+                  f"rate {campaign.rate or 'unpaced'}/s, {campaign.workers} workers[/bold blue]")
+
+    runner = CampaignRunner(campaign, timeline_path=args.timeline)
+    result = runner.run()
+
+    table = Table(title=f"Campaign {campaign.name}")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", justify="right")
+    table.add_row("Attacks started", str(result['attacks']))
+    table.add_row("Commands (failed)", f"{result['commands']} ({result['failed']})")
+    table.add_row("Cleanup commands (failed)", f"{result['cleanup_commands']} ({result['cleanup_failed']})")
+    table.add_row("Rate target / achieved", f"{result['target_rate']:.2f} / {result['achieved_rate']:.2f} /s")
+    table.add_row("Start lag p50 / p95", f"{result['start_lag_p50'] * 1000:.0f} / {result['start_lag_p95'] * 1000:.0f} ms")
+    table.add_row("Total time", f"{result['elapsed_seconds']:.2f} s")
+    table.add_row("Timeline", result['timeline'])
+    if result['interrupted']:
+        table.add_row("Interrupted", "yes (cleanup ran)")
+    console.print(table)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Per-event decode cost: plain json.loads dicts vs FalcoEvent.
+
+For every line of a corpus we do what the hot path does: decode, read
+rule / priority / container.name, and build the prompt text. We also measure
+the memory retained when holding the decoded events (e.g. in a UI buffer).
+
+    python -m src.benchmark.decode logs/falco_events.json.backup --repeat 200
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from src.blue_agent.event import FalcoEvent
+
+
+def _dict_path(line):
+    event = json.loads(line)
+    event.get('rule')
+    event.get('priority')
+    event.get('output_fields', {}).get('container.name')
+    json.dumps(event)
+    return event
+
+
+def _event_path(line):
+    event = FalcoEvent.from_bytes(line)
+    event.rule
+    event.priority
+    event.container
+    event.json()
+    return event
+
+
+DECODERS = {'dict': _dict_path, 'FalcoEvent': _event_path}
+
+
+def _lines(path):
+    with open(path, 'rb') as f:
+        return [line.rstrip(b"\n") for line in f if line.strip()]
+
+
+def measure(lines, decode, repeat=100):
+    """Return (microseconds per event, retained bytes per event)."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            decode(line)
+    per_event = (time.perf_counter() - started) / (repeat * len(lines)) * 1e6
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [decode(line) for line in lines]
+    retained = (tracemalloc.get_traced_memory()[0] - before) / len(kept)
+    tracemalloc.stop()
+    return per_event, retained
+
+
+def run(path, repeat=100):
+    lines = _lines(path)
+    return {name: measure(lines, decode, repeat) for name, decode in DECODERS.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Falco event decode microbenchmark")
+    parser.add_argument("corpus", nargs="?", default="logs/falco_events.json.backup")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    for name, (per_event, retained) in run(args.corpus, args.repeat).items():
+        print(f"{name:<12} {per_event:8.2f} us/event   {retained:8.0f} bytes retained/event")
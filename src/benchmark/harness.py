@@ -0,0 +1,155 @@
+"""
+Replay benchmark for the detect -> analyze -> immunize loop.
+
+A recorded corpus is replayed into a temporary log file, the real
+KerneuralOrchestrator tails it (LogMonitor + AnalysisPipeline) with a
+StubBrain and StubRuleManager, and we measure:
+
+- ingest throughput (events/s read from the log)
+- write -> read latency for every event
+- write -> rule deployed latency for every analyzed event (p50/p95/p99)
+- per-stage queue depth (max / mean, sampled)
+- peak RSS of the process
+"""
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+
+from src.benchmark.replay import EventReplayer, load_corpus
+from src.benchmark.stubs import StubBrain, StubRuleManager
+from src.orchestrator import KerneuralOrchestrator
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class BenchOrchestrator(KerneuralOrchestrator):
+    """Orchestrator that timestamps each event when it is read and when its rule is deployed."""
+
+    def __init__(self, **kwargs):
+        super().__init__(verbose=False, metrics_port=None, deploy_log=None, archive_dir=None, **kwargs)
+        self.read_at = {}
+        self.deployed_at = {}
+        self.lock = threading.Lock()
+
+    def process_event(self, log_entry):
+        seq = log_entry.get('bench_seq')
+        if seq is not None:
+            self.read_at[seq] = time.time()
+        super().process_event(log_entry)
+
+    def on_deployed(self, log_entry, new_rule):
+        seq = log_entry.get('bench_seq')
+        if seq is not None:
+            with self.lock:
+                self.deployed_at[seq] = time.time()
+        super().on_deployed(log_entry, new_rule)
+
+
+class QueueSampler:
+    def __init__(self, pipeline, interval=0.05):
+        self.pipeline = pipeline
+        self.interval = interval
+        self.samples = {}
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="bench-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def _loop(self):
+        while self.running:
+            for name, stage in self.pipeline.stats().items():
+                if 'depth' in stage:
+                    self.samples.setdefault(name, []).append(stage['depth'])
+            time.sleep(self.interval)
+
+    def summary(self):
+        return {
+            name: {'max': max(values), 'mean': sum(values) / len(values)}
+            for name, values in self.samples.items() if values
+        }
+
+
+def run_benchmark(corpus_path, mode='fixed', rate=1000.0, burst=100, speed=1.0, repeat=1,
+                  workers=4, batch_size=1, brain_latency=0.5, brain_jitter=0.2,
+                  deploy_latency=0.001, reload_latency=0.0, dedup_window=30.0,
+                  drain_timeout=60.0):
+    events = load_corpus(corpus_path)
+    workdir = tempfile.mkdtemp(prefix="kerneural-bench-")
+    log_file = os.path.join(workdir, "falco_events.json")
+    open(log_file, 'w').close()
+
+    brain = StubBrain(latency=brain_latency, jitter=brain_jitter, seed=1)
+    deployer = StubRuleManager(add_latency=deploy_latency, reload_latency=reload_latency)
+    app = BenchOrchestrator(workers=workers, batch_size=batch_size, brain=brain,
+                            rule_manager=deployer, log_file=log_file)
+    if not dedup_window:
+        app.pipeline.deduplicator = None
+    elif app.pipeline.deduplicator is not None:
+        app.pipeline.deduplicator.window = dedup_window
+
+    runner = threading.Thread(target=app.start, name="bench-orchestrator", daemon=True)
+    runner.start()
+    # Wait for the tailer to open the file, otherwise early events are skipped
+    while app.monitor is None or not app.monitor.running:
+        time.sleep(0.01)
+
+    sampler = QueueSampler(app.pipeline)
+    sampler.start()
+    replayer = EventReplayer(events, log_file, mode=mode, rate=rate, burst=burst,
+                             speed=speed, repeat=repeat)
+    started = time.perf_counter()
+    replayer.run()
+
+    # Drain: everything read and every accepted event through the pipeline
+    deadline = time.perf_counter() + drain_timeout
+    while time.perf_counter() < deadline:
+        if len(app.read_at) >= replayer.written and app.pipeline.idle():
+            break
+        time.sleep(0.01)
+    total = time.perf_counter() - started
+
+    sampler.stop()
+    app.stop()
+    runner.join(5.0)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    read_latency = [app.read_at[s] - replayer.written_at[s] for s in app.read_at if s in replayer.written_at]
+    rule_latency = [app.deployed_at[s] - replayer.written_at[s] for s in app.deployed_at if s in replayer.written_at]
+    stats = app.pipeline.stats()
+
+    return {
+        'events_written': replayer.written,
+        'events_read': len(app.read_at),
+        'replay_seconds': replayer.elapsed,
+        'total_seconds': total,
+        'ingest_eps': len(app.read_at) / replayer.elapsed if replayer.elapsed else float(len(app.read_at)),
+        'read_latency_ms': {p: percentile(read_latency, p) * 1000 for p in (50, 95, 99)},
+        'rule_latency_ms': {p: percentile(rule_latency, p) * 1000 for p in (50, 95, 99)},
+        'rules_deployed': len(app.deployed_at),
+        'llm_calls': brain.calls,
+        'dropped': {name: stage['dropped'] for name, stage in stats.items() if 'dropped' in stage},
+        'queue_depth': sampler.summary(),
+        'peak_rss_mb': peak_rss_mb(),
+    }
@@ -0,0 +1,103 @@
+"""
+Prompt size before/after PromptEncoder on a recorded corpus.
+
+Offline it counts estimated tokens of the event text and of the whole
+RULE_GENERATION_PROMPT for the raw Falco line (what used to be sent) and
+for the encoded event. With --live N it also sends N events both ways to
+Gemini and reports the round trip latency and the token counts the API
+returns (needs GEMINI_API_KEY).
+
+    python -m src.benchmark.prompt logs/falco_events.json.backup --budget 2000
+    python -m src.benchmark.prompt logs/falco_events.json.backup --live 10
+"""
+import argparse
+import statistics
+import time
+
+from src.blue_agent.event import FalcoEvent
+from src.neural_core.encoder import DEFAULT_BUDGET, PromptEncoder, count_tokens
+from src.neural_core.prompts import RULE_GENERATION_PROMPT
+
+
+def load(corpus):
+    events = []
+    with open(corpus, 'rb') as f:
+        for line in f:
+            event = FalcoEvent.from_bytes(line.rstrip(b"\n")) if line.strip() else None
+            if event is not None:
+                events.append(event)
+    return events
+
+
+def measure(events, encoder):
+    raw = [event.json() for event in events]
+    started = time.perf_counter()
+    encoded = [encoder.encode(text) for text in raw]
+    elapsed = time.perf_counter() - started
+
+    before = [count_tokens(text) for text in raw]
+    after = [count_tokens(text) for text in encoded]
+    template = count_tokens(RULE_GENERATION_PROMPT.format(log_json=""))
+    return {
+        'events': len(events),
+        'event_tokens_before': sum(before),
+        'event_tokens_after': sum(after),
+        'prompt_tokens_before': sum(before) + template * len(events),
+        'prompt_tokens_after': sum(after) + template * len(events),
+        'max_event_tokens_after': max(after, default=0),
+        'encode_us': elapsed / len(events) * 1e6 if events else 0.0,
+    }
+
+
+def live(events, encoder, n):
+    """Send the first n events raw and encoded; latency and API token counts per variant."""
+    from src.neural_core.gemini_client import NeuralBrain
+    brain = NeuralBrain(use_cache=False, use_templates=False)
+    results = {'raw': [], 'encoded': []}
+    for event in events[:n]:
+        for variant, text in (('raw', event.json()), ('encoded', encoder.encode(event))):
+            prompt = RULE_GENERATION_PROMPT.format(log_json=text)
+            started = time.perf_counter()
+            try:
+                response = brain.model.generate_content(prompt)
+            except Exception as e:
+                print(f"Error generating rule: {e}")
+                continue
+            usage = getattr(response, 'usage_metadata', None)
+            results[variant].append((time.perf_counter() - started,
+                                     getattr(usage, 'prompt_token_count', 0),
+                                     getattr(usage, 'candidates_token_count', 0)))
+    return results
+
+
+def _report_live(results):
+    for variant, samples in results.items():
+        if not samples:
+            print(f"{variant:<8} no successful requests")
+            continue
+        latency = [s[0] for s in samples]
+        print(f"{variant:<8} {len(samples)} requests  p50 {statistics.median(latency):.2f}s  "
+              f"mean {statistics.mean(latency):.2f}s  "
+              f"input {statistics.mean(s[1] for s in samples):.0f} tok  "
+              f"output {statistics.mean(s[2] for s in samples):.0f} tok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prompt tokens before/after the compact encoder")
+    parser.add_argument("corpus", nargs="?", default="logs/falco_events.json.backup")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="token budget per request")
+    parser.add_argument("--live", type=int, default=0, metavar="N",
+                        help="also send N events raw and encoded to Gemini and compare latency")
+    args = parser.parse_args()
+
+    encoder = PromptEncoder(budget=args.budget)
+    events = load(args.corpus)
+    stats = measure(events, encoder)
+    n = max(stats['events'], 1)
+    saved = 1 - stats['event_tokens_after'] / max(stats['event_tokens_before'], 1)
+    print(f"{stats['events']} events, encoded in {stats['encode_us']:.1f} us/event")
+    print(f"event tokens   {stats['event_tokens_before'] / n:7.1f} -> {stats['event_tokens_after'] / n:7.1f} "
+          f"per event ({saved:.0%} fewer, max {stats['max_event_tokens_after']})")
+    print(f"prompt tokens  {stats['prompt_tokens_before'] / n:7.1f} -> {stats['prompt_tokens_after'] / n:7.1f} per request")
+    if args.live:
+        _report_live(live(events, encoder, args.live))
@@ -0,0 +1,101 @@
+import json
+import time
+
+MODES = ('fixed', 'bursty', 'realtime')
+
+
+def load_corpus(path):
+    """Read a JSONL corpus of Falco events. Bad lines are skipped."""
+    events = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def _evt_time(event):
+    value = (event.get('output_fields') or {}).get('evt.time')
+    return value / 1e9 if isinstance(value, (int, float)) else None
+
+
+class EventReplayer:
+    """
+    Appends a corpus to a log file the way Falco would, at a controlled rate.
+
+    - fixed:    `rate` events per second, evenly spaced
+    - bursty:   `burst` events written at once, then a pause so the average is `rate`
+    - realtime: spacing taken from output_fields["evt.time"], divided by `speed`
+
+    Each written event gets a "bench_seq" key; written_at[seq] is the wall clock
+    time it was flushed, so consumers can measure end-to-end latency.
+    """
+
+    def __init__(self, events, log_file, mode='fixed', rate=1000.0, burst=100,
+                 speed=1.0, repeat=1):
+        if mode not in MODES:
+            raise ValueError(f"Unknown replay mode '{mode}', expected one of {MODES}")
+        self.events = events
+        self.log_file = log_file
+        self.mode = mode
+        self.rate = rate
+        self.burst = burst
+        self.speed = speed
+        self.repeat = repeat
+        self.written_at = {}
+        self.written = 0
+        self.elapsed = 0.0
+
+    def _schedule(self):
+        """Yield (offset_seconds, [events]) groups to write."""
+        seq_events = [e for _ in range(self.repeat) for e in self.events]
+        if self.mode == 'fixed':
+            interval = 1.0 / self.rate if self.rate > 0 else 0.0
+            for i, event in enumerate(seq_events):
+                yield i * interval, [event]
+        elif self.mode == 'bursty':
+            pause = self.burst / self.rate if self.rate > 0 else 0.0
+            for n, start in enumerate(range(0, len(seq_events), self.burst)):
+                yield n * pause, seq_events[start:start + self.burst]
+        else:
+            base = None
+            offset = 0.0
+            previous = None
+            for event in seq_events:
+                t = _evt_time(event)
+                if t is not None:
+                    if base is None:
+                        base = t
+                    if previous is not None and t < previous:
+                        # Corpus wrapped around (repeat); keep going forward
+                        base -= previous - t
+                    offset = (t - base) / self.speed
+                    previous = t
+                yield offset, [event]
+
+    def run(self):
+        seq = 0
+        started = time.perf_counter()
+        with open(self.log_file, 'a') as f:
+            for offset, group in self._schedule():
+                delay = started + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                now = time.time()
+                lines = []
+                for event in group:
+                    event = dict(event)
+                    event['bench_seq'] = seq
+                    lines.append(json.dumps(event, separators=(',', ':')))
+                    seq += 1
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                for i in range(seq - len(group), seq):
+                    self.written_at[i] = now
+        self.written = seq
+        self.elapsed = time.perf_counter() - started
+        return self.written
@@ -0,0 +1,72 @@
+import random
+import threading
+import time
+
+
+class StubBrain:
+    """
+    Stand-in for NeuralBrain with configurable latency and no network.
+    latency is the mean seconds per request, jitter the +/- fraction around it.
+    """
+
+    def __init__(self, latency=1.0, jitter=0.2, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.events = 0
+        self.cache = None
+
+    def _sleep(self):
+        with self.lock:
+            factor = 1.0 + self.random.uniform(-self.jitter, self.jitter)
+            fail = self.random.random() < self.failure_rate
+        time.sleep(max(self.latency * factor, 0.0))
+        return fail
+
+    def _rule(self, n):
+        return (
+            f"- rule: Benchmark Rule {n}\n"
+            f"  desc: generated by StubBrain\n"
+            f"  condition: spawned_process and proc.name = \"bench{n}\"\n"
+            f"  output: \"bench user=%user.name command=%proc.cmdline\"\n"
+            f"  priority: WARNING\n"
+        )
+
+    def analyze_log_and_generate_rule(self, log_entry):
+        fail = self._sleep()
+        with self.lock:
+            self.calls += 1
+            self.events += 1
+            n = self.events
+        return None if fail else self._rule(n)
+
+    def analyze_logs_and_generate_rules(self, log_entries):
+        # One round trip for the whole batch
+        fail = self._sleep()
+        with self.lock:
+            self.calls += 1
+            first = self.events + 1
+            self.events += len(log_entries)
+        return [None if fail else self._rule(first + i) for i in range(len(log_entries))]
+
+
+class StubRuleManager:
+    """Stand-in rule deployer: sleeps instead of writing the rules file and reloading Falco."""
+
+    def __init__(self, add_latency=0.001, reload_latency=0.0):
+        self.add_latency = add_latency
+        self.reload_latency = reload_latency
+        self.added = 0
+        self.reloads = 0
+
+    def add_rule(self, rule_yaml):
+        time.sleep(self.add_latency)
+        self.added += 1
+        return True
+
+    def reload_falco(self):
+        time.sleep(self.reload_latency)
+        self.reloads += 1
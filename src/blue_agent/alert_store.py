@@ -0,0 +1,117 @@
+import time
+from collections import deque
+
+OTHER = "(other)"
+
+
+class AlertRecord:
+    """Only the fields the dashboard shows; no output string, no null ancestor fields."""
+    __slots__ = ('time', 'priority', 'rule', 'container')
+
+    def __init__(self, time, priority, rule, container):
+        self.time = time
+        self.priority = priority
+        self.rule = rule
+        self.container = container
+
+    @classmethod
+    def from_event(cls, event):
+        fields = event.get('output_fields') or {}
+        return cls(
+            event.get('time', 'N/A'),
+            event.get('priority', 'UNKNOWN'),
+            event.get('rule', 'Unknown Rule'),
+            fields.get('container.name') or 'N/A',
+        )
+
+
+class _BoundedCounter:
+    """Dict counter that folds new keys into OTHER once `max_keys` distinct keys exist."""
+    __slots__ = ('counts', 'max_keys')
+
+    def __init__(self, max_keys):
+        self.counts = {}
+        self.max_keys = max_keys
+
+    def add(self, key, n=1):
+        if key not in self.counts and len(self.counts) >= self.max_keys:
+            key = OTHER
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    def top(self, n=1):
+        return sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+
+class AlertStore:
+    """
+    Constant-memory alert history for the dashboard.
+
+    - recent alerts live in a fixed-size ring buffer (deque with maxlen)
+    - per-rule / per-priority / per-container counters are updated on add()
+    - the alert rate uses one bucket per second over `rate_window` seconds
+    All reads the TUI does are O(1) or O(capacity).
+    """
+
+    def __init__(self, capacity=100, rate_window=60, max_keys=256):
+        self.recent_alerts = deque(maxlen=capacity)
+        self.total = 0
+        self.by_rule = _BoundedCounter(max_keys)
+        self.by_priority = _BoundedCounter(max_keys)
+        self.by_container = _BoundedCounter(max_keys)
+
+        self.rate_window = rate_window
+        self.buckets = [0] * rate_window
+        self.bucket_second = [0] * rate_window
+
+    def add(self, event, now=None, count=True):
+        """
+        Record an alert. count=False only shows it in the feed, for history whose
+        totals were already restored from a summary snapshot.
+        """
+        record = event if isinstance(event, AlertRecord) else AlertRecord.from_event(event)
+        self.recent_alerts.append(record)
+        if not count:
+            return record
+        self.total += 1
+        self.by_rule.add(record.rule)
+        self.by_priority.add(record.priority)
+        self.by_container.add(record.container)
+
+        second = int(now if now is not None else time.time())
+        slot = second % self.rate_window
+        if self.bucket_second[slot] != second:
+            self.bucket_second[slot] = second
+            self.buckets[slot] = 0
+        self.buckets[slot] += 1
+        return record
+
+    def __len__(self):
+        return self.total
+
+    def recent(self, n=15):
+        """Newest first."""
+        n = min(n, len(self.recent_alerts))
+        return [self.recent_alerts[-1 - i] for i in range(n)]
+
+    def rate(self, now=None):
+        """Alerts per second over the last rate_window seconds."""
+        second = int(now if now is not None else time.time())
+        oldest = second - self.rate_window
+        count = sum(c for c, s in zip(self.buckets, self.bucket_second) if s > oldest)
+        return count / self.rate_window
+
+    def snapshot(self):
+        """Counters only, small enough to persist or send to another process."""
+        return {
+            'total': self.total,
+            'by_rule': dict(self.by_rule.counts),
+            'by_priority': dict(self.by_priority.counts),
+            'by_container': dict(self.by_container.counts),
+        }
+
+    def restore(self, snapshot):
+        """Load counters written by snapshot(). The feed and rate start empty."""
+        self.total = snapshot.get('total', 0)
+        self.by_rule.counts = dict(snapshot.get('by_rule') or {})
+        self.by_priority.counts = dict(snapshot.get('by_priority') or {})
+        self.by_container.counts = dict(snapshot.get('by_container') or {})
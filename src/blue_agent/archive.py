@@ -0,0 +1,468 @@
+"""
+Segmented, compressed archive of Falco events.
+
+The live log is rolled (renamed; Falco reopens the file for every write with
+keep_alive: false) and its lines are appended to gzip segments under
+logs/archive. The orchestrator / daemon tailer calls maybe_roll() after every
+batch, which rolls once the live log reaches `roll_bytes` (or, if
+`roll_seconds` is set, that long after the last roll); `python -m
+src.blue_agent.archive roll` does it by hand. Consoles only read it. Rolling
+on size only keeps recent history in the live log for backfill.
+
+Several processes may roll into one directory (the daemon and the CLI), so
+recover(), roll() and every segment append hold an exclusive flock on
+<archive>/.lock, and a rolled file is claimed by an atomic rename
+(incoming-* -> claimed-*) before it is ingested. A segment is a series of independent gzip members ("blocks")
+of up to `block_events` raw lines, so a query can seek to one block and
+decompress only that.
+
+Each segment has a sidecar .idx file, read through mmap:
+
+    header   <4sHIqq   magic, version, block count, min evt.time, max evt.time (ns)
+    blocks   <QIIqq    offset, compressed length, events, min evt.time, max evt.time
+    postings JSON      {"rules": {name: [block, ...]}, "tags": {...}, "containers": {...}}
+"""
+import argparse
+import contextlib
+import fcntl
+import gzip
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from src.blue_agent.backfill import event_timestamp
+
+ARCHIVE_DIR = "logs/archive"
+MAGIC = b"KNIX"
+VERSION = 1
+HEADER = struct.Struct("<4sHIqq")
+BLOCK = struct.Struct("<QIIqq")
+POSTING_KINDS = ("rules", "tags", "containers")
+LOCK_NAME = ".lock"
+
+
+def _event_ns(event):
+    value = (event.get('output_fields') or {}).get('evt.time')
+    if isinstance(value, int):
+        return value
+    ts = event_timestamp(event)
+    return int(ts * 1e9) if ts is not None else 0
+
+
+def _event_keys(event):
+    container = (event.get('output_fields') or {}).get('container.name')
+    return {
+        'rules': [event['rule']] if event.get('rule') else [],
+        'tags': list(event.get('tags') or []),
+        'containers': [container] if container else [],
+    }
+
+
+class SegmentIndex:
+    """Read-only view of a segment .idx file. The block table is decoded on demand from the mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.tmin, self.tmax = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f"{path}: not a segment index")
+        self._postings = None
+
+    def block(self, i):
+        """(offset, length, events, tmin, tmax) of block i."""
+        return BLOCK.unpack_from(self.map, HEADER.size + i * BLOCK.size)
+
+    @property
+    def postings(self):
+        if self._postings is None:
+            start = HEADER.size + self.count * BLOCK.size
+            self._postings = json.loads(self.map[start:].decode('utf-8') or '{}')
+        return self._postings
+
+    def blocks_for(self, kind, key):
+        return set(self.postings.get(kind, {}).get(key, ()))
+
+    def close(self):
+        self.map.close()
+
+
+class SegmentWriter:
+    """Appends blocks to one segment and keeps its index up to date."""
+
+    def __init__(self, path, block_events=256):
+        self.path = path
+        self.index_path = path[:-len(".jsonl.gz")] + ".idx"
+        self.block_events = block_events
+        self.blocks = []
+        self.postings = {kind: {} for kind in POSTING_KINDS}
+        self.pending = []
+
+        if os.path.exists(self.index_path):
+            index = SegmentIndex(self.index_path)
+            try:
+                self.blocks = [index.block(i) for i in range(index.count)]
+                for kind in POSTING_KINDS:
+                    self.postings[kind] = {k: list(v) for k, v in index.postings.get(kind, {}).items()}
+            finally:
+                index.close()
+
+    @property
+    def created(self):
+        """Creation time in unix seconds, encoded in the file name."""
+        name = os.path.basename(self.path)
+        return int(name[len("segment-"):-len(".jsonl.gz")]) / 1e9
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def add(self, line, event):
+        self.pending.append((line, event))
+        if len(self.pending) >= self.block_events:
+            self._write_block()
+
+    def _write_block(self):
+        if not self.pending:
+            return
+        data = gzip.compress(b"\n".join(line for line, _ in self.pending) + b"\n")
+        times = [_event_ns(event) for _, event in self.pending]
+        block_id = len(self.blocks)
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+        self.blocks.append((offset, len(data), len(self.pending), min(times), max(times)))
+        for _, event in self.pending:
+            for kind, keys in _event_keys(event).items():
+                for key in keys:
+                    ids = self.postings[kind].setdefault(key, [])
+                    if not ids or ids[-1] != block_id:
+                        ids.append(block_id)
+        self.pending = []
+
+    def flush(self):
+        """Write the pending block and atomically replace the index."""
+        self._write_block()
+        if not self.blocks:
+            return
+        header = HEADER.pack(MAGIC, VERSION, len(self.blocks),
+                             min(b[3] for b in self.blocks), max(b[4] for b in self.blocks))
+        body = b"".join(BLOCK.pack(*b) for b in self.blocks)
+        postings = json.dumps(self.postings, separators=(',', ':')).encode('utf-8')
+
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".segment.")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header + body + postings)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.index_path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+class EventArchive:
+    """
+    Rolls the live log into segments bounded by size and age, and answers
+    queries by time range, rule, container and tag.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, max_segment_bytes=32 << 20,
+                 max_segment_seconds=3600, block_events=256, roll_bytes=8 << 20,
+                 roll_seconds=None, roll_grace=1.0):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.block_events = block_events
+        self.roll_bytes = roll_bytes
+        self.roll_seconds = roll_seconds
+        # Falco opens the log per write (keep_alive: false); a write in flight during
+        # the rename still lands in the rolled file, so wait before reading it
+        self.roll_grace = roll_grace
+
+        # maybe_roll() archives on this thread so the tailer never waits on gzip
+        self.rolling = None
+        self.last_roll = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def segment_paths(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(".jsonl.gz"))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def _new_writer(self):
+        # Named by creation time so that listing order is archive order
+        name = f"segment-{time.time_ns():020d}.jsonl.gz"
+        return SegmentWriter(os.path.join(self.directory, name), self.block_events)
+
+    def _current_writer(self):
+        """Keep appending to the newest segment until it is too big or too old."""
+        paths = self.segment_paths()
+        if paths:
+            writer = SegmentWriter(paths[-1], self.block_events)
+            if (writer.size < self.max_segment_bytes
+                    and time.time() - writer.created < self.max_segment_seconds):
+                return writer
+        return self._new_writer()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Exclusive lock on the archive directory, across processes."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_NAME), 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def ingest(self, path):
+        """Append every event of a finished log file to the archive. Returns the number archived."""
+        with self._locked():
+            return self._append(path)
+
+    def _append(self, path):
+        """ingest() without taking the lock; the caller holds it."""
+        writer = None
+        count = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                line = line.rstrip(b"\n")
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                if not isinstance(event, dict):
+                    continue
+                if writer is None:
+                    writer = self._current_writer()
+                elif writer.size >= self.max_segment_bytes:
+                    writer.flush()
+                    writer = self._new_writer()
+                writer.add(line, event)
+                count += 1
+        if writer is not None:
+            writer.flush()
+        return count
+
+    def _claim(self, path):
+        """
+        Archive one incoming-* file; the caller holds the lock. The rename is the
+        claim: if another process got there first the file is gone and 0 is returned.
+        """
+        name = os.path.basename(path)
+        claimed = os.path.join(self.directory, "claimed-" + name[len("incoming-"):])
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return 0
+        count = self._append(claimed)
+        os.unlink(claimed)
+        return count
+
+    def _settle(self, log_file):
+        """Wait until Falco writes to the new live file, or roll_grace passes."""
+        deadline = time.monotonic() + self.roll_grace
+        while time.monotonic() < deadline:
+            try:
+                if os.path.getsize(log_file) > 0:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.05)
+
+    def roll(self, log_file, min_bytes=0):
+        """
+        Move the live log aside and archive it. Falco creates a fresh file on its
+        next write and LogMonitor follows the rotation. Returns events archived.
+        """
+        try:
+            if os.path.getsize(log_file) <= min_bytes:
+                return 0
+        except FileNotFoundError:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        rolled = os.path.join(self.directory, f"incoming-{time.time_ns()}.json")
+        os.rename(log_file, rolled)
+        # Leave the path in place for tailers and for Falco running as another user
+        open(log_file, 'a').close()
+        self._settle(log_file)
+        with self._locked():
+            return self._claim(rolled)
+
+    def maybe_roll(self, log_file, now=None):
+        """
+        Roll the live log from a tailer once it reaches roll_bytes, or once
+        roll_seconds (if set) passed since the last roll. Archiving runs on a
+        background thread; LogMonitor drains the renamed file before it
+        follows the new one. Returns True if a roll was started.
+        """
+        now = time.monotonic() if now is None else now
+        if self.rolling is not None and self.rolling.is_alive():
+            return False
+        try:
+            size = os.path.getsize(log_file)
+        except OSError:
+            return False
+        if size == 0:
+            return False
+        if size < self.roll_bytes and (self.roll_seconds is None or now - self.last_roll < self.roll_seconds):
+            return False
+        self.last_roll = now
+        self.rolling = threading.Thread(target=self._roll_in_background, args=(log_file,),
+                                        name="archive-roll", daemon=True)
+        self.rolling.start()
+        return True
+
+    def _roll_in_background(self, log_file):
+        try:
+            self.recover()
+            self.roll(log_file)
+        except Exception as e:
+            print(f"Archive roll failed: {e}")
+
+    def wait(self, timeout=None):
+        """Wait for a roll started by maybe_roll() to finish."""
+        if self.rolling is not None:
+            self.rolling.join(timeout)
+
+    def recover(self):
+        """Archive files left by a roll that was interrupted."""
+        count = 0
+        if not os.path.isdir(self.directory):
+            return count
+        with self._locked():
+            for name in sorted(os.listdir(self.directory)):
+                path = os.path.join(self.directory, name)
+                if name.startswith("incoming-"):
+                    if self._settling(name):
+                        # Just rolled by another process, still in its grace period
+                        continue
+                    count += self._claim(path)
+                elif name.startswith("claimed-"):
+                    # Claimed by a process that died while archiving it; we hold the lock now
+                    count += self._append(path)
+                    os.unlink(path)
+        return count
+
+    def _settling(self, name):
+        try:
+            rolled_at = int(name[len("incoming-"):-len(".json")]) / 1e9
+        except ValueError:
+            return False
+        return time.time() - rolled_at < self.roll_grace + 1.0
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def query(self, start=None, end=None, rule=None, container=None, tag=None, limit=None):
+        """
+        Yield archived events, oldest segment first. start / end are unix seconds.
+        Only blocks whose time range and postings match are decompressed.
+        """
+        start_ns = int(start * 1e9) if start is not None else None
+        end_ns = int(end * 1e9) if end is not None else None
+        filters = [(kind, key) for kind, key in (('rules', rule), ('containers', container), ('tags', tag))
+                   if key is not None]
+        # Lines hold the JSON-encoded name: quotes and backslashes escaped,
+        # non-ASCII either raw UTF-8 or \u escaped depending on the writer
+        needles = ()
+        if rule is not None:
+            needles = {json.dumps(rule).encode('utf-8'), json.dumps(rule, ensure_ascii=False).encode('utf-8')}
+        found = 0
+
+        for path in self.segment_paths():
+            index_path = path[:-len(".jsonl.gz")] + ".idx"
+            if not os.path.exists(index_path):
+                continue
+            index = SegmentIndex(index_path)
+            try:
+                if (start_ns is not None and index.tmax < start_ns) or (end_ns is not None and index.tmin > end_ns):
+                    continue
+                candidates = None
+                for kind, key in filters:
+                    ids = index.blocks_for(kind, key)
+                    candidates = ids if candidates is None else candidates & ids
+                block_ids = sorted(candidates) if candidates is not None else range(index.count)
+                blocks = [index.block(i) for i in block_ids]
+            finally:
+                index.close()
+
+            with open(path, 'rb') as f:
+                for offset, length, _, tmin, tmax in blocks:
+                    if (start_ns is not None and tmax < start_ns) or (end_ns is not None and tmin > end_ns):
+                        continue
+                    f.seek(offset)
+                    try:
+                        data = gzip.decompress(f.read(length))
+                    except (OSError, EOFError, zlib.error):
+                        # A damaged block costs its events, not the whole query
+                        continue
+                    for line in data.split(b"\n"):
+                        # Cheap byte test before paying for json.loads
+                        if not line or (needles and not any(needle in line for needle in needles)):
+                            continue
+                        event = json.loads(line)
+                        if not self._matches(event, start_ns, end_ns, rule, container, tag):
+                            continue
+                        yield event
+                        found += 1
+                        if limit is not None and found >= limit:
+                            return
+
+    @staticmethod
+    def _matches(event, start_ns, end_ns, rule, container, tag):
+        t = _event_ns(event)
+        if start_ns is not None and t < start_ns:
+            return False
+        if end_ns is not None and t > end_ns:
+            return False
+        if rule is not None and event.get('rule') != rule:
+            return False
+        if container is not None and (event.get('output_fields') or {}).get('container.name') != container:
+            return False
+        if tag is not None and tag not in (event.get('tags') or ()):
+            return False
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kerneural event archive")
+    parser.add_argument("--dir", default=ARCHIVE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    roll = sub.add_parser("roll", help="archive the live Falco log")
+    roll.add_argument("--log", default="logs/falco_events.json")
+    roll.add_argument("--min-bytes", type=int, default=0)
+    query = sub.add_parser("query", help="print archived events as JSON lines")
+    query.add_argument("--minutes", type=float, help="only the last N minutes")
+    query.add_argument("--rule")
+    query.add_argument("--container")
+    query.add_argument("--tag")
+    query.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    archive = EventArchive(args.dir)
+    if args.command == "roll":
+        archive.recover()
+        print(f"Archived {archive.roll(args.log, args.min_bytes)} events")
+    else:
+        start = time.time() - args.minutes * 60 if args.minutes else None
+        for event in archive.query(start=start, rule=args.rule, container=args.container,
+                                   tag=args.tag, limit=args.limit):
+            sys.stdout.write(json.dumps(event) + "\n")
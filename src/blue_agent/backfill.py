@@ -0,0 +1,211 @@
+"""
+Startup backfill: show recent history after a restart without replaying the log.
+
+- the tail of the log is read backwards in blocks, so the cost is proportional to
+  the number of events shown, not to the size of the file
+- totals come from a summary snapshot written periodically while running; only
+  the events written after the snapshot offset are counted again
+- nothing read here is ever submitted to the pipeline / LLM
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+SUMMARY_PATH = "logs/alert_summary.json"
+BLOCK_SIZE = 1 << 16
+# Give up recounting if the snapshot is this far behind the log
+MAX_RESCAN_BYTES = 64 << 20
+
+
+def event_timestamp(event):
+    """Event time as unix seconds, from evt.time (ns) or the ISO "time" field."""
+    value = (event.get('output_fields') or {}).get('evt.time')
+    if isinstance(value, (int, float)):
+        return value / 1e9
+    text = event.get('time')
+    if not isinstance(text, str):
+        return None
+    try:
+        clean = text.split('.')[0].replace('Z', '')
+        return datetime.strptime(clean, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _decode(line):
+    if not line.strip():
+        return None
+    try:
+        event = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return event if isinstance(event, dict) else None
+
+
+def complete_end(f, end, block_size=BLOCK_SIZE):
+    """Offset just after the last newline before `end` (a partial last line is left for the tailer)."""
+    pos = end
+    while pos > 0:
+        size = min(block_size, pos)
+        f.seek(pos - size)
+        data = f.read(size)
+        i = data.rfind(b"\n")
+        if i >= 0:
+            return pos - size + i + 1
+        pos -= size
+    return 0
+
+
+def read_backwards(f, end, block_size=BLOCK_SIZE):
+    """Yield (offset, line) for complete lines before `end`, newest first. `end` must be a line boundary."""
+    pos = end
+    tail = b""
+    while pos > 0:
+        size = min(block_size, pos)
+        pos -= size
+        f.seek(pos)
+        data = f.read(size) + tail
+        parts = data.split(b"\n")
+        cur = pos + len(data)
+        # parts[0] may continue in the previous block, keep it for the next round
+        for part in reversed(parts[1:]):
+            start = cur - len(part)
+            if part:
+                yield start, part
+            cur = start - 1
+        tail = parts[0]
+    if tail:
+        yield 0, tail
+
+
+def tail_events(path, max_events=200, since=None, end=None, block_size=BLOCK_SIZE):
+    """
+    Last `max_events` events and/or the events newer than `since` (unix seconds).
+    Returns ([(offset, event), ...] oldest first, end offset to resume tailing from).
+    """
+    entries = []
+    with open(path, 'rb') as f:
+        if end is None:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+        end = complete_end(f, end, block_size)
+        for offset, line in read_backwards(f, end, block_size):
+            if max_events is not None and len(entries) >= max_events:
+                break
+            event = _decode(line)
+            if event is None:
+                continue
+            if since is not None:
+                ts = event_timestamp(event)
+                if ts is not None and ts < since:
+                    break
+            entries.append((offset, event))
+    entries.reverse()
+    return entries, end
+
+
+def scan_forward(path, start, end, block_size=BLOCK_SIZE):
+    """Yield events whose lines start in [start, end)."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        buffer = b""
+        while remaining > 0:
+            data = f.read(min(block_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            lines = (buffer + data).split(b"\n")
+            buffer = lines.pop()
+            for line in lines:
+                event = _decode(line)
+                if event is not None:
+                    yield event
+        event = _decode(buffer)
+        if event is not None:
+            yield event
+
+
+class SummarySnapshot:
+    """Alert counters plus the log offset they cover, written atomically every `interval` seconds."""
+
+    def __init__(self, path=SUMMARY_PATH, interval=30.0):
+        self.path = path
+        self.interval = interval
+        self.last_save = 0.0
+
+    def load(self, log_file):
+        """Snapshot for this log file, or None if missing, unreadable or for another file."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            st = os.stat(log_file)
+        except (OSError, ValueError):
+            return None
+        log = data.get('log') or {}
+        if log.get('inode') != [st.st_dev, st.st_ino] or log.get('offset', 0) > st.st_size:
+            return None
+        return data
+
+    def save(self, store, log_file, offset):
+        try:
+            st = os.stat(log_file)
+        except OSError:
+            return False
+        data = {
+            'saved_at': time.time(),
+            'log': {'inode': [st.st_dev, st.st_ino], 'offset': offset},
+            'counters': store.snapshot(),
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".alert_summary.")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not write alert summary: {e}")
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return False
+        self.last_save = time.monotonic()
+        return True
+
+    def maybe_save(self, store, log_file, offset, now=None):
+        now = time.monotonic() if now is None else now
+        if now - self.last_save < self.interval:
+            return False
+        return self.save(store, log_file, offset)
+
+
+def backfill(store, log_file, snapshot=None, max_events=200, since=None):
+    """
+    Fill an AlertStore with recent history. Returns the offset the tailer should
+    resume from, or None if the log does not exist yet.
+    """
+    if not os.path.exists(log_file):
+        return None
+
+    entries, end = tail_events(log_file, max_events=max_events, since=since)
+    tail_start = entries[0][0] if entries else end
+
+    counted_from = None
+    data = snapshot.load(log_file) if snapshot is not None else None
+    if data is not None:
+        store.restore(data.get('counters') or {})
+        counted_from = data['log']['offset']
+        # Events between the snapshot and the shown tail still need counting
+        if counted_from < tail_start:
+            if tail_start - counted_from <= MAX_RESCAN_BYTES:
+                for event in scan_forward(log_file, counted_from, tail_start):
+                    store.add(event, now=event_timestamp(event))
+            else:
+                print(f"Alert summary is {tail_start - counted_from} bytes behind the log, totals are partial")
+
+    for offset, event in entries:
+        count = counted_from is None or offset >= counted_from
+        store.add(event, now=event_timestamp(event), count=count)
+    return end
@@ -0,0 +1,253 @@
+"""
+Parser for the subset of the Falco condition language our generated rules use.
+
+    expr    := and_expr ('or' and_expr)*
+    and     := not_expr ('and' not_expr)*
+    not     := 'not' not | primary
+    primary := '(' expr ')' | field op value | field 'in' '(' values ')' | field 'exists' | macro
+
+The AST is made of And / Or / Not / Pred / Macro nodes and can be formatted
+back into a condition string with format_condition().
+"""
+import re
+
+BINARY_OPS = ('=', '!=', '<', '<=', '>', '>=', 'contains', 'icontains', 'bcontains',
+              'startswith', 'bstartswith', 'endswith', 'glob', 'regex')
+LIST_OPS = ('in', 'intersects', 'pmatch')
+UNARY_OPS = ('exists',)
+KEYWORDS = {'and', 'or', 'not'}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op><=|>=|!=|=|<|>)
+      | (?P<paren>[(),])
+      | (?P<word>[^\s(),=<>!"']+(?:\[[^\]]*\])?)
+    )""", re.VERBOSE)
+
+
+class ConditionError(ValueError):
+    pass
+
+
+class And:
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = list(items)
+
+
+class Or:
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = list(items)
+
+
+class Not:
+    __slots__ = ('item',)
+
+    def __init__(self, item):
+        self.item = item
+
+
+class Pred:
+    """field <op> value. For list operators value is a tuple, for 'exists' it is None."""
+    __slots__ = ('field', 'op', 'value')
+
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value
+
+
+class Word(str):
+    """A bare operand (number, list or macro name, `host`, `<`); rendered without quotes."""
+    __slots__ = ()
+
+
+class String(str):
+    """An operand that was quoted in the source; rendered with quotes."""
+    __slots__ = ()
+
+
+class Macro:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ConditionError(f"Unexpected character at {pos}: {text[pos:pos + 20]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            tokens.append(('string', _unquote(value)))
+        else:
+            tokens.append((kind, value))
+        # Trailing whitespace is consumed by the next match
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def _unquote(value):
+    body = value[1:-1]
+    return re.sub(r"\\(.)", r"\1", body)
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def take(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def expect(self, kind, value=None):
+        tok = self.take()
+        if tok[0] != kind or (value is not None and tok[1] != value):
+            raise ConditionError(f"Expected {value or kind}, got {tok[1]!r}")
+        return tok
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ConditionError(f"Unexpected token {self.peek()[1]!r}")
+        return node
+
+    def parse_or(self):
+        items = [self.parse_and()]
+        while self.peek() == ('word', 'or'):
+            self.take()
+            items.append(self.parse_and())
+        return items[0] if len(items) == 1 else Or(items)
+
+    def parse_and(self):
+        items = [self.parse_not()]
+        while self.peek() == ('word', 'and'):
+            self.take()
+            items.append(self.parse_not())
+        return items[0] if len(items) == 1 else And(items)
+
+    def parse_not(self):
+        if self.peek() == ('word', 'not'):
+            self.take()
+            return Not(self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, value = self.take()
+        if kind == 'paren' and value == '(':
+            node = self.parse_or()
+            self.expect('paren', ')')
+            return node
+        if kind != 'word' or value in KEYWORDS:
+            raise ConditionError(f"Unexpected token {value!r}")
+
+        nxt_kind, nxt = self.peek()
+        if nxt_kind == 'op' or (nxt_kind == 'word' and nxt in BINARY_OPS):
+            self.take()
+            return Pred(value, nxt, self.parse_value())
+        if nxt_kind == 'word' and nxt in LIST_OPS:
+            self.take()
+            return Pred(value, nxt, self.parse_list())
+        if nxt_kind == 'word' and nxt in UNARY_OPS:
+            self.take()
+            return Pred(value, nxt, None)
+        return Macro(value)
+
+    def parse_value(self):
+        kind, value = self.take()
+        if kind == 'string':
+            return String(value)
+        if kind == 'word' or (kind == 'op' and value in ('<', '>')):
+            # `evt.dir = <` compares against a bare direction character
+            return Word(value)
+        raise ConditionError(f"Expected a value, got {value!r}")
+
+    def parse_list(self):
+        self.expect('paren', '(')
+        values = []
+        while True:
+            kind, value = self.peek()
+            if kind == 'paren' and value == ')':
+                self.take()
+                break
+            values.append(self.parse_value())
+            kind, value = self.peek()
+            if kind == 'paren' and value == ',':
+                self.take()
+        return tuple(values)
+
+
+def parse_condition(text):
+    if not text or not text.strip():
+        raise ConditionError("Empty condition")
+    return _Parser(tokenize(text)).parse()
+
+
+def _quoted(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def format_condition(node, parent=None, canonical=False):
+    """Render an AST back to a condition string. Parsed values keep their
+    quoting, so list and macro names inside `in (...)` stay references.
+    Values built in code are quoted unless they are numbers or keywords like
+    `host`. canonical=True quotes every value that way, for comparing conditions."""
+    if isinstance(node, Or):
+        text = " or ".join(format_condition(i, Or, canonical) for i in node.items)
+        return f"({text})" if parent in (And, Not) else text
+    if isinstance(node, And):
+        text = " and ".join(format_condition(i, And, canonical) for i in node.items)
+        return f"({text})" if parent is Not else text
+    if isinstance(node, Not):
+        return "not " + format_condition(node.item, Not, canonical)
+    if isinstance(node, Macro):
+        return node.name
+    if node.op in UNARY_OPS:
+        return f"{node.field} {node.op}"
+    if node.op in LIST_OPS:
+        return f"{node.field} {node.op} (" + ", ".join(_render(v, canonical) for v in node.value) + ")"
+    return f"{node.field} {node.op} {_render(node.value, canonical)}"
+
+
+def _render(value, canonical=False):
+    if not canonical:
+        if isinstance(value, Word):
+            return str(value)
+        if isinstance(value, String):
+            return _quoted(value)
+    if re.fullmatch(r"-?\d+", value) or value in ('host', 'true', 'false'):
+        return str(value)
+    return _quoted(value)
+
+
+def conjuncts(node):
+    """Top-level AND terms of a condition."""
+    return list(node.items) if isinstance(node, And) else [node]
+
+
+def walk(node):
+    """Yield every node in the tree (pre-order)."""
+    yield node
+    if isinstance(node, (And, Or)):
+        for item in node.items:
+            yield from walk(item)
+    elif isinstance(node, Not):
+        yield from walk(node.item)
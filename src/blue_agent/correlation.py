@@ -0,0 +1,394 @@
+"""
+Attack -> detection correlation.
+
+Joins what the red side ran (command records: RedAgent, run_atomic.py and
+campaign timelines, written by src/utils/timeline.py) with what Falco reported,
+and with the rules Kerneural deployed (DeploymentLog), to answer per
+technique: was it detected, how fast, and how fast was a rule live.
+
+A Falco event is attributed to a command when
+  - container.name is the command's target,
+  - evt.time falls in [start - slack, end + slack], and
+  - proc.cmdline matches the command on whole words: the event's argv is a
+    contiguous run of the command's words (or the command's words of the
+    event's, e.g. `sh -c <command>`), or the event has arguments and its
+    executable is a word of the command. A bare one-word event (`sh`, `id`)
+    only matches a command that is exactly that word. Events without
+    proc.cmdline are attributed only when a single command is running in
+    that container.
+
+Both sides are streams. Commands are kept per container sorted by start
+(an interval index: with the longest command duration D, candidates for time
+t are the commands with start in [t - D - slack, t + slack], found with
+bisect). Events that arrive before their command record are buffered for
+`lateness` seconds. Everything older than the watermark (newest evt.time
+minus lateness) is evicted, so memory stays flat over long campaigns.
+"""
+import argparse
+import bisect
+import collections
+import json
+import os
+import re
+import threading
+import time
+
+from src.blue_agent.event import FalcoEvent
+from src.utils.timeline import COMMAND_LOG
+
+DEPLOY_LOG = "logs/deployments.jsonl"
+
+# Shell words: quotes and operators (| ; & < > parentheses) separate them
+_WORD = re.compile(r"[^\s'\"|;&<>()`]+")
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+
+def distribution(values):
+    return {'count': len(values), 'p50': _percentile(values, 50),
+            'p95': _percentile(values, 95), 'max': max(values) if values else None}
+
+
+def _words(text):
+    """Shell words of a command line, with the executable reduced to its basename."""
+    words = _WORD.findall(text or "")
+    if words:
+        words[0] = words[0].rsplit("/", 1)[-1]
+    return tuple(words)
+
+
+def _cmdline_key(cmdline):
+    """Words of an event's command line, computed once per event."""
+    words = _words(cmdline)
+    return words or None
+
+
+def _runs_in(needle, haystack):
+    n = len(needle)
+    return any(haystack[i:i + n] == needle for i in range(len(haystack) - n + 1))
+
+
+def _score(words, basenames, key):
+    if key is None:
+        return 0
+    if len(key) == 1:
+        # Bare executable: too little to tell `sh` in `sh -c ...` from the session shell
+        return 2 if words == key else 0
+    if _runs_in(key, words) or (len(words) > 1 and _runs_in(words, key)):
+        return 2
+    if key[1] == '-c' and key[2:] == words:
+        return 2
+    return 1 if key[0] in basenames else 0
+
+
+def cmdline_score(command, cmdline):
+    """2: one argv is a run of the other's words, 1: the executable is a word of the command, 0: no match."""
+    words = _words(command)
+    return _score(words, frozenset(w.rsplit("/", 1)[-1] for w in words), _cmdline_key(cmdline))
+
+
+class DeploymentLog:
+    """JSONL record of every deployed rule and the Falco event that triggered it."""
+
+    def __init__(self, path=DEPLOY_LOG):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, event, now=None):
+        record = {
+            'time': time.time() if now is None else now,
+            'rule': event.get('rule'),
+            'container': (event.get('output_fields') or {}).get('container.name'),
+            'evt_time': (event.get('output_fields') or {}).get('evt.time'),
+        }
+        line = json.dumps(record, separators=(',', ':'))
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(line + "\n")
+
+
+class _Command:
+    __slots__ = ('technique', 'target', 'command', 'words', 'basenames', 'start', 'end', 'counted',
+                 'first_event', 'detected_at', 'keys', 'events')
+
+    def __init__(self, record):
+        self.technique = record.get('technique')
+        self.target = record.get('target')
+        self.command = " ".join((record.get('command') or "").split())
+        self.words = _words(self.command)
+        self.basenames = frozenset(w.rsplit("/", 1)[-1] for w in self.words)
+        self.start = float(record['start'])
+        self.end = float(record.get('end') or record['start'])
+        # Cleanup commands are indexed (their events must not be blamed on an
+        # attack) but do not count towards coverage
+        self.counted = record.get('phase', 'attack') == 'attack'
+        self.first_event = None
+        self.detected_at = None
+        self.keys = set()        # (falco rule, container) of matched events
+        self.events = 0
+
+    def attach(self, rule, evt_time, detected_at):
+        self.events += 1
+        self.keys.add((rule, self.target))
+        if self.first_event is None or evt_time < self.first_event:
+            self.first_event = evt_time
+        if self.detected_at is None or detected_at < self.detected_at:
+            self.detected_at = detected_at
+
+
+class _Lane:
+    """Commands and not-yet-matched events of one container, both sorted by time."""
+
+    def __init__(self):
+        self.starts = []
+        self.commands = []
+        self.max_duration = 0.0
+        self.event_times = []
+        self.events = []
+
+    def add_command(self, command):
+        i = bisect.bisect_right(self.starts, command.start)
+        self.starts.insert(i, command.start)
+        self.commands.insert(i, command)
+        self.max_duration = max(self.max_duration, command.end - command.start)
+
+    def candidates(self, t, slack):
+        lo = bisect.bisect_left(self.starts, t - self.max_duration - slack)
+        hi = bisect.bisect_right(self.starts, t + slack)
+        return [c for c in self.commands[lo:hi] if c.start - slack <= t <= c.end + slack]
+
+    def evict(self, watermark, slack):
+        keep = [i for i, c in enumerate(self.commands) if c.end + slack >= watermark]
+        if len(keep) != len(self.commands):
+            self.commands = [self.commands[i] for i in keep]
+            self.starts = [self.starts[i] for i in keep]
+            self.max_duration = max((c.end - c.start for c in self.commands), default=0.0)
+        i = bisect.bisect_left(self.event_times, watermark)
+        if i:
+            del self.event_times[:i]
+            del self.events[:i]
+
+
+class Correlator:
+    def __init__(self, slack=1.0, lateness=30.0, evict_every=1000):
+        self.slack = slack
+        self.lateness = lateness
+        self.evict_every = evict_every
+        self.lanes = collections.defaultdict(_Lane)
+        self.commands = []
+        self.deployments = collections.defaultdict(list)   # (rule, container) -> sorted deploy times
+        self.watermark = float('-inf')
+        self.newest = float('-inf')
+        self.events_seen = 0
+        self.events_matched = 0
+        self.rules = collections.defaultdict(collections.Counter)   # technique -> falco rule counts
+
+    # ------------------------------------------------------------------
+    # Inputs
+    # ------------------------------------------------------------------
+    def add_command(self, record):
+        command = _Command(record)
+        self.commands.append(command)
+        lane = self.lanes[command.target]
+        lane.add_command(command)
+        # Events that were read before this record was
+        lo = bisect.bisect_left(lane.event_times, command.start - self.slack)
+        hi = bisect.bisect_right(lane.event_times, command.end + self.slack)
+        taken = []
+        for i in range(lo, hi):
+            rule, key, evt_time, detected_at = lane.events[i]
+            if _score(command.words, command.basenames, key) > 0:
+                self._attach(command, rule, evt_time, detected_at)
+                taken.append(i)
+        for i in reversed(taken):
+            del lane.event_times[i]
+            del lane.events[i]
+        return command
+
+    def add_event(self, event, arrived=None):
+        """
+        Attribute one Falco event (FalcoEvent or dict). `arrived` is when
+        Kerneural read it (live use); offline, evt.time stands in for it.
+        Returns the matched command or None.
+        """
+        fields = event.get('output_fields') or {}
+        evt_time = fields.get('evt.time')
+        container = fields.get('container.name')
+        if not isinstance(evt_time, int) or not container:
+            return None
+        t = evt_time / 1e9
+        detected_at = t if arrived is None else arrived
+        key = _cmdline_key(fields.get('proc.cmdline'))
+        rule = event.get('rule')
+        self.events_seen += 1
+
+        match = self._best(self.lanes[container], t, key)
+        if match is not None:
+            self._attach(match, rule, t, detected_at)
+        else:
+            lane = self.lanes[container]
+            i = bisect.bisect_right(lane.event_times, t)
+            lane.event_times.insert(i, t)
+            lane.events.insert(i, (rule, key, t, detected_at))
+
+        if t > self.newest:
+            self.newest = t
+            self.watermark = t - self.lateness
+        if self.events_seen % self.evict_every == 0:
+            self.evict()
+        return match
+
+    def add_deployment(self, record):
+        key = (record.get('rule'), record.get('container'))
+        bisect.insort(self.deployments[key], float(record['time']))
+
+    def _best(self, lane, t, key):
+        candidates = lane.candidates(t, self.slack)
+        if not candidates:
+            return None
+        if key is None:
+            return candidates[0] if len(candidates) == 1 else None
+        best, best_score = None, 0
+        for command in candidates:
+            score = _score(command.words, command.basenames, key)
+            # Ties: the most recently started command
+            if score > best_score or (score == best_score and score and command.start >= best.start):
+                best, best_score = command, score
+        return best
+
+    def _attach(self, command, rule, evt_time, detected_at):
+        command.attach(rule, evt_time, detected_at)
+        self.events_matched += 1
+        if command.counted:
+            self.rules[command.technique][rule] += 1
+
+    def evict(self):
+        """Drop commands and buffered events older than the watermark from the index."""
+        for container in list(self.lanes):
+            lane = self.lanes[container]
+            lane.evict(self.watermark, self.slack)
+            if not lane.commands and not lane.events:
+                del self.lanes[container]
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+    def time_to_rule(self, command):
+        """Seconds from command start until a rule for one of its events was deployed, or None."""
+        best = None
+        for key in command.keys:
+            times = self.deployments.get(key)
+            if not times:
+                continue
+            i = bisect.bisect_left(times, command.first_event)
+            if i < len(times) and (best is None or times[i] < best):
+                best = times[i]
+        return None if best is None else best - command.start
+
+    def report(self):
+        per_technique = collections.OrderedDict()
+        for command in self.commands:
+            if not command.counted:
+                continue
+            entry = per_technique.setdefault(command.technique, {'commands': 0, 'detected': 0, 'ttd': [], 'ttr': []})
+            entry['commands'] += 1
+            if command.detected_at is None:
+                continue
+            entry['detected'] += 1
+            entry['ttd'].append(max(command.detected_at - command.start, 0.0))
+            ttr = self.time_to_rule(command)
+            if ttr is not None:
+                entry['ttr'].append(ttr)
+
+        techniques = {}
+        for technique, entry in per_technique.items():
+            techniques[technique] = {
+                'commands': entry['commands'],
+                'detected': entry['detected'],
+                'coverage': entry['detected'] / entry['commands'],
+                'time_to_detect': distribution(entry['ttd']),
+                'time_to_rule': distribution(entry['ttr']),
+                'rules': dict(self.rules[technique].most_common(5)),
+            }
+        counted = [c for c in self.commands if c.counted]
+        detected = sum(1 for c in counted if c.detected_at is not None)
+        return {
+            'commands': len(counted),
+            'detected': detected,
+            'coverage': detected / len(counted) if counted else 0.0,
+            'events': self.events_seen,
+            'events_matched': self.events_matched,
+            'techniques': techniques,
+        }
+
+
+def _read_jsonl(path):
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def correlate_files(command_paths, event_paths, deployment_paths=(), slack=1.0, lateness=30.0):
+    correlator = Correlator(slack=slack, lateness=lateness)
+    records = [r for path in command_paths for r in _read_jsonl(path) if 'start' in r]
+    for record in sorted(records, key=lambda r: r['start']):
+        correlator.add_command(record)
+    for path in deployment_paths:
+        if os.path.exists(path):
+            for record in _read_jsonl(path):
+                correlator.add_deployment(record)
+    for path in event_paths:
+        with open(path, 'rb') as f:
+            for line in f:
+                event = FalcoEvent.from_bytes(line)
+                if event is not None:
+                    correlator.add_event(event)
+    return correlator.report()
+
+
+if __name__ == "__main__":
+    from rich.console import Console
+    from rich.table import Table
+
+    parser = argparse.ArgumentParser(description="Per-technique detection coverage and latency")
+    parser.add_argument("--commands", nargs="+", default=[COMMAND_LOG],
+                        help="Command records (logs/commands.jsonl, campaign timelines)")
+    parser.add_argument("--events", nargs="+", default=["logs/falco_events.json"], help="Falco JSON logs")
+    parser.add_argument("--deployments", nargs="*", default=[DEPLOY_LOG])
+    parser.add_argument("--slack", type=float, default=1.0, help="Seconds around a command an event may fall")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = correlate_files(args.commands, args.events, args.deployments, slack=args.slack)
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.2f}s"
+
+    table = Table(title=f"Detection coverage: {report['detected']}/{report['commands']} commands "
+                        f"({report['coverage']:.0%})")
+    table.add_column("Technique", style="cyan")
+    table.add_column("Detected", justify="right")
+    table.add_column("TTD p50 / p95", justify="right")
+    table.add_column("TTR p50 / p95", justify="right")
+    table.add_column("Falco rules")
+    for technique, entry in report['techniques'].items():
+        ttd, ttr = entry['time_to_detect'], entry['time_to_rule']
+        table.add_row(str(technique), f"{entry['detected']}/{entry['commands']} ({entry['coverage']:.0%})",
+                      f"{fmt(ttd['p50'])} / {fmt(ttd['p95'])}", f"{fmt(ttr['p50'])} / {fmt(ttr['p95'])}",
+                      ", ".join(entry['rules']) or "-")
+    Console().print(table)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,107 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Fields from output_fields that identify "the same attack"
+SIGNATURE_FIELDS = ('proc.cmdline', 'proc.exepath', 'fd.name', 'container.name')
+
+_WHITESPACE = re.compile(r"\s+")
+_PROC_PID = re.compile(r"/proc/\d+")
+
+
+def _normalize(value):
+    if value is None:
+        return ""
+    text = _WHITESPACE.sub(" ", str(value)).strip()
+    return _PROC_PID.sub("/proc/<pid>", text)
+
+
+def event_signature(event):
+    """
+    Normalized fingerprint of a Falco event: rule + key output_fields + tags.
+    Two events with the same signature would produce the same generated rule.
+    """
+    fields = event.get('output_fields') or {}
+    parts = [_normalize(event.get('rule'))]
+    parts.extend(f"{name}={_normalize(fields.get(name))}" for name in SIGNATURE_FIELDS)
+    parts.append(",".join(sorted(event.get('tags') or [])))
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ('first_seen', 'last_seen', 'hits')
+
+    def __init__(self, now):
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+
+
+class EventDeduplicator:
+    """
+    Collapses repeats of the same signature within `window` seconds.
+
+    The index is an OrderedDict in first-seen order, so expiry only ever looks
+    at the front, and it never holds more than `max_entries` signatures:
+    memory stays flat no matter how long a storm lasts.
+    """
+
+    def __init__(self, window=30.0, max_entries=10000):
+        self.window = window
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.unique = 0
+        self.suppressed = 0
+        self.evicted = 0
+
+    def _expire(self, now):
+        while self.entries:
+            signature, entry = next(iter(self.entries.items()))
+            if now - entry.first_seen < self.window:
+                break
+            self.entries.popitem(last=False)
+
+    def check(self, event, signature=None, now=None):
+        """
+        Record an event. Returns (signature, is_duplicate).
+        The first event of a window is not a duplicate and should be analyzed.
+        """
+        if signature is None:
+            signature = event_signature(event)
+        if now is None:
+            now = time.monotonic()
+
+        with self.lock:
+            self._expire(now)
+            entry = self.entries.get(signature)
+            if entry is not None:
+                entry.hits += 1
+                entry.last_seen = now
+                self.suppressed += 1
+                return signature, True
+
+            self.entries[signature] = _Entry(now)
+            self.unique += 1
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evicted += 1
+            return signature, False
+
+    def hits(self, signature):
+        """How many times the signature was seen in its current window (0 if expired)."""
+        with self.lock:
+            entry = self.entries.get(signature)
+            return entry.hits if entry else 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'unique': self.unique,
+                'suppressed': self.suppressed,
+                'evicted': self.evicted,
+            }
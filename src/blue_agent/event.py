@@ -0,0 +1,127 @@
+"""
+Typed Falco event shared by the monitor, pipeline, dashboard and evaluator.
+
+Each log line is decoded exactly once with the C json decoder (pure Python
+byte scanners measured slower than json.loads on real Falco lines, see
+src/benchmark/decode.py). Only the keys consumers use are kept, in slots:
+rule, priority, time, source, hostname, tags and the output_fields dict. The long 'output'
+string and the top-level dict are dropped; the raw bytes stay around, so
+json() hands the original text to the prompt without re-serializing and
+`data` rebuilds the full object on demand.
+"""
+import json
+
+_MISSING = object()
+
+
+class FalcoEvent:
+    """One Falco alert: hot keys as attributes, raw bytes for lazy full access."""
+    __slots__ = ('raw', 'rule', 'priority', 'time', 'source', 'hostname', 'tags', 'fields', '_data')
+
+    def __init__(self, raw, rule=None, priority=None, time=None, source=None, hostname=None,
+                 tags=None, fields=None):
+        self.raw = raw
+        self.rule = rule
+        self.priority = priority
+        self.time = time
+        self.source = source
+        self.hostname = hostname
+        self.tags = tags if tags is not None else []
+        self.fields = fields if fields is not None else {}
+        self._data = None
+
+    @classmethod
+    def from_bytes(cls, raw):
+        """Decode one log line. Returns None for anything that is not a JSON object."""
+        try:
+            data = json.loads(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        if not isinstance(data, dict):
+            return None
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        return cls(raw, data.get('rule'), data.get('priority'), data.get('time'),
+                   data.get('source'), data.get('hostname'), data.get('tags'), data.get('output_fields'))
+
+    @classmethod
+    def from_dict(cls, data):
+        raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        event = cls(raw, data.get('rule'), data.get('priority'), data.get('time'),
+                    data.get('source'), data.get('hostname'), data.get('tags'), data.get('output_fields'))
+        event._data = data
+        return event
+
+    @property
+    def data(self):
+        """Full decoded object, parsed again from the raw bytes on first access."""
+        if self._data is None:
+            self._data = json.loads(self.raw)
+        return self._data
+
+    def field(self, name, default=None):
+        value = self.fields.get(name)
+        return default if value is None else value
+
+    @property
+    def container(self):
+        return self.fields.get('container.name')
+
+    @property
+    def evt_time(self):
+        """evt.time in nanoseconds, or None."""
+        return self.fields.get('evt.time')
+
+    def json(self):
+        """Original JSON text of the event."""
+        return self.raw.decode('utf-8', 'replace')
+
+    # ------------------------------------------------------------------
+    # Dict compatibility for code written against json.loads() output
+    # ------------------------------------------------------------------
+    def get(self, key, default=None):
+        if key == 'rule':
+            value = self.rule
+        elif key == 'priority':
+            value = self.priority
+        elif key == 'time':
+            value = self.time
+        elif key == 'source':
+            value = self.source
+        elif key == 'hostname':
+            value = self.hostname
+        elif key == 'output_fields':
+            value = self.fields
+        elif key == 'tags':
+            value = self.tags
+        else:
+            value = self.data.get(key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __repr__(self):
+        return f"FalcoEvent(rule={self.rule!r}, priority={self.priority!r}, time={self.time!r})"
+
+
+def output_field(event, name, default=None):
+    """output_fields[name] for a FalcoEvent or a plain dict."""
+    if isinstance(event, FalcoEvent):
+        value = event.fields.get(name)
+    else:
+        value = (event.get('output_fields') or {}).get(name)
+    return default if value is None else value
+
+
+def event_json(event):
+    """JSON text of an event for prompts and caches. FalcoEvents reuse their raw bytes."""
+    if isinstance(event, FalcoEvent):
+        return event.json()
+    return json.dumps(event)
@@ -0,0 +1,281 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import time
+
+from src.utils.metrics import histogram, observe_event_lag
+
+BATCH_SECONDS = histogram('kerneural_monitor_batch_seconds')
+
+# inotify event masks (from <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class _Inotify:
+    """
+    Minimal ctypes wrapper around Linux inotify.
+    We watch the parent directory so that rotation (rename + create) is seen too.
+    """
+
+    def __init__(self, directory):
+        self.fd = -1
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not supported on this platform")
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+        self.fd = fd
+
+    def wait(self, timeout):
+        """Block until the directory changes or timeout expires. Returns True on change."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # Drain the queue; we do not care which event it was, only that something happened
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class LogMonitor:
+    """
+    Tails the Falco JSON log and yields batches of decoded events.
+
+    - Wakes on inotify instead of sleep-polling (falls back to polling if unavailable).
+    - Reads in large chunks and splits lines in memory, no readline() per event.
+    - Keeps partial trailing lines until the writer finishes them.
+    - Detects truncation (size shrinks) and rotation (inode changes) and reopens.
+
+    start_offset resumes from a known byte offset (e.g. where a backfill stopped)
+    instead of the end of the file, so nothing written in between is missed.
+    decoder turns one line (bytes) into an event, or None if invalid; the
+    default yields plain dicts, FalcoEvent.from_bytes yields typed events.
+    """
+
+    def __init__(self, log_file, chunk_size=1 << 16, batch_size=512,
+                 poll_interval=1.0, from_start=False, start_offset=None, decoder=None):
+        self.log_file = log_file
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.from_start = from_start
+        self.start_offset = start_offset
+        self.decoder = decoder
+
+        self.fd = None
+        self.inode = None
+        self.offset = 0
+        self.buffer = b""
+        # Events already read past `position` that the caller has not been given yet
+        self.undelivered = 0
+        self.running = False
+        self.notifier = None
+
+        # Basic counters
+        self.lines_read = 0
+        self.bad_lines = 0
+        self.reopens = 0
+
+    # ------------------------------------------------------------------
+    # File handling
+    # ------------------------------------------------------------------
+    def _open(self, seek_end, offset=None):
+        try:
+            fd = os.open(self.log_file, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        st = os.fstat(fd)
+        self.fd = fd
+        self.inode = (st.st_dev, st.st_ino)
+        if offset is not None:
+            # Offset past the end means the file was truncated since, start over
+            self.offset = offset if offset <= st.st_size else 0
+        else:
+            self.offset = st.st_size if seek_end else 0
+        os.lseek(fd, self.offset, os.SEEK_SET)
+        self.buffer = b""
+        return True
+
+    def _close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _rotated(self):
+        """True if the path now points to a different file than the one we hold."""
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            return False
+        return (st.st_dev, st.st_ino) != self.inode
+
+    def _read_available(self):
+        """Read everything currently available and return the list of complete lines."""
+        if self.fd is None:
+            if not self._open(seek_end=False):
+                return []
+            self.reopens += 1
+
+        # Truncation: file became shorter than what we already consumed
+        size = os.fstat(self.fd).st_size
+        if size < self.offset:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            self.offset = 0
+            self.buffer = b""
+            self.reopens += 1
+
+        chunks = []
+        while True:
+            data = os.read(self.fd, self.chunk_size)
+            if not data:
+                break
+            chunks.append(data)
+            self.offset += len(data)
+
+        lines = []
+        if chunks:
+            data = self.buffer + b"".join(chunks)
+            lines = data.split(b"\n")
+            # Last element is either b"" (complete line) or a partial line still being written
+            self.buffer = lines.pop()
+
+        # Rotation: drain the old file first, then switch to the new one
+        if self._rotated():
+            self._close()
+            if self.buffer:
+                lines.append(self.buffer)
+            if self._open(seek_end=False):
+                self.reopens += 1
+                lines.extend(self._read_available())
+
+        return lines
+
+    def _decode(self, lines):
+        events = []
+        decoder = self.decoder
+        for line in lines:
+            if not line.strip():
+                continue
+            if decoder is not None:
+                event = decoder(line)
+                if event is None:
+                    self.bad_lines += 1
+                else:
+                    events.append(event)
+                continue
+            try:
+                events.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                self.bad_lines += 1
+                continue
+        self.lines_read += len(events)
+        return events
+
+    def _wait(self, timeout):
+        if self.notifier is not None:
+            return self.notifier.wait(timeout)
+        time.sleep(min(timeout, 0.1))
+        return True
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def batches(self, idle_timeout=None):
+        """
+        Generator yielding lists of decoded events (at most batch_size per list).
+        If idle_timeout is set, an empty list is yielded whenever nothing arrives
+        for that long, so callers with a UI can refresh.
+        """
+        directory = os.path.dirname(os.path.abspath(self.log_file))
+        try:
+            self.notifier = _Inotify(directory)
+        except OSError:
+            self.notifier = None
+
+        self._open(seek_end=not self.from_start, offset=self.start_offset)
+        self.running = True
+        wait_timeout = self.poll_interval
+        if idle_timeout is not None:
+            wait_timeout = min(wait_timeout, idle_timeout)
+
+        try:
+            last_yield = time.monotonic()
+            while self.running:
+                started = time.perf_counter()
+                events = self._decode(self._read_available())
+                if events:
+                    BATCH_SECONDS.observe(time.perf_counter() - started)
+                    now = time.time()
+                    for event in events:
+                        observe_event_lag('kerneural_event_read_lag_seconds', event, now)
+                    for i in range(0, len(events), self.batch_size):
+                        batch = events[i:i + self.batch_size]
+                        self.undelivered = len(events) - i - len(batch)
+                        yield batch
+                    last_yield = time.monotonic()
+                    continue
+
+                if idle_timeout is not None and time.monotonic() - last_yield >= idle_timeout:
+                    yield []
+                    last_yield = time.monotonic()
+
+                self._wait(wait_timeout)
+        finally:
+            self.running = False
+            self._close()
+            if self.notifier is not None:
+                self.notifier.close()
+                self.notifier = None
+
+    @property
+    def position(self):
+        """
+        Byte offset after the last line read (excludes a buffered partial line).
+        A read larger than batch_size is handed out over several batches, so
+        this only matches what the caller has seen once `drained` is True.
+        """
+        return self.offset - len(self.buffer)
+
+    @property
+    def drained(self):
+        """
+        True when every event read so far has been yielded and `position` is
+        an offset in the file log_file names now (not in a rotated one).
+        """
+        return self.undelivered == 0 and not self._rotated()
+
+    def __iter__(self):
+        for batch in self.batches():
+            yield from batch
+
+    def stop(self):
+        self.running = False
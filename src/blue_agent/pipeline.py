@@ -0,0 +1,329 @@
+import collections
+import queue
+import threading
+import time
+
+from src.blue_agent.dedup import EventDeduplicator, event_signature
+from src.blue_agent.event import event_json
+from src.blue_agent.scheduler import PriorityScheduler
+from src.utils.metrics import observe_event_lag
+
+ANALYZE_PRIORITIES = ['Warning', 'Error', 'Critical', 'Notice']
+# 'rate' is measured over roughly the last RATE_WINDOW seconds
+RATE_WINDOW = 5.0
+
+
+class StageStats:
+    """
+    Counters for one pipeline stage. 'rate' comes from timestamped samples of
+    the processed count over the last RATE_WINDOW seconds, so any number of
+    readers (dashboard, daemon, benchmark sampler) see the same rate and never
+    reset each other's window.
+    """
+
+    def __init__(self, name, q=None):
+        self.name = name
+        self.queue = q
+        self.processed = 0
+        self.dropped = 0
+        self.busy = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._samples = collections.deque([(self.started, 0)])
+
+    def add(self, n=1):
+        with self._lock:
+            self.processed += n
+
+    def drop(self, n=1):
+        with self._lock:
+            self.dropped += n
+
+    def enter(self):
+        with self._lock:
+            self.busy += 1
+
+    def leave(self):
+        with self._lock:
+            self.busy -= 1
+
+    def done(self):
+        """Items that left this stage, either forwarded or dropped."""
+        with self._lock:
+            return self.processed + self.dropped
+
+    def snapshot(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            processed = self.processed
+            dropped = self.dropped
+            busy = self.busy
+            samples = self._samples
+            # Base the rate on the newest sample at least RATE_WINDOW old
+            while len(samples) > 1 and samples[1][0] <= now - RATE_WINDOW:
+                samples.popleft()
+            base_time, base_count = samples[0]
+            window = now - base_time
+            rate = (processed - base_count) / window if window > 0 else 0.0
+            # A few samples per window are enough, however often stats are read
+            if now - samples[-1][0] >= RATE_WINDOW / 10:
+                samples.append((now, processed))
+        return {
+            'depth': self.queue.qsize() if self.queue is not None else 0,
+            'capacity': self.queue.maxsize if self.queue is not None else 0,
+            'processed': processed,
+            'dropped': dropped,
+            'busy': busy,
+            'rate': rate,
+            'avg_rate': processed / max(now - self.started, 1e-9),
+        }
+
+
+class AnalysisPipeline:
+    """
+    Staged, non-blocking detect -> analyze -> immunize pipeline.
+
+        submit() -> [ingest_q] -> filter/dedup -> [scheduler] -> N analysis workers
+                 -> [deploy_q] -> single deploy thread (add_rule + reload_falco)
+
+    Every queue is bounded. submit() never blocks: if ingest is full the event
+    is dropped and counted, so the log tailer keeps reading at full speed.
+    The analysis queue is a PriorityScheduler (src/blue_agent/scheduler.py):
+    workers take higher priorities first by weight, and under an alert storm
+    low priority alerts are shed there instead of blocking the filter.
+
+    Optional callbacks (all called from worker threads):
+        on_analyze(event, repeats), on_rule(event, rule), on_deployed(event, rule)
+
+    `repeats` is how many alerts the analyzed event stands for: its dedup hits
+    so far plus the alerts the scheduler folded into its job (at least 1).
+    """
+
+    def __init__(self, brain, rule_manager, workers=4, queue_size=1000,
+                 priorities=None, dedup_window=30.0, dedup_max_entries=10000,
+                 batch_size=1, batch_timeout=0.5, scheduler=None,
+                 on_analyze=None, on_rule=None, on_deployed=None):
+        self.brain = brain
+        self.rule_manager = rule_manager
+        self.workers = workers
+        self.priorities = set(priorities or ANALYZE_PRIORITIES)
+
+        # batch_size > 1: each worker sends up to batch_size events per LLM request,
+        # flushing early when batch_timeout expires so latency stays bounded
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+
+        # Repeats of the same signature inside the window become one analysis + hit count.
+        # dedup_window=0 disables it.
+        self.deduplicator = None
+        if dedup_window:
+            self.deduplicator = EventDeduplicator(dedup_window, dedup_max_entries)
+
+        self.on_analyze = on_analyze
+        self.on_rule = on_rule
+        self.on_deployed = on_deployed
+
+        self.ingest_q = queue.Queue(maxsize=queue_size)
+        # scheduler: a configured PriorityScheduler (weights, aging, shedding)
+        self.analysis_q = scheduler or PriorityScheduler(maxsize=queue_size)
+        self.deploy_q = queue.Queue(maxsize=queue_size)
+
+        self.stages = {
+            'ingest': StageStats('ingest', self.ingest_q),
+            'filter': StageStats('filter', self.analysis_q),
+            'analysis': StageStats('analysis', self.deploy_q),
+            'deploy': StageStats('deploy'),
+        }
+
+        self.running = False
+        self.threads = []
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self._spawn(self._filter_loop, 'pipeline-filter')
+        for i in range(self.workers):
+            self._spawn(self._analysis_loop, f'pipeline-analysis-{i}')
+        self._spawn(self._deploy_loop, 'pipeline-deploy')
+        return self
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        for t in self.threads:
+            t.join(timeout)
+        self.threads = []
+
+    def _spawn(self, target, name):
+        t = threading.Thread(target=target, name=name, daemon=True)
+        t.start()
+        self.threads.append(t)
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+    def submit(self, event):
+        """Non-blocking enqueue. Returns False if the event was dropped."""
+        try:
+            self.ingest_q.put_nowait(event)
+        except queue.Full:
+            self.stages['ingest'].drop()
+            return False
+        self.stages['ingest'].add()
+        return True
+
+    def submit_batch(self, events):
+        accepted = 0
+        for event in events:
+            if self.submit(event):
+                accepted += 1
+        return accepted
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+    def _get(self, q):
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            return None
+
+    def _put(self, q, item):
+        """Blocking put that still honours stop()."""
+        while self.running:
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def should_analyze(self, event):
+        return event.get('priority') in self.priorities
+
+    def _filter_loop(self):
+        stats = self.stages['filter']
+        while self.running:
+            event = self._get(self.ingest_q)
+            if event is None:
+                continue
+            if not self.should_analyze(event):
+                stats.drop()
+                continue
+            if self.deduplicator is not None:
+                _, duplicate = self.deduplicator.check(event)
+                if duplicate:
+                    stats.drop()
+                    continue
+            accepted, evicted = self.analysis_q.offer(event)
+            if accepted:
+                stats.add()
+            else:
+                stats.drop()
+            if evicted:
+                # Admitted earlier, shed now: they leave the analysis stage unprocessed
+                self.stages['analysis'].drop(evicted)
+
+    def _get_job(self, timeout=0.2):
+        try:
+            return self.analysis_q.get_job(timeout)
+        except queue.Empty:
+            return None
+
+    def _get_batch(self):
+        """Collect up to batch_size jobs; flush on count or batch_timeout."""
+        first = self._get_job()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            job = self._get_job(remaining)
+            if job is None:
+                break
+            batch.append(job)
+        return batch
+
+    def repeats(self, job):
+        """Alerts one analysis job stands for: dedup hits of its event + summarized alerts."""
+        hits = 1
+        if self.deduplicator is not None:
+            hits = max(self.deduplicator.hits(event_signature(job.item)), 1)
+        return hits + job.merged
+
+    def _analyze(self, events):
+        if len(events) == 1 or not hasattr(self.brain, 'analyze_logs_and_generate_rules'):
+            return [self.brain.analyze_log_and_generate_rule(event_json(e)) for e in events]
+        return self.brain.analyze_logs_and_generate_rules([event_json(e) for e in events])
+
+    def _analysis_loop(self):
+        stats = self.stages['analysis']
+        while self.running:
+            jobs = self._get_batch() if self.batch_size > 1 else [self._get_job()]
+            if not jobs or jobs[0] is None:
+                continue
+            events = [job.item for job in jobs]
+            stats.enter()
+            try:
+                if self.on_analyze:
+                    for job in jobs:
+                        self.on_analyze(job.item, self.repeats(job))
+                rules = self._analyze(events)
+            except Exception as e:
+                print(f"Analysis worker error: {e}")
+                rules = [None] * len(events)
+            finally:
+                stats.leave()
+
+            for event, rule in zip(events, rules):
+                if not rule:
+                    stats.drop()
+                    continue
+                if self.on_rule:
+                    self.on_rule(event, rule)
+                if self._put(self.deploy_q, (event, rule)):
+                    stats.add()
+
+    def _deploy_loop(self):
+        stats = self.stages['deploy']
+        while self.running:
+            item = self._get(self.deploy_q)
+            if item is None:
+                continue
+            event, rule = item
+            try:
+                # Duplicates are rejected by the rule store, no reload needed for them
+                if self.rule_manager.add_rule(rule):
+                    self.rule_manager.reload_falco()
+            except Exception as e:
+                print(f"Rule deployment error: {e}")
+                stats.drop()
+                continue
+            stats.add()
+            observe_event_lag('kerneural_syscall_to_rule_seconds', event)
+            if self.on_deployed:
+                self.on_deployed(event, rule)
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+    def stats(self):
+        """Per-stage queue depth, processed/dropped counters and throughput (items/s)."""
+        result = {name: stage.snapshot() for name, stage in self.stages.items()}
+        if self.deduplicator is not None:
+            result['dedup'] = self.deduplicator.stats()
+        result['scheduler'] = self.analysis_q.stats()
+        return result
+
+    def idle(self):
+        """True when every accepted event has left the last stage it reached."""
+        ingest, filt, analysis, deploy = (self.stages[n] for n in ('ingest', 'filter', 'analysis', 'deploy'))
+        return (ingest.processed == filt.done()
+                and filt.processed == analysis.done()
+                and analysis.processed == deploy.done())
@@ -0,0 +1,184 @@
+import threading
+import time
+
+from src.utils.docker_client import get_client
+from src.utils.metrics import histogram
+
+FALCO_CONTAINER = "falco"
+RELOAD_SECONDS = histogram('kerneural_falco_reload_seconds')
+# Falco prints this when it (re)loads its rules files
+FALCO_READY_MARKER = "Loading rules from"
+
+
+class FalcoReloadManager:
+    """
+    Coalesces rule additions and hot-reloads Falco once per burst.
+
+    - request_reload() is cheap and non-blocking; it only marks a reload as pending.
+    - A background thread waits until no new request came in for `debounce`
+      seconds (or `max_delay` passed since the first pending one), then sends
+      SIGHUP to the Falco container so it reloads rules in place.
+    - The thread then waits until the sensor is live again before it looks at
+      the next batch, so reloads never overlap.
+    - If SIGHUP fails we fall back to a full `docker restart`.
+
+    Metrics: reload count, last/total reload duration and total blind window.
+    """
+
+    def __init__(self, container=FALCO_CONTAINER, debounce=2.0, max_delay=10.0,
+                 ready_timeout=30.0, health_check=None):
+        self.container = container
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.ready_timeout = ready_timeout
+        self.health_check = health_check or self._falco_ready
+
+        self.cond = threading.Condition()
+        self.pending = 0
+        self.first_request = None
+        self.last_request = None
+        self.running = False
+        self.thread = None
+
+        self.reloads = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+        self.blind_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="falco-reload", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, flush=True):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(self.ready_timeout)
+            self.thread = None
+        if flush and self.pending:
+            self._reload_now()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def request_reload(self):
+        now = time.monotonic()
+        with self.cond:
+            if self.pending == 0:
+                self.first_request = now
+            self.pending += 1
+            self.last_request = now
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {
+                'pending': self.pending,
+                'reloads': self.reloads,
+                'failures': self.failures,
+                'coalesced_rules': self.coalesced,
+                'last_reload_seconds': self.last_duration,
+                'total_reload_seconds': self.total_duration,
+                'blind_seconds': self.blind_seconds,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _due_in(self, now):
+        """Seconds until the pending batch should be flushed (<= 0 means now)."""
+        quiet = self.last_request + self.debounce - now
+        hard = self.first_request + self.max_delay - now
+        return min(quiet, hard)
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.running and self.pending == 0:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                wait = self._due_in(time.monotonic())
+                if wait > 0:
+                    self.cond.wait(wait)
+                    continue
+            self._reload_now()
+
+    def _reload_now(self):
+        with self.cond:
+            batch = self.pending
+            self.pending = 0
+            self.first_request = None
+        if batch == 0:
+            return
+
+        started = time.monotonic()
+        # Sub-second: a reload logged earlier in the same second is not this one
+        since = time.time()
+        ok = self._signal_reload()
+        if not ok:
+            ok = self._restart()
+        signalled = time.monotonic()
+
+        live = ok and self._wait_live(since)
+        finished = time.monotonic()
+
+        with self.cond:
+            self.coalesced += batch
+            self.last_duration = finished - started
+            self.total_duration += self.last_duration
+            self.blind_seconds += finished - signalled
+            if live:
+                self.reloads += 1
+            else:
+                self.failures += 1
+
+        if live:
+            RELOAD_SECONDS.observe(finished - started)
+            print(f"Falco reloaded {batch} rule change(s) in {self.last_duration:.2f}s")
+        else:
+            print("Falco reload could not be confirmed")
+
+    def _signal_reload(self):
+        try:
+            get_client().kill(self.container, signal="SIGHUP")
+            return True
+        except Exception as e:
+            print(f"SIGHUP reload failed, falling back to restart: {e}")
+            return False
+
+    def _restart(self):
+        try:
+            get_client().restart(self.container)
+            return True
+        except Exception as e:
+            print(f"Failed to restart Falco: {e}")
+            return False
+
+    def _wait_live(self, since):
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline:
+            if self.health_check(since):
+                return True
+            time.sleep(0.2)
+        return False
+
+    def _falco_ready(self, since):
+        """Container is running and logged a rules (re)load after `since`."""
+        try:
+            client = get_client()
+            if not client.container_running(self.container):
+                return False
+            return FALCO_READY_MARKER in client.logs(self.container, since=since)
+        except Exception:
+            return False
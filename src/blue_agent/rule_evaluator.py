@@ -0,0 +1,370 @@
+"""
+Offline pre-flight check for generated Falco rules.
+
+Candidate rules are evaluated against a columnar, pre-indexed copy of recorded
+events (e.g. logs/falco_events.json.backup) before they reach Falco, so a bad
+macro or field is caught in milliseconds instead of after a failed restart.
+
+Each column is dictionary encoded: distinct value -> bitset (Python int) of the
+events holding it. A predicate becomes a bitset, and/or/not become &, |, ~.
+
+Macros and lists are resolved from the rules files Falco loads. A macro
+defined nowhere we can see (e.g. a stock one when only the local file is
+available) or an operator we cannot evaluate is a warning, not an error:
+the syntax is checked, the match check is skipped.
+"""
+import fnmatch
+import os
+import sys
+import time
+
+import yaml
+
+from src.blue_agent.condition import (And, ConditionError, Macro, Not, Or, Word,
+                                      parse_condition)
+from src.blue_agent.event import FalcoEvent
+
+SPAWN_EVENTS = ('execve', 'execveat')
+OPEN_EVENTS = ('open', 'openat', 'openat2')
+DEFAULT_CORPUS_PATH = "logs/falco_events.json.backup"
+# Local copies of the rules files listed in configs/falco.yaml
+RULES_FILES = ("configs/falco_rules.yaml", "configs/falco_rules.local.yaml")
+# Top-level keys that can be referenced like fields
+EVENT_KEYS = ('rule', 'priority', 'source', 'hostname')
+
+SUPPORTED_OPS = ('=', '!=', '<', '<=', '>', '>=', 'contains', 'icontains', 'startswith',
+                 'endswith', 'in', 'pmatch', 'glob', 'exists')
+
+
+class Unevaluable(ConditionError):
+    """Valid condition we cannot evaluate offline (unknown macro, unsupported operator)."""
+
+
+def load_definitions(paths=RULES_FILES):
+    """(macros, lists) from Falco rules files: name -> condition, name -> items. Later files win."""
+    macros, lists = {}, {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path) as f:
+                items = yaml.safe_load(f) or []
+        except yaml.YAMLError as e:
+            print(f"Could not read macros and lists from {path}: {e}")
+            continue
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            if 'macro' in item and item.get('condition'):
+                macros[item['macro']] = str(item['condition'])
+            elif 'list' in item and isinstance(item.get('items'), list):
+                values = [str(v) for v in item['items']]
+                if item.get('append'):
+                    values = lists.get(item['list'], []) + values
+                lists[item['list']] = values
+    return macros, lists
+
+
+class EventCorpus:
+    """Column store of recorded Falco events with a value -> bitset index per field."""
+
+    def __init__(self, events):
+        self.size = len(events)
+        self.all = (1 << self.size) - 1
+        self.columns = {}     # field -> {value(str): bitset}
+        self.rules = []       # original Falco rule per event, for reporting
+
+        for i, event in enumerate(events):
+            bit = 1 << i
+            self.rules.append(event.get('rule'))
+            fields = event.get('output_fields') or {}
+            for name, value in fields.items():
+                if value is None:
+                    continue
+                self._add(name, value, bit)
+            for name in EVENT_KEYS:
+                if event.get(name) is not None:
+                    self._add(name, event[name], bit)
+
+    def _add(self, name, value, bit):
+        column = self.columns.setdefault(name, {})
+        key = str(value)
+        column[key] = column.get(key, 0) | bit
+
+    @classmethod
+    def from_file(cls, path):
+        events = []
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = FalcoEvent.from_bytes(line.rstrip(b"\n"))
+                if event is not None:
+                    events.append(event)
+        return cls(events)
+
+    def present(self, field):
+        """Bitset of events that have a value for field."""
+        mask = 0
+        for bits in self.columns.get(field, {}).values():
+            mask |= bits
+        return mask
+
+    def where(self, field, test):
+        """OR of the bitsets of all distinct values that satisfy test(value)."""
+        mask = 0
+        for value, bits in self.columns.get(field, {}).items():
+            if test(value):
+                mask |= bits
+        return mask
+
+    def equals(self, field, value):
+        return self.columns.get(field, {}).get(str(value), 0)
+
+
+class PreflightReport:
+    def __init__(self, name):
+        self.name = name
+        self.matches = 0
+        self.matched_rules = {}
+        self.errors = []
+        self.warnings = []
+        # False when the condition could not be evaluated (see Unevaluable)
+        self.checked = False
+        self.elapsed_ms = 0.0
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def matched_nothing(self):
+        return self.ok and self.checked and self.matches == 0
+
+    def summary(self):
+        status = "ERROR" if self.errors else ("WARN" if self.warnings else "OK")
+        return f"[{status}] {self.name}: {self.matches} match(es) in {self.elapsed_ms:.2f} ms"
+
+
+class RulePreflight:
+    """
+    Evaluates rule conditions against an EventCorpus.
+
+    A rule is reported as a likely false positive when it matches more than
+    `max_match_ratio` of the corpus, or events coming from more than
+    `max_source_rules` different original Falco rules (i.e. it is too broad).
+    """
+
+    def __init__(self, corpus, max_match_ratio=0.2, max_source_rules=3, macros=None, lists=None):
+        self.corpus = corpus
+        self.max_match_ratio = max_match_ratio
+        self.max_source_rules = max_source_rules
+        self.macros = macros or {}
+        self.lists = lists or {}
+        self._unknown_fields = set()
+        self._macro_cache = {}
+        self._expanding = set()
+
+    @classmethod
+    def from_file(cls, path, rules_files=RULES_FILES, **kwargs):
+        macros, lists = load_definitions(rules_files)
+        return cls(EventCorpus.from_file(path), macros=macros, lists=lists, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+    def evaluate(self, node):
+        c = self.corpus
+        if isinstance(node, And):
+            mask = c.all
+            for item in node.items:
+                mask &= self.evaluate(item)
+                if not mask:
+                    break
+            return mask
+        if isinstance(node, Or):
+            mask = 0
+            for item in node.items:
+                mask |= self.evaluate(item)
+            return mask
+        if isinstance(node, Not):
+            return c.all & ~self.evaluate(node.item)
+        if isinstance(node, Macro):
+            return self._macro(node.name)
+        return self._predicate(node)
+
+    def _macro(self, name):
+        if name in self._macro_cache:
+            return self._macro_cache[name]
+        c = self.corpus
+        if name == 'spawned_process':
+            # Recorded events only carry the fields their rule printed. Process
+            # events usually have no evt.type, so treat "no evt.type but a process
+            # name or command line" as a spawn as well.
+            typed = c.present('evt.type')
+            spawn = 0
+            for evt in SPAWN_EVENTS:
+                spawn |= c.equals('evt.type', evt)
+            process = c.present('proc.name') | c.present('proc.cmdline')
+            mask = spawn | (process & ~typed & c.all)
+        elif name == 'container':
+            mask = c.present('container.id') & ~c.equals('container.id', 'host') & c.all
+        elif name in ('open_read', 'open_write'):
+            mask = 0
+            for evt in OPEN_EVENTS:
+                mask |= c.equals('evt.type', evt)
+        elif name in self.macros and name not in self._expanding:
+            self._expanding.add(name)
+            try:
+                mask = self.evaluate(parse_condition(self.macros[name]))
+            finally:
+                self._expanding.discard(name)
+        else:
+            raise Unevaluable(f"macro '{name}' is not defined in the loaded rules files")
+        self._macro_cache[name] = mask
+        return mask
+
+    def _expand(self, values, seen=()):
+        """Replace list references (bare names of loaded lists) with their items."""
+        items = []
+        for v in values:
+            if isinstance(v, Word) and v in self.lists and v not in seen:
+                items.extend(self._expand([Word(i) for i in self.lists[v]], seen + (v,)))
+            else:
+                items.append(v)
+        return items
+
+    def _predicate(self, pred):
+        c = self.corpus
+        field, op, value = pred.field, pred.op, pred.value
+        if op not in SUPPORTED_OPS:
+            raise Unevaluable(f"operator '{op}' cannot be evaluated offline")
+        if field not in c.columns:
+            self._unknown_fields.add(field)
+
+        if op == 'exists':
+            return c.present(field)
+        if op == '=':
+            return c.equals(field, value)
+        if op == '!=':
+            return c.present(field) & ~c.equals(field, value) & c.all
+        if op == 'in':
+            mask = 0
+            for v in self._expand(value):
+                mask |= c.equals(field, v)
+            return mask
+        if op == 'pmatch':
+            prefixes = [p.rstrip('/') for p in self._expand(value)]
+            return c.where(field, lambda v: any(v == p or v.startswith(p + '/') for p in prefixes))
+        if op == 'glob':
+            return c.where(field, lambda v: fnmatch.fnmatchcase(v, value))
+        if op == 'contains':
+            return c.where(field, lambda v: value in v)
+        if op == 'icontains':
+            needle = value.lower()
+            return c.where(field, lambda v: needle in v.lower())
+        if op == 'startswith':
+            return c.where(field, lambda v: v.startswith(value))
+        if op == 'endswith':
+            return c.where(field, lambda v: v.endswith(value))
+
+        # Numeric comparisons
+        try:
+            number = float(value)
+        except ValueError:
+            raise Unevaluable(f"operator '{op}' with non-numeric value {value!r} cannot be evaluated offline")
+        compare = {
+            '<': lambda v: v < number, '<=': lambda v: v <= number,
+            '>': lambda v: v > number, '>=': lambda v: v >= number,
+        }[op]
+        return c.where(field, lambda v: _is_number(v) and compare(float(v)))
+
+    # ------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------
+    def check_rule(self, rule, target_event=None):
+        report = PreflightReport(rule.get('rule', 'unnamed'))
+        started = time.perf_counter()
+        self._unknown_fields = set()
+        try:
+            node = parse_condition(rule.get('condition', ''))
+            mask = self.evaluate(node)
+            report.checked = True
+            report.matches = bin(mask).count("1")
+            for i in _bits(mask):
+                source = self.corpus.rules[i]
+                report.matched_rules[source] = report.matched_rules.get(source, 0) + 1
+        except Unevaluable as e:
+            report.warnings.append(f"{e}; match check skipped")
+        except ConditionError as e:
+            report.errors.append(str(e))
+
+        if report.checked:
+            for field in sorted(self._unknown_fields):
+                report.warnings.append(f"field '{field}' never appears in the corpus")
+            if report.matches == 0:
+                report.warnings.append("matched nothing in the recorded corpus")
+            elif self.corpus.size and report.matches / self.corpus.size > self.max_match_ratio:
+                report.warnings.append(
+                    f"likely false positives: matches {report.matches}/{self.corpus.size} recorded events")
+            elif len(report.matched_rules) > self.max_source_rules:
+                report.warnings.append(
+                    f"likely false positives: matches events from {len(report.matched_rules)} different Falco rules")
+            if target_event is not None and not self.matches_event(rule, target_event):
+                report.warnings.append("does not match the event it was generated for")
+
+        report.elapsed_ms = (time.perf_counter() - started) * 1000
+        return report
+
+    def check_yaml(self, rule_yaml, target_event=None):
+        data = yaml.safe_load(rule_yaml)
+        if isinstance(data, dict):
+            data = [data]
+        return [self.check_rule(r, target_event) for r in data or [] if isinstance(r, dict) and 'rule' in r]
+
+    def matches_event(self, rule, event):
+        """Evaluate a single rule against one event (builds a one-event corpus)."""
+        single = RulePreflight(EventCorpus([event]), macros=self.macros, lists=self.lists)
+        try:
+            return bool(single.evaluate(parse_condition(rule.get('condition', ''))))
+        except ConditionError:
+            return False
+
+
+def load_preflight(corpus_path=DEFAULT_CORPUS_PATH, rules_files=RULES_FILES):
+    """Pre-flight evaluator over the recorded event corpus, if we have one."""
+    if not os.path.exists(corpus_path):
+        return None
+    return RulePreflight.from_file(corpus_path, rules_files)
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _bits(mask):
+    i = 0
+    while mask:
+        if mask & 1:
+            yield i
+        mask >>= 1
+        i += 1
+
+
+if __name__ == "__main__":
+    rules_path = sys.argv[1] if len(sys.argv) > 1 else "configs/falco_rules.local.yaml"
+    corpus_path = sys.argv[2] if len(sys.argv) > 2 else "logs/falco_events.json.backup"
+
+    started = time.perf_counter()
+    preflight = RulePreflight.from_file(corpus_path)
+    print(f"Indexed {preflight.corpus.size} events in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    with open(rules_path) as f:
+        for report in preflight.check_yaml(f.read()):
+            print(report.summary())
+            for message in report.errors + report.warnings:
+                print(f"    - {message}")
@@ -1,14 +1,36 @@
-import os
-import subprocess
 import yaml
 
+from src.blue_agent.rule_optimizer import optimize_rule
+from src.blue_agent.rule_store import RuleStore
+from src.utils.docker_client import get_client
+from src.utils.metrics import histogram
+
 RULE_FILE_PATH="configs/falco_rules.local.yaml"
+ADD_RULE_SECONDS = histogram('kerneural_rule_add_seconds')
+RELOAD_SECONDS = histogram('kerneural_falco_reload_seconds')
 
 class RuleManager:
+    def __init__(self, reload_manager=None, rule_file=RULE_FILE_PATH, preflight=None, optimize=True):
+        # Optional FalcoReloadManager: debounced in-place reload instead of a restart per rule
+        self.reload_manager = reload_manager
+        # Optional RulePreflight: evaluate rules against recorded events before deploying
+        self.preflight = preflight
+        # Reorder conjuncts by estimated cost and add missing evt.type guards
+        self.optimize = optimize
+        # Indexed, deduplicating view of the local rules file
+        self.store = RuleStore(rule_file)
+
     def validate_rule(self, rule_yaml):
         """
         Validate YAML syntax and basic Falco rule structure before adding.
         """
+        return self.parse_rules(rule_yaml) is not None
+
+    def parse_rules(self, rule_yaml):
+        """
+        Same checks as validate_rule(), but returns the list of (auto-fixed) rule
+        dicts, or None if the YAML is not a valid rule.
+        """
         try:
             # 1. Check YAML syntax
             rules = yaml.safe_load(rule_yaml)
@@ -19,15 +41,19 @@ class RuleManager:
                 
             if not isinstance(rules, list):
                 print("Validation Error: Rule must be a list or dict")
-                return False
+                return None
 
             for rule in rules:
+                if not isinstance(rule, dict):
+                    print("Validation Error: Rule must be a mapping")
+                    return None
+
                 # 2. Check required fields
                 required_fields = ['rule', 'desc', 'condition', 'output', 'priority']
                 for field in required_fields:
                     if field not in rule:
                         print(f"Validation Error: Missing field '{field}' in rule '{rule.get('rule', 'unknown')}'")
-                        return False
+                        return None
                 
                 # 3. Check for forbidden fields (like 'actions' which caused issues)
                 if 'actions' in rule:
@@ -41,10 +67,10 @@ class RuleManager:
                 # Check that condition and output are not empty
                 if not condition.strip():
                     print(f"Validation Error: Empty condition in rule '{rule.get('rule')}'")
-                    return False
+                    return None
                 if not output.strip():
                     print(f"Validation Error: Empty output in rule '{rule.get('rule')}'")
-                    return False
+                    return None
                 
                 # Check priority is valid
                 valid_priorities = ['EMERGENCY', 'ALERT', 'CRITICAL', 'ERROR', 'WARNING', 'NOTICE', 'INFO', 'DEBUG']
@@ -52,40 +78,75 @@ class RuleManager:
                     print(f"Validation Warning: Invalid priority '{rule.get('priority')}' in rule '{rule.get('rule')}'. Using WARNING.")
                     rule['priority'] = 'WARNING'
 
-            return True
+            return rules
         except yaml.YAMLError as e:
             print(f"YAML Syntax Error: {e}")
-            return False
+            return None
         except Exception as e:
             print(f"Validation Unexpected Error: {e}")
-            return False
+            return None
 
     def add_rule(self, rule_yaml):
         """
         Docstring for add_rule
-        
-        them rule moi vao file local config
+
+        them rule moi vao file local config.
+        Exact duplicates are skipped and sibling rules are merged (see RuleStore).
+        Returns True if the rules file changed and Falco needs a reload.
         """
+        with ADD_RULE_SECONDS.time():
+            return self._add_rule(rule_yaml)
+
+    def _add_rule(self, rule_yaml):
         # Validate before writing
-        if not self.validate_rule(rule_yaml):
+        rules = self.parse_rules(rule_yaml)
+        if rules is None:
             print("Rule validation failed. Skipping rule addition to prevent Falco crash.")
-            return
+            return False
 
-        # doc noi dung cu tranh trung lap
-        if not os.path.exists(RULE_FILE_PATH):
-            with open(RULE_FILE_PATH,'w') as f:
-                f.write ("# Auto-generated rules\n")
+        changed = False
+        for rule in rules:
+            if self.optimize:
+                result = optimize_rule(rule)
+                if result.changed:
+                    print(f"Optimized condition {result.summary()}")
+                for message in result.warnings:
+                    print(f"Cost analysis warning for '{rule['rule']}': {message}")
 
-        with open(RULE_FILE_PATH, 'a') as f:
-            f.write("\n"+ rule_yaml + "\n")
+            if self.preflight is not None:
+                report = self.preflight.check_rule(rule)
+                print(f"Pre-flight {report.summary()}")
+                for message in report.warnings:
+                    print(f"    - {message}")
+                if not report.ok:
+                    print(f"Rule '{rule['rule']}' rejected by pre-flight: {'; '.join(report.errors)}")
+                    continue
 
-        print(f"Rule added to {RULE_FILE_PATH}")
+            result = self.store.add(rule)
+            if result == 'duplicate':
+                print(f"Rule '{rule['rule']}' duplicates an existing rule. Skipping.")
+            elif result == 'merged':
+                print(f"Rule '{rule['rule']}' merged into an existing sibling rule.")
+                changed = True
+            else:
+                changed = True
+
+        if changed:
+            self.store.save()
+            print(f"Rule added to {self.store.path}")
+        return changed
 
 
     def reload_falco(self):
+        if self.reload_manager is not None:
+            self.reload_manager.request_reload()
+            return
+        self.restart_falco()
+
+    def restart_falco(self):
         try:
-            subprocess.run(["docker", "restart", "falco"], check=True)
+            with RELOAD_SECONDS.time():
+                get_client().restart("falco")
             print("Falco restarted to apply new rules.")
         except Exception as e:
             print(f"Failed to reload Falco: {e}")
-            
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Static cost analysis and predicate reordering for rule conditions.
+
+Falco evaluates a condition for every syscall that reaches the rule, and AND/OR
+short-circuit left to right. Putting cheap, selective checks (evt.type, macros,
+equality on short fields) before substring scans on proc.cmdline saves work on
+every event that fails early.
+
+Costs and selectivities are rough relative estimates, not measurements. They
+only need to rank predicates correctly.
+"""
+import sys
+
+import yaml
+
+from src.blue_agent.condition import (And, ConditionError, Macro, Not, Or, Pred,
+                                      format_condition, parse_condition, walk)
+
+# Relative cost of an operator
+OP_COST = {
+    'exists': 1.0, '=': 1.0, '!=': 1.0, '<': 1.0, '<=': 1.0, '>': 1.0, '>=': 1.0,
+    'in': 1.5, 'intersects': 2.0,
+    'startswith': 3.0, 'bstartswith': 3.0, 'endswith': 3.0,
+    'contains': 6.0, 'bcontains': 6.0, 'icontains': 8.0,
+    'glob': 10.0, 'pmatch': 10.0, 'regex': 20.0,
+}
+# Extra cost of extracting a field (long strings, path resolution)
+FIELD_COST = {
+    'evt.type': 0.0,
+    'proc.cmdline': 3.0, 'proc.args': 3.0, 'proc.exepath': 1.0,
+    'fd.name': 2.0, 'fd.directory': 2.0, 'fd.filename': 2.0,
+}
+DEFAULT_FIELD_COST = 0.5
+# Probability that a predicate is true for an event that reaches it
+OP_SELECTIVITY = {
+    '=': 0.05, 'in': 0.08, 'exists': 0.9, '!=': 0.95,
+    'startswith': 0.2, 'endswith': 0.2, 'contains': 0.3, 'icontains': 0.35,
+}
+DEFAULT_SELECTIVITY = 0.5
+MACRO_COST = {'spawned_process': 1.0, 'container': 1.0, 'open_read': 1.5, 'open_write': 1.5}
+MACRO_SELECTIVITY = {'spawned_process': 0.05, 'container': 0.5, 'open_read': 0.2, 'open_write': 0.1}
+
+SPAWN_EVENTS = ('execve', 'execveat')
+OPEN_EVENTS = ('open', 'openat', 'openat2')
+EVENT_TYPE_MACROS = {'spawned_process': SPAWN_EVENTS, 'open_read': OPEN_EVENTS, 'open_write': OPEN_EVENTS}
+# fd.* fields that name a file (open guard) and ones that describe a socket (no guard we can guess)
+FILE_FIELDS = ('fd.name', 'fd.directory', 'fd.filename')
+NETWORK_FIELDS = ('fd.sport', 'fd.rport', 'fd.sip', 'fd.rip', 'fd.l4proto')
+
+# Expected per-event cost above which a rule is flagged for the hot path
+HOT_PATH_LIMIT = 6.0
+
+
+def estimate(node):
+    """Return (expected_cost, selectivity) of a condition node, honouring short-circuit order."""
+    if isinstance(node, And):
+        cost, reach = 0.0, 1.0
+        for item in node.items:
+            c, s = estimate(item)
+            cost += reach * c
+            reach *= s
+        return cost, reach
+    if isinstance(node, Or):
+        cost, miss = 0.0, 1.0
+        for item in node.items:
+            c, s = estimate(item)
+            cost += miss * c
+            miss *= (1.0 - s)
+        return cost, 1.0 - miss
+    if isinstance(node, Not):
+        c, s = estimate(node.item)
+        return c, 1.0 - s
+    if isinstance(node, Macro):
+        return MACRO_COST.get(node.name, 2.0), MACRO_SELECTIVITY.get(node.name, DEFAULT_SELECTIVITY)
+
+    cost = OP_COST.get(node.op, 5.0) + FIELD_COST.get(node.field, DEFAULT_FIELD_COST)
+    if node.op in ('in', 'intersects') and node.value:
+        cost += 0.1 * len(node.value)
+        selectivity = min(0.9, OP_SELECTIVITY['=' if node.op == 'in' else 'in'] * len(node.value))
+    else:
+        selectivity = OP_SELECTIVITY.get(node.op, DEFAULT_SELECTIVITY)
+    if node.field == 'evt.type' and node.op in ('=', 'in'):
+        # Falco indexes rules by event type, so this check is close to free
+        cost = 0.2
+        selectivity = min(selectivity, 0.02 * (len(node.value) if node.op == 'in' else 1))
+    return cost, selectivity
+
+
+def reorder(node):
+    """
+    Reorder AND / OR operands recursively.
+    AND: ascending cost / (1 - selectivity)  (cheap terms that usually fail first)
+    OR:  ascending cost / selectivity        (cheap terms that usually succeed first)
+    """
+    if isinstance(node, Not):
+        return Not(reorder(node.item))
+    if not isinstance(node, (And, Or)):
+        return node
+
+    items = [reorder(item) for item in node.items]
+    scored = []
+    for pos, item in enumerate(items):
+        cost, sel = estimate(item)
+        if isinstance(node, And):
+            rank = cost / max(1.0 - sel, 1e-6)
+        else:
+            rank = cost / max(sel, 1e-6)
+        scored.append((rank, pos, item))
+    scored.sort(key=lambda t: (t[0], t[1]))
+    return type(node)([item for _, _, item in scored])
+
+
+def event_types(node):
+    """Event types the top-level AND restricts the condition to, or None if unrestricted."""
+    for term in (node.items if isinstance(node, And) else [node]):
+        if isinstance(term, Macro) and term.name in EVENT_TYPE_MACROS:
+            return set(EVENT_TYPE_MACROS[term.name])
+        if isinstance(term, Pred) and term.field == 'evt.type' and term.op in ('=', 'in'):
+            return set(term.value) if term.op == 'in' else {term.value}
+    return None
+
+
+def infer_guard(node):
+    """Guess an event-type filter for an unguarded condition from the fields it uses."""
+    fields = {n.field for n in walk(node) if isinstance(n, Pred)}
+    if fields.intersection(NETWORK_FIELDS):
+        # connect / accept / sendto ...: an open or spawn guard would make the rule dead
+        return None
+    if fields.intersection(FILE_FIELDS):
+        return Pred('evt.type', 'in', OPEN_EVENTS)
+    if any(f.startswith('proc.') for f in fields):
+        return Macro('spawned_process')
+    return None
+
+
+class OptimizationResult:
+    def __init__(self, name, original, condition, original_cost, cost, guard=None, warnings=None):
+        self.name = name
+        self.original = original
+        self.condition = condition
+        self.original_cost = original_cost
+        self.cost = cost
+        self.guard = guard
+        self.warnings = warnings or []
+
+    @property
+    def changed(self):
+        return self.condition != self.original
+
+    def summary(self):
+        text = f"{self.name}: cost {self.original_cost:.2f} -> {self.cost:.2f}"
+        if self.guard:
+            text += f" (added guard: {self.guard})"
+        return text
+
+
+def optimize_condition(condition, name="rule", hot_path_limit=HOT_PATH_LIMIT):
+    """Parse, guard, reorder and score a condition. Unparseable conditions are returned unchanged."""
+    try:
+        node = parse_condition(condition)
+    except ConditionError as e:
+        return OptimizationResult(name, condition, condition, 0.0, 0.0,
+                                  warnings=[f"could not analyze condition: {e}"])
+
+    original_cost, _ = estimate(node)
+    original_text = format_condition(node)
+    warnings = []
+    guard = None
+
+    types = event_types(node)
+    if types is None:
+        guard_node = infer_guard(node)
+        if guard_node is not None:
+            guard = format_condition(guard_node)
+            node = And([guard_node] + (node.items if isinstance(node, And) else [node]))
+            types = event_types(node)
+        else:
+            warnings.append("no evt.type filter: evaluated for every syscall")
+
+    # spawned_process and evt.type = openat can never both be true
+    terms = node.items if isinstance(node, And) else [node]
+    restrictions = [event_types(t) for t in terms]
+    restrictions = [r for r in restrictions if r is not None]
+    if restrictions and not set.intersection(*restrictions):
+        warnings.append("contradictory event type filters: rule can never match")
+
+    node = reorder(node)
+    cost, _ = estimate(node)
+    if cost > hot_path_limit:
+        warnings.append(f"expected cost {cost:.2f} exceeds hot path limit {hot_path_limit:.2f}")
+
+    optimized = format_condition(node)
+    if guard is None and optimized == original_text:
+        # Nothing moved: deploy the condition exactly as written
+        optimized = condition
+    return OptimizationResult(name, condition, optimized, original_cost, cost, guard, warnings)
+
+
+def optimize_rule(rule, hot_path_limit=HOT_PATH_LIMIT):
+    """Optimize a rule dict in place and return the OptimizationResult."""
+    result = optimize_condition(rule.get('condition', ''), rule.get('rule', 'rule'), hot_path_limit)
+    rule['condition'] = result.condition
+    return result
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "configs/falco_rules.local.yaml"
+    with open(path) as f:
+        items = yaml.safe_load(f) or []
+    for item in items:
+        if not isinstance(item, dict) or 'rule' not in item:
+            continue
+        result = optimize_condition(item.get('condition', ''), item['rule'])
+        print(result.summary())
+        if result.changed:
+            print(f"    {result.condition}")
+        for message in result.warnings:
+            print(f"    ! {message}")
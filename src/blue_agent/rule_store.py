@@ -0,0 +1,274 @@
+import os
+import tempfile
+import threading
+
+import yaml
+
+from src.blue_agent.condition import (And, ConditionError, Pred, conjuncts,
+                                      format_condition, parse_condition, walk)
+
+HEADER = "# Custom rules for Kerneural\n"
+# Fields whose constants are indexed (what the rule "matches on")
+INDEXED_FIELDS = ('proc.name', 'fd.name', 'proc.cmdline', 'proc.exepath')
+MERGEABLE_OPS = ('=', 'in')
+# Key order used when writing rules back, matches how the file is written by hand
+KEY_ORDER = ('rule', 'macro', 'list', 'desc', 'condition', 'items', 'output', 'priority')
+
+
+class RuleStore:
+    """
+    Indexed view of falco_rules.local.yaml.
+
+    The file is parsed once (and again only if its mtime changes behind our back).
+    Rules are indexed by name, by normalized condition and by the constants
+    they compare proc.name / fd.name / proc.cmdline / proc.exepath against.
+
+    add() rejects exact duplicates, merges "sibling" rules that differ only in
+    one equality constant into a single `field in (...)` rule, and the file is
+    rewritten atomically (temp file + rename). Fewer rules means less work for
+    Falco on every syscall.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.items = []          # every top-level YAML item (rules, macros, lists) in file order
+        self.by_name = {}        # rule name -> item
+        self.by_condition = {}   # normalized condition -> rule name
+        self.by_constant = {}    # (field, value) -> set of rule names
+        self.by_field = {}       # field -> set of rule names using it in = / in
+        self.mtime = None
+        self.loaded = False
+
+        self.duplicates = 0
+        self.merges = 0
+
+    # ------------------------------------------------------------------
+    # Loading and indexing
+    # ------------------------------------------------------------------
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self, force=False):
+        mtime = self._file_mtime()
+        if not force and self.loaded and mtime == self.mtime:
+            return
+        items = []
+        if mtime is not None:
+            with open(self.path) as f:
+                data = yaml.safe_load(f)
+            if isinstance(data, list):
+                items = [item for item in data if isinstance(item, dict)]
+        self.items = items
+        self.mtime = mtime
+        self.loaded = True
+        self._reindex()
+
+    def _reindex(self):
+        self.by_name = {}
+        self.by_condition = {}
+        self.by_constant = {}
+        self.by_field = {}
+        for item in self.items:
+            if 'rule' in item:
+                self._index(item)
+
+    def _index(self, rule):
+        name = rule['rule']
+        self.by_name[name] = rule
+        key = normalize_condition(rule.get('condition', ''))
+        self.by_condition.setdefault(key, name)
+        for field, value in rule_constants(rule):
+            self.by_constant.setdefault((field, value), set()).add(name)
+            self.by_field.setdefault(field, set()).add(name)
+
+    def _unindex(self, rule):
+        name = rule['rule']
+        self.by_name.pop(name, None)
+        key = normalize_condition(rule.get('condition', ''))
+        if self.by_condition.get(key) == name:
+            del self.by_condition[key]
+        for field, value in rule_constants(rule):
+            names = self.by_constant.get((field, value))
+            if names:
+                names.discard(name)
+                if not names:
+                    del self.by_constant[(field, value)]
+            names = self.by_field.get(field)
+            if names:
+                names.discard(name)
+                if not names:
+                    del self.by_field[field]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def rules(self):
+        return [item for item in self.items if 'rule' in item]
+
+    def rules_matching(self, field, value):
+        """Names of rules that compare `field` against the constant `value`."""
+        return set(self.by_constant.get((field, value), ()))
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    def add(self, rule):
+        """
+        Add one rule dict. Returns 'added', 'merged' or 'duplicate'.
+        The caller is responsible for save().
+        """
+        with self.lock:
+            self.load()
+            key = normalize_condition(rule.get('condition', ''))
+
+            existing = self.by_name.get(rule['rule'])
+            if existing is not None and normalize_condition(existing.get('condition', '')) == key:
+                self.duplicates += 1
+                return 'duplicate'
+            if key in self.by_condition:
+                self.duplicates += 1
+                return 'duplicate'
+
+            sibling = self._find_sibling(rule)
+            if sibling is not None:
+                target, merged_condition = sibling
+                self._unindex(target)
+                target['condition'] = merged_condition
+                self._index(target)
+                self.merges += 1
+                return 'merged'
+
+            rule = dict(rule)
+            if existing is not None:
+                rule['rule'] = self._unique_name(rule['rule'])
+            self.items.append(rule)
+            self._index(rule)
+            return 'added'
+
+    def _unique_name(self, name):
+        n = 2
+        while f"{name} ({n})" in self.by_name:
+            n += 1
+        return f"{name} ({n})"
+
+    def _find_sibling(self, rule):
+        """
+        Find an existing rule with the same priority whose condition differs from
+        `rule` only by the constant of one `field = x` / `field in (...)` conjunct.
+        Returns (existing_rule, merged_condition) or None.
+        """
+        try:
+            new_terms = conjuncts(parse_condition(rule.get('condition', '')))
+        except ConditionError:
+            return None
+        new_keys = [format_condition(t, And, canonical=True) for t in new_terms]
+
+        # Siblings differ in one indexed = / in term, so they must use one of our fields
+        candidates = set()
+        for term in new_terms:
+            if isinstance(term, Pred) and term.op in MERGEABLE_OPS:
+                candidates |= self.by_field.get(term.field, set())
+
+        for name in candidates:
+            other = self.by_name.get(name)
+            if other is None or str(other.get('priority', '')).upper() != str(rule.get('priority', '')).upper():
+                continue
+            try:
+                old_terms = conjuncts(parse_condition(other.get('condition', '')))
+            except ConditionError:
+                continue
+            if len(old_terms) != len(new_terms):
+                continue
+            old_keys = [format_condition(t, And, canonical=True) for t in old_terms]
+            only_old = [i for i, k in enumerate(old_keys) if k not in new_keys]
+            only_new = [i for i, k in enumerate(new_keys) if k not in old_keys]
+            if len(only_old) != 1 or len(only_new) != 1:
+                continue
+            a, b = old_terms[only_old[0]], new_terms[only_new[0]]
+            if not (isinstance(a, Pred) and isinstance(b, Pred)):
+                continue
+            if a.field != b.field or a.op not in MERGEABLE_OPS or b.op not in MERGEABLE_OPS:
+                continue
+
+            values = list(_values(a))
+            values.extend(v for v in _values(b) if v not in values)
+            merged_terms = list(old_terms)
+            merged_terms[only_old[0]] = Pred(a.field, 'in', tuple(values))
+            merged = merged_terms[0] if len(merged_terms) == 1 else And(merged_terms)
+            return other, format_condition(merged)
+        return None
+
+    def compact(self):
+        """Merge siblings already present in the file. Returns number of merges."""
+        with self.lock:
+            self.load()
+            rules = self.rules()
+            others = [item for item in self.items if 'rule' not in item]
+            self.items = others
+            self._reindex()
+        merges = 0
+        for rule in rules:
+            if self.add(rule) != 'added':
+                merges += 1
+        return merges
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def render(self):
+        parts = [HEADER]
+        for item in self.items:
+            ordered = {k: item[k] for k in KEY_ORDER if k in item}
+            ordered.update((k, v) for k, v in item.items() if k not in ordered)
+            parts.append(yaml.safe_dump([ordered], sort_keys=False, allow_unicode=True, width=100000))
+        return "\n".join(parts)
+
+    def save(self):
+        """Atomic write: temp file in the same directory, fsync, then rename over the target."""
+        with self.lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp = tempfile.mkstemp(prefix=".rules-", suffix=".yaml", dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(self.render())
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.exists(self.path):
+                    os.chmod(tmp, os.stat(self.path).st_mode & 0o777)
+                else:
+                    os.chmod(tmp, 0o644)
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+            self.mtime = self._file_mtime()
+
+
+def _values(pred):
+    return pred.value if pred.op == 'in' else (pred.value,)
+
+
+def normalize_condition(condition):
+    """Canonical text of a condition (whitespace, quoting). Falls back to collapsed text."""
+    try:
+        return format_condition(parse_condition(condition), canonical=True)
+    except ConditionError:
+        return " ".join(str(condition).split())
+
+
+def rule_constants(rule):
+    """(field, value) pairs the rule compares INDEXED_FIELDS against with = / in."""
+    try:
+        node = parse_condition(rule.get('condition', ''))
+    except ConditionError:
+        return []
+    pairs = []
+    for n in walk(node):
+        if isinstance(n, Pred) and n.field in INDEXED_FIELDS and n.op in MERGEABLE_OPS:
+            pairs.extend((n.field, v) for v in _values(n))
+    return pairs
@@ -0,0 +1,213 @@
+"""
+Priority scheduler between the filter stage and the analysis workers.
+
+One FIFO per Falco priority. Workers take from them by smooth weighted
+round robin, so a Critical alert waits behind at most a weight-proportional
+share of lower priority work instead of the whole backlog. A low priority
+job moves up one priority for every `aging` seconds it waits, up to
+`protect`, so Notice alerts are delayed under load but never starved and
+never overtake real Critical ones.
+
+When the scheduler fills up, low priority alerts (below `protect`) are shed:
+
+- summarized: above `shed_at` of capacity, an alert whose (rule, container)
+  is already queued is folded into the queued job (its `merged` count grows)
+- sampled:    above `shed_at`, only 1 in `sample_every` of the other low
+  priority alerts is admitted
+- evicted:    at capacity, the oldest job of the lowest non-empty low
+  priority below the incoming alert makes room for it
+- dropped:    at capacity with nothing lower to evict, the incoming alert
+
+Protected priorities are never summarized, sampled or evicted, and are only
+dropped when the whole scheduler is full of protected work. Summarized
+alerts stay on their job (`merged`) and are reported with it to the
+analysis workers and in stats().
+"""
+import collections
+import queue
+import threading
+import time
+
+PRIORITIES = ('Emergency', 'Alert', 'Critical', 'Error', 'Warning', 'Notice', 'Informational', 'Debug')
+DEFAULT_WEIGHTS = {
+    'Emergency': 16, 'Alert': 16, 'Critical': 16, 'Error': 8,
+    'Warning': 4, 'Notice': 2, 'Informational': 1, 'Debug': 1,
+}
+UNKNOWN_PRIORITY = 'Notice'
+
+
+class _Job:
+    __slots__ = ('item', 'level', 'origin', 'key', 'enqueued', 'aged_at', 'merged')
+
+    def __init__(self, item, level, key, now):
+        self.item = item
+        self.level = level
+        self.origin = level
+        self.key = key
+        self.enqueued = now
+        self.aged_at = now
+        self.merged = 0
+
+
+class PriorityScheduler:
+    """
+    Drop-in for the pipeline's analysis queue: offer() never blocks, get()
+    raises queue.Empty on timeout, qsize() / maxsize for stage stats.
+    """
+
+    def __init__(self, maxsize=1000, weights=None, aging=10.0, protect='Error',
+                 shed_at=0.5, sample_every=10):
+        self.maxsize = maxsize
+        self.weights = [max(1, (weights or DEFAULT_WEIGHTS).get(p, 1)) for p in PRIORITIES]
+        self.aging = aging
+        self.protect = PRIORITIES.index(protect)
+        self.shed_at = shed_at
+        self.sample_every = sample_every
+
+        self.queues = [collections.deque() for _ in PRIORITIES]
+        self.current = [0] * len(PRIORITIES)
+        self.queued_keys = {}    # (rule, container) -> job, low priority jobs only
+        self.size = 0
+        self.arrivals = 0
+        self.cond = threading.Condition()
+
+        self.shed = {'summarized': 0, 'sampled': 0, 'evicted': 0, 'dropped': 0}
+        self.promoted = 0
+        # Summarized alerts that reached a worker on their job
+        self.merged_dispatched = 0
+        self.dispatched = [0] * len(PRIORITIES)
+        self.max_wait = [0.0] * len(PRIORITIES)
+
+    @staticmethod
+    def level_of(event):
+        priority = event.get('priority')
+        return PRIORITIES.index(priority if priority in PRIORITIES else UNKNOWN_PRIORITY)
+
+    @staticmethod
+    def key_of(event):
+        return event.get('rule'), (event.get('output_fields') or {}).get('container.name')
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def offer(self, event, now=None):
+        """
+        Admit one event. Returns (accepted, evicted): accepted is False when the
+        event itself was shed, evicted is how many queued jobs made room for it.
+        """
+        now = time.monotonic() if now is None else now
+        level = self.level_of(event)
+        key = self.key_of(event)
+        with self.cond:
+            self.arrivals += 1
+            sheddable = level > self.protect
+            if sheddable and self.size >= self.shed_at * self.maxsize:
+                queued = self.queued_keys.get(key)
+                if queued is not None:
+                    queued.merged += 1
+                    self.shed['summarized'] += 1
+                    return False, 0
+                if self.arrivals % self.sample_every:
+                    self.shed['sampled'] += 1
+                    return False, 0
+
+            evicted = 0
+            if self.size >= self.maxsize:
+                if not self._evict_below(level):
+                    self.shed['dropped'] += 1
+                    return False, 0
+                evicted = 1
+
+            job = _Job(event, level, key if sheddable else None, now)
+            self.queues[level].append(job)
+            if job.key is not None:
+                self.queued_keys.setdefault(job.key, job)
+            self.size += 1
+            self.cond.notify()
+            return True, evicted
+
+    def put(self, event, timeout=None):
+        return self.offer(event)[0]
+
+    def _evict_below(self, level):
+        # Protected jobs are never evicted, not even for a higher priority
+        for lower in range(len(PRIORITIES) - 1, max(level, self.protect), -1):
+            if self.queues[lower]:
+                self._forget(self.queues[lower].popleft())
+                self.size -= 1
+                self.shed['evicted'] += 1
+                return True
+        return False
+
+    def _forget(self, job):
+        if job.key is not None and self.queued_keys.get(job.key) is job:
+            del self.queued_keys[job.key]
+
+    # ------------------------------------------------------------------
+    # Consumer side
+    # ------------------------------------------------------------------
+    def _age(self, now):
+        if not self.aging:
+            return
+        for level in range(self.protect + 1, len(PRIORITIES)):
+            q = self.queues[level]
+            while q and now - q[0].aged_at >= self.aging:
+                job = q.popleft()
+                job.level = level - 1
+                job.aged_at = now
+                self.queues[level - 1].append(job)
+                self.promoted += 1
+
+    def _pick(self):
+        """Smooth weighted round robin over the non-empty queues."""
+        best, total = None, 0
+        for level, q in enumerate(self.queues):
+            if not q:
+                continue
+            weight = self.weights[level]
+            self.current[level] += weight
+            total += weight
+            if best is None or self.current[level] > self.current[best]:
+                best = level
+        self.current[best] -= total
+        return best
+
+    def get_job(self, timeout=None, now=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while self.size == 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self.cond.wait(remaining)
+            now = time.monotonic() if now is None else now
+            self._age(now)
+            level = self._pick()
+            job = self.queues[level].popleft()
+            if not self.queues[level]:
+                # An idle queue does not bank credit for the next burst
+                self.current[level] = 0
+            self._forget(job)
+            self.size -= 1
+            self.dispatched[job.origin] += 1
+            self.merged_dispatched += job.merged
+            self.max_wait[job.origin] = max(self.max_wait[job.origin], now - job.enqueued)
+            return job
+
+    def get(self, timeout=None):
+        return self.get_job(timeout).item
+
+    def qsize(self):
+        return self.size
+
+    def stats(self):
+        with self.cond:
+            return {
+                'levels': {p: len(q) for p, q in zip(PRIORITIES, self.queues) if q},
+                'dispatched': {p: n for p, n in zip(PRIORITIES, self.dispatched) if n},
+                'max_wait': {p: w for p, w in zip(PRIORITIES, self.max_wait) if w},
+                'shed': dict(self.shed),
+                'shed_total': sum(self.shed.values()),
+                'promoted': self.promoted,
+                'merged_dispatched': self.merged_dispatched,
+            }
@@ -0,0 +1,106 @@
+"""
+Headless Kerneural engine.
+
+One process tails the Falco log, analyzes alerts and deploys rules; any number
+of consoles attach read-only over a Unix socket (`python run.py --attach`), so
+an alert is analyzed once and Falco reloads once no matter how many operators
+are watching.
+
+Messages (see src/utils/fanout.py for framing):
+
+    hello     {"counters": {...}, "recent": [alert, ...]}   sent on connect
+    event     {"alert": alert}                              every Falco alert read
+    analyze   {"rule": falco rule name}                     sent to the LLM
+    generated {"rule": falco rule name, "yaml": rule}       rule generated
+    deployed  {"rule": falco rule name}                     rule applied
+    stats     {"pipeline", "cache", "templates", "reload", "latency", "fanout"}   every stats_interval
+    dropped   {"count": n}                                  this client fell behind
+"""
+import argparse
+import threading
+
+from rich.console import Console
+
+from src.blue_agent.alert_store import AlertStore
+from src.orchestrator import KerneuralOrchestrator
+from src.utils.fanout import FanoutServer
+from src.utils.metrics import engine_stats
+
+SOCKET_PATH = "logs/kerneural.sock"
+
+console = Console()
+
+
+def alert_message(record):
+    return {'time': record.time, 'priority': record.priority,
+            'rule': record.rule, 'container': record.container}
+
+
+class KerneuralDaemon(KerneuralOrchestrator):
+    def __init__(self, socket_path=SOCKET_PATH, stats_interval=1.0, max_queue=1000, **kwargs):
+        kwargs.setdefault('verbose', False)
+        super().__init__(**kwargs)
+        self.alerts = AlertStore()
+        # hello() runs on the accept thread while the ingest loop adds alerts
+        self.alerts_lock = threading.Lock()
+        self.stats_interval = stats_interval
+        self.fanout = FanoutServer(socket_path, max_queue=max_queue, on_connect=self.hello)
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.fanout.start()
+        console.print(f"[bold green]Kerneural daemon listening on {self.fanout.path}[/bold green]")
+        publisher = threading.Thread(target=self._stats_loop, name="daemon-stats", daemon=True)
+        publisher.start()
+        try:
+            super().start()
+        finally:
+            self.stopped.set()
+            publisher.join()
+            self.fanout.stop()
+
+    def hello(self):
+        with self.alerts_lock:
+            counters = self.alerts.snapshot()
+            recent = list(self.alerts.recent_alerts)
+        return [{'type': 'hello', 'counters': counters, 'recent': [alert_message(r) for r in recent]}]
+
+    def _stats_loop(self):
+        while not self.stopped.wait(self.stats_interval):
+            stats = engine_stats(self.pipeline, self.brain, self.reload_manager)
+            stats['fanout'] = self.fanout.stats()
+            self.fanout.publish({'type': 'stats', **stats})
+
+    def process_event(self, log_entry):
+        with self.alerts_lock:
+            record = self.alerts.add(log_entry)
+        self.fanout.publish({'type': 'event', 'alert': alert_message(record)})
+        super().process_event(log_entry)
+
+    def on_analyze(self, log_entry, repeats=1):
+        super().on_analyze(log_entry, repeats)
+        self.fanout.publish({'type': 'analyze', 'rule': log_entry.get('rule'), 'repeats': repeats})
+
+    def on_rule(self, log_entry, new_rule):
+        super().on_rule(log_entry, new_rule)
+        self.fanout.publish({'type': 'generated', 'rule': log_entry.get('rule'), 'yaml': new_rule})
+
+    def on_deployed(self, log_entry, new_rule):
+        super().on_deployed(log_entry, new_rule)
+        self.fanout.publish({'type': 'deployed', 'rule': log_entry.get('rule')})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Kerneural engine")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="also print alerts and rules")
+    args = parser.parse_args()
+
+    daemon = KerneuralDaemon(socket_path=args.socket, workers=args.workers,
+                             batch_size=args.batch_size, verbose=args.verbose)
+    try:
+        daemon.start()
+    except KeyboardInterrupt:
+        print("\nDaemon stopped.")
@@ -1,6 +1,6 @@
 import time
-import json
 import os
+import threading
 from rich.console import Console
 from rich.layout import Layout
 from rich.live import Live
@@ -11,21 +11,83 @@ from rich.syntax import Syntax
 from rich.align import Align
 from datetime import datetime, timedelta
 
+from src.blue_agent.alert_store import AlertRecord, AlertStore
+from src.blue_agent.backfill import SummarySnapshot, backfill
+from src.blue_agent.correlation import DeploymentLog
+from src.blue_agent.event import FalcoEvent
+from src.blue_agent.monitor import LogMonitor
+from src.blue_agent.pipeline import AnalysisPipeline
+from src.blue_agent.reload_manager import FalcoReloadManager
+from src.blue_agent.rule_evaluator import load_preflight
 from src.blue_agent.rule_manager import RuleManager
 from src.neural_core.gemini_client import NeuralBrain
+from src.utils.fanout import FanoutClient
+from src.utils.metrics import METRICS_PORT, MetricsServer, SamplingProfiler, engine_stats
 
 console = Console()
 
+REFRESH_PER_SECOND = 4
+
+# Stage histograms shown in the latency panel
+LATENCY_ROWS = (
+    ("Syscall -> read", 'kerneural_event_read_lag_seconds'),
+    ("LLM request", 'kerneural_llm_request_seconds'),
+    ("Add rule", 'kerneural_rule_add_seconds'),
+    ("Falco reload", 'kerneural_falco_reload_seconds'),
+    ("Syscall -> rule", 'kerneural_syscall_to_rule_seconds'),
+)
+
 class KerneuralDashboard:
-    def __init__(self):
-        self.brain = NeuralBrain()
-        self.rule_manager = RuleManager()
+    def __init__(self, workers=4, batch_size=1, backfill_events=200, backfill_minutes=None,
+                 metrics_port=METRICS_PORT, attach=None):
+        # attach: socket path of a running src/daemon.py. The console is then
+        # read-only and owns no brain, rule manager or pipeline of its own.
+        self.attach = attach
+        self.remote_stats = None
         self.log_file = "logs/falco_events.json"
-        self.alerts = []
+        # Ring buffer + counters, memory does not grow with uptime
+        self.alerts = AlertStore()
+        self.summary = SummarySnapshot()
+        self.backfill_events = backfill_events
+        self.backfill_minutes = backfill_minutes
         self.status = "Monitoring"
         self.last_action = "System initialized"
         self.last_generated_rule = None
         self.start_time = datetime.now()
+        self.metrics = None
+        self.deployments = None
+
+        # Panels are rebuilt only when marked dirty, at most once per refresh tick
+        # Pipeline callbacks mark panels from worker threads while render() swaps the set
+        self.dirty = {"header", "alerts", "status", "latency", "neural_core"}
+        self.dirty_lock = threading.Lock()
+        self.last_render = 0.0
+        self.last_clock = None
+        self.rule_syntax = None
+        self.rule_syntax_source = None
+
+        if attach:
+            self.brain = self.reload_manager = self.rule_manager = self.pipeline = None
+            return
+
+        self.brain = NeuralBrain()
+        self.reload_manager = FalcoReloadManager()
+        self.rule_manager = RuleManager(
+            reload_manager=self.reload_manager,
+            preflight=load_preflight(),
+        )
+        if metrics_port:
+            self.metrics = MetricsServer(metrics_port, profiler=SamplingProfiler())
+        self.deployments = DeploymentLog()
+        self.pipeline = AnalysisPipeline(
+            self.brain,
+            self.rule_manager,
+            workers=workers,
+            batch_size=batch_size,
+            on_analyze=self.on_analyze,
+            on_rule=self.on_rule,
+            on_deployed=self.on_deployed,
+        )
 
     def format_time(self, time_str):
         """Convert UTC timestamp from Falco logs to Local Time (System Time)"""
@@ -59,7 +121,8 @@ class KerneuralDashboard:
             Layout(name="right_panel", ratio=4)
         )
         layout["right_panel"].split_column(
-            Layout(name="status", size=10),
+            Layout(name="status", size=14),
+            Layout(name="latency", size=9),
             Layout(name="neural_core", ratio=1)
         )
         return layout
@@ -85,8 +148,8 @@ class KerneuralDashboard:
         table.add_column("Container", style="green", width=15)
 
         # Show last 15 alerts
-        for alert in reversed(self.alerts[-15:]):
-            priority = alert.get('priority', 'UNKNOWN')
+        for alert in self.alerts.recent(15):
+            priority = alert.priority
             
             # Color coding for priority
             p_style = "white"
@@ -98,10 +161,10 @@ class KerneuralDashboard:
                 p_style = "blue"
 
             table.add_row(
-                self.format_time(alert.get('time', 'N/A')),
+                self.format_time(alert.time),
                 Text(priority, style=p_style),
-                alert.get('rule', 'Unknown Rule'),
-                alert.get('output_fields', {}).get('container.name', 'N/A')
+                alert.rule,
+                alert.container
             )
             
         return Panel(
@@ -128,7 +191,32 @@ class KerneuralDashboard:
 
         grid.add_row("System Status:", Text(f"{status_icon} {self.status}", style=f"bold {status_color}"))
         grid.add_row("Uptime:", uptime_str)
-        grid.add_row("Total Alerts:", str(len(self.alerts)))
+        grid.add_row("Total Alerts:", f"{self.alerts.total} | {self.alerts.rate() * 60:.0f}/min")
+        top = self.alerts.by_rule.top(1)
+        if top:
+            grid.add_row("Top Rule:", f"{top[0][0][:24]} ({top[0][1]})")
+
+        engine = self.engine_stats()
+        if engine is None:
+            grid.add_row("Engine:", Text(f"waiting for daemon at {self.attach}", style="dim"))
+        else:
+            stats = engine['pipeline']
+            grid.add_row("Queue (analyze/deploy):", f"{stats['filter']['depth']} / {stats['analysis']['depth']}")
+            if 'dedup' in stats:
+                grid.add_row("Deduplicated:", str(stats['dedup']['suppressed']))
+            if 'scheduler' in stats:
+                scheduler = stats['scheduler']
+                grid.add_row("Shed (low priority):",
+                             f"{scheduler['shed_total']} | {scheduler['merged_dispatched']} summarized into analyses")
+            templates = engine.get('templates')
+            if templates is not None:
+                grid.add_row("Rule Templates:", f"{templates['hit_ratio']:.0%} hit | saved {templates['saved_seconds']:.0f}s")
+            cache = engine['cache']
+            if cache is not None:
+                grid.add_row("Rule Cache:", f"{cache['hit_ratio']:.0%} hit | saved {cache['saved_seconds']:.0f}s")
+            reload = engine['reload']
+            grid.add_row("Falco Reloads:", f"{reload['reloads']} | blind {reload['blind_seconds']:.1f}s")
+            grid.add_row("Throughput:", f"{stats['ingest']['rate']:.1f} ev/s | {stats['analysis']['rate']:.2f} rules/s")
         grid.add_row("Last Action:", Text(self.last_action, style="italic cyan"))
 
         return Panel(
@@ -137,10 +225,40 @@ class KerneuralDashboard:
             border_style="blue"
         )
 
+    def format_seconds(self, value):
+        if value >= 1:
+            return f"{value:.1f}s"
+        return f"{value * 1000:.0f}ms" if value >= 0.001 else f"{value * 1e6:.0f}us"
+
+    def generate_latency_panel(self) -> Panel:
+        table = Table(expand=True, box=None, header_style="bold white")
+        table.add_column("Stage", style="white")
+        table.add_column("p50", justify="right", style="cyan")
+        table.add_column("p95", justify="right", style="yellow")
+        table.add_column("n", justify="right", style="dim")
+        engine = self.engine_stats()
+        latency = engine['latency'] if engine is not None else {}
+        for label, name in LATENCY_ROWS:
+            snap = latency.get(name) or {'count': 0}
+            if snap['count']:
+                table.add_row(label, self.format_seconds(snap['p50']), self.format_seconds(snap['p95']), str(snap['count']))
+            else:
+                table.add_row(label, "-", "-", "0")
+        return Panel(
+            table,
+            title="[bold cyan]⏱️ Stage Latency[/bold cyan]",
+            border_style="cyan"
+        )
+
     def generate_neural_panel(self) -> Panel:
         content = None
-        if self.last_generated_rule:
-            content = Syntax(self.last_generated_rule, "yaml", theme="monokai", line_numbers=True)
+        rule = self.last_generated_rule
+        if rule:
+            # Highlighting is the most expensive renderable, only redo it for a new rule
+            if rule != self.rule_syntax_source:
+                self.rule_syntax = Syntax(rule, "yaml", theme="monokai", line_numbers=True)
+                self.rule_syntax_source = rule
+            content = self.rule_syntax
         else:
             content = Align.center(
                 Text("\n\nWaiting for threats...\nNeural Core is idle.", style="dim white"),
@@ -153,58 +271,161 @@ class KerneuralDashboard:
             border_style="magenta"
         )
 
+    def engine_stats(self):
+        """Pipeline / cache / reload / latency stats, local or as last published by the daemon."""
+        if self.attach:
+            return self.remote_stats
+        return engine_stats(self.pipeline, self.brain, self.reload_manager)
+
     def start(self):
         layout = self.make_layout()
         layout["footer"].update(Panel(Text("Press Ctrl+C to exit | Powered by eBPF & LLM", justify="center", style="italic grey50")))
 
-        with Live(layout, refresh_per_second=4, screen=True) as live:
-            # Open log file and seek to end
-            if not os.path.exists(self.log_file):
-                open(self.log_file, 'w').close()
-                
-            with open(self.log_file, 'r') as f:
-                f.seek(0, os.SEEK_END)
-                
-                while True:
-                    # Update UI Components
-                    layout["header"].update(self.generate_header())
-                    layout["left_panel"].update(self.generate_alert_table())
-                    layout["status"].update(self.generate_status_panel())
-                    layout["neural_core"].update(self.generate_neural_panel())
-                    
-                    # Read logs
-                    line = f.readline()
-                    if not line:
-                        time.sleep(0.1)
-                        continue
-                    
-                    try:
-                        log_entry = json.loads(line)
-                        self.process_event(log_entry)
-                    except json.JSONDecodeError:
-                        continue
+        with Live(layout, refresh_per_second=REFRESH_PER_SECOND, screen=True) as live:
+            if self.attach:
+                self.run_attached(layout)
+            else:
+                self.run_local(layout)
+
+    def run_attached(self, layout):
+        """Follow a daemon: render what it publishes, never analyze or deploy anything."""
+        client = FanoutClient(self.attach).connect()
+        try:
+            for message in client.messages(timeout=1.0 / REFRESH_PER_SECOND):
+                if message is not None:
+                    self.handle_message(message)
+                self.render(layout)
+        finally:
+            client.close()
+
+    def handle_message(self, message):
+        kind = message.get('type')
+        if kind == 'hello':
+            self.alerts.restore(message.get('counters') or {})
+            for alert in message.get('recent') or []:
+                self.alerts.add(AlertRecord(**alert), count=False)
+            self.mark_dirty("alerts", "status")
+        elif kind == 'event':
+            self.alerts.add(AlertRecord(**message['alert']))
+            self.mark_dirty("alerts", "status")
+        elif kind == 'analyze':
+            self.on_analyze(message, message.get('repeats', 1))
+        elif kind == 'generated':
+            self.on_rule(message, message.get('yaml'))
+        elif kind == 'deployed':
+            self.on_deployed(message, None)
+        elif kind == 'stats':
+            self.remote_stats = message
+            self.mark_dirty("status", "latency")
+        elif kind == 'dropped':
+            self.last_action = f"Console fell behind, skipped {message.get('count')} updates"
+            self.mark_dirty("status")
+
+    def run_local(self, layout):
+        # Open log file and seek to end
+        if not os.path.exists(self.log_file):
+            open(self.log_file, 'w').close()
+
+        self.reload_manager.start()
+        self.pipeline.start()
+        if self.metrics is not None:
+            # The profiler samples this thread: ingest and rendering
+            self.metrics.profiler.thread_id = threading.get_ident()
+            self.metrics.start()
+
+        # History is only displayed, the monitor resumes right after it
+        offset = self.backfill()
+
+        # Empty batches arrive on idle timeout so the clock and uptime keep ticking
+        monitor = LogMonitor(self.log_file, start_offset=offset, decoder=FalcoEvent.from_bytes)
+        try:
+            for batch in monitor.batches(idle_timeout=1.0 / REFRESH_PER_SECOND):
+                for log_entry in batch:
+                    self.process_event(log_entry)
+                self.render(layout)
+                # position is past events still waiting in later batches of the same read,
+                # or points into a log the daemon / orchestrator has just archived
+                if monitor.drained:
+                    self.summary.maybe_save(self.alerts, self.log_file, monitor.position)
+        finally:
+            if monitor.drained:
+                self.summary.save(self.alerts, self.log_file, monitor.position)
+            self.pipeline.stop()
+            self.reload_manager.stop()
+            if self.metrics is not None:
+                self.metrics.stop()
+
+    def backfill(self):
+        """Restore counters and the recent feed after a restart. Nothing here goes to the LLM."""
+        since = None
+        if self.backfill_minutes:
+            since = time.time() - self.backfill_minutes * 60
+        offset = backfill(self.alerts, self.log_file, self.summary,
+                          max_events=self.backfill_events, since=since)
+        if self.alerts.total:
+            self.last_action = f"Restored {self.alerts.total} alerts from history"
+        return offset
+
+    def mark_dirty(self, *panels):
+        with self.dirty_lock:
+            self.dirty.update(panels)
+
+    def render(self, layout, now=None):
+        """Rebuild dirty panels, at most once per refresh tick. Returns the panels rebuilt."""
+        now = time.monotonic() if now is None else now
+        if now - self.last_render < 1.0 / REFRESH_PER_SECOND:
+            return set()
+        self.last_render = now
+
+        # Clock and uptime change once per second even when nothing else happens
+        clock = int(time.time())
+        if clock != self.last_clock:
+            self.last_clock = clock
+            self.mark_dirty("header", "status", "latency")
+
+        # Swap the set out first: pipeline callbacks may mark panels while we render
+        with self.dirty_lock:
+            dirty, self.dirty = self.dirty, set()
+        if "header" in dirty:
+            layout["header"].update(self.generate_header())
+        if "alerts" in dirty:
+            layout["left_panel"].update(self.generate_alert_table())
+        if "status" in dirty:
+            layout["status"].update(self.generate_status_panel())
+        if "latency" in dirty:
+            layout["latency"].update(self.generate_latency_panel())
+        if "neural_core" in dirty:
+            layout["neural_core"].update(self.generate_neural_panel())
+        return dirty
 
     def process_event(self, log_entry):
-        self.alerts.append(log_entry)
-        priority = log_entry.get('priority')
-        
-        if priority in ['Warning', 'Error', 'Critical', 'Notice']:
-            self.status = "ANALYZING THREAT"
-            self.last_action = f"Analyzing: {log_entry.get('rule')[:30]}..."
-            
-            # Generate Rule
-            new_rule = self.brain.analyze_log_and_generate_rule(json.dumps(log_entry))
-            
-            if new_rule:
-                self.status = "GENERATING VACCINE"
-                self.last_action = "Applying new Falco rule..."
-                self.last_generated_rule = new_rule # Save for display
-                
-                self.rule_manager.add_rule(new_rule)
-                self.rule_manager.reload_falco()
-                
-                self.last_action = "System Immunized!"
-                self.status = "Monitoring"
+        self.alerts.add(log_entry)
+        self.mark_dirty("alerts", "status")
+
+        # LLM call and Falco reload run on pipeline threads, the UI loop never waits on them
+        self.pipeline.submit(log_entry)
+
+    def on_analyze(self, log_entry, repeats=1):
+        self.status = "ANALYZING THREAT"
+        self.last_action = f"Analyzing: {(log_entry.get('rule') or '')[:30]}..."
+        if repeats > 1:
+            self.last_action += f" (x{repeats})"
+        self.mark_dirty("status")
+
+    def on_rule(self, log_entry, new_rule):
+        self.status = "GENERATING VACCINE"
+        self.last_action = "Applying new Falco rule..."
+        self.last_generated_rule = new_rule # Save for display
+        self.mark_dirty("status", "neural_core")
+
+    def on_deployed(self, log_entry, new_rule):
+        # Attached consoles get this from the daemon, which keeps the log itself
+        if self.deployments is not None:
+            self.deployments.record(log_entry)
+        self.last_action = "System Immunized!"
+        if self.pipeline is None or self.pipeline.idle():
+            self.status = "Monitoring"
+        self.mark_dirty("status")
 
 if __name__ == "__main__":
     dashboard = KerneuralDashboard()
@@ -0,0 +1,128 @@
+"""
+Compact, token-budgeted event text for the rule generation prompts.
+
+A raw Falco line spends most of its tokens on things the model does not
+need to write a rule: the human readable 'output' string (every field a
+second time), hostname, tags, evt.time, uids and null ancestors like
+proc.aname[2..4]. PromptEncoder keeps the rule name, the priority and the
+output_fields rule generation uses, most useful first, without nulls or
+repeated values, and trims the least useful ones until the event fits its
+share of the token budget.
+
+See src/benchmark/prompt.py for tokens before/after on a recorded corpus.
+"""
+import json
+
+from src.blue_agent.event import FalcoEvent
+
+# output_fields worth showing the model, most useful first. Trimming drops from the end.
+RULE_FIELDS = (
+    'proc.cmdline', 'proc.name', 'fd.name', 'evt.type', 'proc.exepath', 'proc.pname',
+    'proc.pcmdline', 'user.name', 'container.name', 'container.image.repository',
+    'fd.sip', 'fd.rip', 'fd.sport', 'fd.rport', 'fd.l4proto', 'evt.arg.flags',
+    'proc.aname[2]', 'proc.aname[3]', 'proc.aname[4]', 'container.id',
+    'k8s.ns.name', 'k8s.pod.name',
+)
+# Never trimmed away or deduplicated, only shortened
+KEEP_FIELDS = ('proc.cmdline', 'proc.name', 'fd.name')
+NULL_VALUES = (None, '', '<NA>', 'N/A')
+
+# Rough size of a Gemini token; good enough to budget, not to bill
+CHARS_PER_TOKEN = 4
+DEFAULT_BUDGET = 2000
+MIN_VALUE_CHARS = 32
+
+
+def count_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _decode(log_entry):
+    if isinstance(log_entry, FalcoEvent):
+        return log_entry.rule, log_entry.priority, log_entry.fields
+    if isinstance(log_entry, (str, bytes)):
+        try:
+            log_entry = json.loads(log_entry)
+        except (TypeError, ValueError):
+            return None
+    if not isinstance(log_entry, dict):
+        return None
+    return log_entry.get('rule'), log_entry.get('priority'), log_entry.get('output_fields') or {}
+
+
+def _dumps(rule, priority, fields):
+    return json.dumps({'rule': rule, 'priority': priority, 'output_fields': fields},
+                      separators=(',', ':'), ensure_ascii=False)
+
+
+class PromptEncoder:
+    """
+    encode() one event for RULE_GENERATION_PROMPT, encode_batch() several for
+    BATCH_RULE_GENERATION_PROMPT; `budget` is the token budget of the events
+    in one request.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, fields=RULE_FIELDS):
+        self.budget = budget
+        self.fields = fields
+        # Part of the rule cache key: a different projection is a different prompt
+        self.signature = f"{','.join(fields)}|{budget}"
+
+    def project(self, fields):
+        """
+        Ordered (name, value) pairs: known fields only, no nulls. A field
+        outside KEEP_FIELDS that repeats an earlier value (container.id ==
+        container.name == "host") is dropped; proc.name stays even when it
+        equals proc.cmdline, rules condition on it.
+        """
+        kept = []
+        seen = set()
+        for name in self.fields:
+            value = fields.get(name)
+            if value in NULL_VALUES:
+                continue
+            key = str(value)
+            if key in seen and name not in KEEP_FIELDS:
+                continue
+            seen.add(key)
+            kept.append((name, value))
+        return kept
+
+    def encode(self, log_entry, budget=None):
+        budget = self.budget if budget is None else budget
+        decoded = _decode(log_entry)
+        if decoded is None:
+            # Not an event: hand it over as is rather than lose it
+            return log_entry if isinstance(log_entry, str) else str(log_entry)
+        rule, priority, fields = decoded
+        kept = self.project(fields)
+
+        text = _dumps(rule, priority, dict(kept))
+        limit = budget * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text
+
+        # Over budget: drop the least useful fields, then shorten the longest values
+        for i in range(len(kept) - 1, -1, -1):
+            if kept[i][0] in KEEP_FIELDS:
+                continue
+            del kept[i]
+            text = _dumps(rule, priority, dict(kept))
+            if len(text) <= limit:
+                return text
+
+        fields = dict(kept)
+        while len(text) > limit:
+            longest = max(fields, key=lambda name: len(str(fields[name])), default=None)
+            value = str(fields[longest]) if longest is not None else ""
+            if len(value) <= MIN_VALUE_CHARS + 3:
+                break
+            keep = max(MIN_VALUE_CHARS, len(value) - (len(text) - limit) - 3)
+            fields[longest] = value[:keep] + "..."
+            text = _dumps(rule, priority, fields)
+        return text
+
+    def encode_batch(self, log_entries):
+        """One text per event, sharing the request budget evenly."""
+        share = max(self.budget // max(len(log_entries), 1), 1)
+        return [self.encode(entry, share) for entry in log_entries]
@@ -1,33 +1,183 @@
+import json
 import os
+import re
+import time
+import yaml
 import google.generativeai as genai
 from dotenv import load_dotenv
-from src.neural_core.prompts import SYSTEM_PROMPT, RULE_GENERATION_PROMPT
+from src.blue_agent.dedup import event_signature
+from src.neural_core.encoder import PromptEncoder
+from src.neural_core.prompts import SYSTEM_PROMPT, RULE_GENERATION_PROMPT, BATCH_RULE_GENERATION_PROMPT
+from src.neural_core.rule_cache import RuleCache, cache_key
+from src.neural_core.templates import RuleSynthesizer
+from src.utils.metrics import histogram
 
 
 load_dotenv()
 
+MODEL_NAME = 'gemini-2.5-flash'
+MAX_BATCH_SIZE = 10
+LLM_SECONDS = histogram('kerneural_llm_request_seconds')
+
+_EVENT_HEADER = re.compile(r"^#{2,3}\s*EVENT\s+(\d+)\s*:?\s*$", re.MULTILINE | re.IGNORECASE)
+
 class NeuralBrain:
-    def __init__(self):
+    def __init__(self, cache=None, use_cache=True, synthesizer=None, use_templates=True, encoder=None):
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in .env")
-        
+
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model_name = MODEL_NAME
+        self.model = genai.GenerativeModel(self.model_name)
+
+        # Rule cache: same signature + same prompt + same model -> same rule, skip the LLM
+        if cache is None and use_cache:
+            cache = RuleCache()
+        self.cache = cache
+
+        # Template fast path: common alert families never reach the LLM
+        if synthesizer is None and use_templates:
+            synthesizer = RuleSynthesizer()
+        self.synthesizer = synthesizer
+
+        # Projected, token-budgeted event text instead of the raw Falco line
+        self.encoder = encoder or PromptEncoder()
+
+    def _cache_key(self, log_entry):
+        """
+        Cache key of one event. Rules come from either prompt (single or
+        batch), so both templates are part of the key: editing either one
+        invalidates what it may have generated.
+        """
+        try:
+            event = json.loads(log_entry)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(event, dict):
+            return None
+        prompts = RULE_GENERATION_PROMPT + BATCH_RULE_GENERATION_PROMPT + self.encoder.signature
+        return cache_key(event_signature(event), prompts, self.model_name)
 
     def analyze_log_and_generate_rule(self, log_entry):
         # gui log len gemini va nhan ve Falco rule YAML
+        if self.synthesizer is not None:
+            rule = self.synthesizer.synthesize(log_entry)
+            if rule:
+                return rule
+        return self._generate_rule(log_entry)
 
+    def _generate_rule(self, log_entry):
+        key = self._cache_key(log_entry) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                return cached
 
-        prompt = RULE_GENERATION_PROMPT.format(log_json = log_entry)
+        prompt = RULE_GENERATION_PROMPT.format(log_json = self.encoder.encode(log_entry))
 
         try:
+            started = time.perf_counter()
             response = self.model.generate_content(prompt)
-            return self.clean_response(response.text)
+            LLM_SECONDS.observe(time.perf_counter() - started)
+            rule = self.clean_response(response.text)
         except Exception as e:
             print(f"Error generating rule: {e}")
             return None
-        
+
+        if self.synthesizer is not None:
+            self.synthesizer.record_llm_latency(time.perf_counter() - started)
+        if key and rule:
+            self.cache.record_miss_latency(time.perf_counter() - started)
+            self.cache.put(key, rule)
+        return rule
+
+    def analyze_logs_and_generate_rules(self, log_entries, max_batch=MAX_BATCH_SIZE):
+        """
+        Batch version of analyze_log_and_generate_rule.
+        Takes a list of JSON log strings and returns a list of the same length
+        with one rule YAML (or None) per event. Template and cached events are answered
+        locally; the rest are sent up to `max_batch` per request.
+        """
+        rules = [None] * len(log_entries)
+        keys = [None] * len(log_entries)
+        pending = []
+
+        for i, log_entry in enumerate(log_entries):
+            if self.synthesizer is not None:
+                rules[i] = self.synthesizer.synthesize(log_entry)
+                if rules[i]:
+                    continue
+            key = self._cache_key(log_entry) if self.cache else None
+            keys[i] = key
+            if key:
+                cached = self.cache.get(key)
+                if cached:
+                    rules[i] = cached
+                    continue
+            pending.append(i)
+
+        for start in range(0, len(pending), max_batch):
+            chunk = pending[start:start + max_batch]
+            if len(chunk) == 1:
+                rules[chunk[0]] = self._generate_rule(log_entries[chunk[0]])
+                continue
+
+            encoded = self.encoder.encode_batch([log_entries[i] for i in chunk])
+            events_block = "\n\n".join(f"EVENT {n}:\n{text}" for n, text in enumerate(encoded, 1))
+            prompt = BATCH_RULE_GENERATION_PROMPT.format(count=len(chunk), events_block=events_block)
+            try:
+                started = time.perf_counter()
+                response = self.model.generate_content(prompt)
+                LLM_SECONDS.observe(time.perf_counter() - started)
+                parsed = self.split_batch_response(response.text, len(chunk))
+            except Exception as e:
+                print(f"Error generating batch rules: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            if self.synthesizer is not None:
+                self.synthesizer.record_llm_latency(elapsed / len(chunk))
+
+            for i, rule in zip(chunk, parsed):
+                rules[i] = rule
+                if rule and keys[i]:
+                    self.cache.record_miss_latency(elapsed / len(chunk))
+                    self.cache.put(keys[i], rule)
+
+        return rules
+
+    def split_batch_response(self, text, count):
+        """
+        Split a batch response into `count` rules by its '### EVENT <n>' headers.
+        A malformed or missing section becomes None without affecting the others.
+        """
+        rules = [None] * count
+        headers = list(_EVENT_HEADER.finditer(text))
+        for pos, match in enumerate(headers):
+            n = int(match.group(1))
+            if not 1 <= n <= count:
+                continue
+            end = headers[pos + 1].start() if pos + 1 < len(headers) else len(text)
+            body = self.clean_response(text[match.end():end])
+            if not body or body.upper() == "SKIP":
+                continue
+            if self._looks_like_rule(body):
+                rules[n - 1] = body
+            else:
+                print(f"Discarding malformed rule for batch event {n}")
+        return rules
+
+    def _looks_like_rule(self, rule_yaml):
+        try:
+            data = yaml.safe_load(rule_yaml)
+        except yaml.YAMLError:
+            return False
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list) or not data:
+            return False
+        return all(isinstance(item, dict) and 'rule' in item and 'condition' in item for item in data)
+
     def clean_response(self, text):
         """
         Làm sạch response để chỉ lấy nội dung YAML.
@@ -40,4 +190,4 @@ class NeuralBrain:
             text = text.replace("```", "", 1)
         if text.endswith("```"):
             text = text[:-3]
-        return text.strip()
\ No newline at end of file
+        return text.strip()
@@ -35,4 +35,40 @@ EXAMPLE OUTPUT FORMAT:
   condition: spawned_process and proc.name = "sh" and proc.cmdline = "sh -c whoami"
   output: "Detected malicious activity (user=%user.name command=%proc.cmdline container=%container.name id=%container.id)"
   priority: WARNING
-"""
\ No newline at end of file
+"""
+
+# Template cho yêu cầu sinh nhiều rule trong một lần gọi (batch)
+BATCH_RULE_GENERATION_PROMPT = """
+Below are {count} Falco log events, each introduced by a line "EVENT <n>:".
+For EACH event, generate one YAML Falco rule to DETECT that specific activity.
+
+{events_block}
+
+RESPONSE FORMAT (STRICT):
+- For every event write a header line "### EVENT <n>" (same number as the input), followed by the YAML rule for that event.
+- Answer every event, in order. If you cannot write a rule for an event, write "SKIP" under its header.
+- No markdown code fences, no explanation outside the rules.
+
+REQUIREMENTS FOR EACH RULE:
+1. The rule must detect the specific process and file/network activity mentioned in its log.
+2. Set priority to 'WARNING'.
+3. DO NOT include an 'actions' field. Standard Falco does not support it directly in rules.
+4. For the 'output' field:
+   - Use %field syntax (e.g., %user.name, %proc.cmdline).
+   - DO NOT use trailing % (e.g., %user.name% is INVALID).
+   - DO NOT use brackets [] immediately after a field (e.g., %container.name[%container.id] is INVALID).
+5. Rule names must be unique across the whole response and descriptive.
+6. CRITICAL: The 'condition' field MUST start with 'spawned_process' if it involves process execution.
+   - DO NOT use undefined macros like 'spawn_shell', 'spawn_process' (singular), or 'execve' alone.
+7. CRITICAL: DO NOT use the macro 'in_container'. It is undefined. Use 'container' or 'container.id != host' instead.
+
+EXAMPLE OUTPUT FORMAT:
+### EVENT 1
+- rule: Rule Name One
+  desc: Description
+  condition: spawned_process and proc.name = "sh" and proc.cmdline = "sh -c whoami"
+  output: "Detected malicious activity (user=%user.name command=%proc.cmdline container=%container.name)"
+  priority: WARNING
+### EVENT 2
+SKIP
+"""
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RULE_CACHE_PATH = "logs/rule_cache.db"
+# L1 hits are written back to sqlite last_used in batches of this many keys
+TOUCH_BATCH = 64
+
+
+def cache_key(signature, prompt_template, model_name):
+    """Key = event signature + hash of the prompt template + model name.
+    Changing the prompt or the model invalidates old entries automatically."""
+    prompt_hash = hashlib.sha1(prompt_template.encode("utf-8")).hexdigest()[:16]
+    return hashlib.sha1(f"{signature}|{prompt_hash}|{model_name}".encode("utf-8")).hexdigest()
+
+
+class RuleCache:
+    """
+    Two-level cache for generated Falco rules.
+
+    - L1: in-memory LRU (OrderedDict) of `memory_size` entries.
+    - L2: sqlite file with TTL and size-based eviction (least recently used first).
+      L1 hits are written back to its last_used in batches (and before every
+      eviction), so the hottest keys are not the first ones L2 drops.
+
+    Thread safe: the pipeline calls it from several analysis workers.
+    """
+
+    def __init__(self, path=RULE_CACHE_PATH, memory_size=256, max_entries=5000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.memory = OrderedDict()
+        # key -> last L1 hit not yet written to sqlite
+        self.touched = {}
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        # Average cost of a miss (LLM round trip), used to estimate saved latency
+        self.miss_seconds = 0.0
+        self.miss_samples = 0
+
+        self.db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS rules ("
+                " key TEXT PRIMARY KEY, rule TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS rules_last_used ON rules(last_used)")
+            self.db.commit()
+
+    # ------------------------------------------------------------------
+    def _remember(self, key, rule, created):
+        self.memory[key] = (rule, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get(self, key, now=None):
+        if now is None:
+            now = time.time()
+        with self.lock:
+            item = self.memory.get(key)
+            if item is not None:
+                rule, created = item
+                if now - created < self.ttl:
+                    self.memory.move_to_end(key)
+                    self.memory_hits += 1
+                    if self.db is not None:
+                        self.touched[key] = now
+                        if len(self.touched) >= TOUCH_BATCH:
+                            self._flush_touched()
+                            self.db.commit()
+                    return rule
+                del self.memory[key]
+
+            if self.db is not None:
+                row = self.db.execute("SELECT rule, created FROM rules WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    rule, created = row
+                    if now - created < self.ttl:
+                        self.db.execute("UPDATE rules SET last_used = ? WHERE key = ?", (now, key))
+                        self.db.commit()
+                        self._remember(key, rule, created)
+                        self.disk_hits += 1
+                        return rule
+                    self.db.execute("DELETE FROM rules WHERE key = ?", (key,))
+                    self.db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key, rule, now=None):
+        if now is None:
+            now = time.time()
+        with self.lock:
+            self._remember(key, rule, now)
+            self.stores += 1
+            if self.db is None:
+                return
+            self.db.execute(
+                "INSERT OR REPLACE INTO rules (key, rule, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, rule, now, now),
+            )
+            self._flush_touched()
+            self._evict(now)
+            self.db.commit()
+
+    def _flush_touched(self):
+        if not self.touched:
+            return
+        self.db.executemany("UPDATE rules SET last_used = MAX(last_used, ?) WHERE key = ?",
+                            [(used, key) for key, used in self.touched.items()])
+        self.touched.clear()
+
+    def _evict(self, now):
+        cur = self.db.execute("DELETE FROM rules WHERE created <= ?", (now - self.ttl,))
+        self.evictions += max(cur.rowcount, 0)
+        count = self.db.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+        if count > self.max_entries:
+            cur = self.db.execute(
+                "DELETE FROM rules WHERE key IN (SELECT key FROM rules ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+    def record_miss_latency(self, seconds):
+        with self.lock:
+            self.miss_seconds += seconds
+            self.miss_samples += 1
+
+    def stats(self):
+        with self.lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            avg_miss = self.miss_seconds / self.miss_samples if self.miss_samples else 0.0
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'avg_miss_seconds': avg_miss,
+                'saved_seconds': hits * avg_miss,
+            }
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self._flush_touched()
+                self.db.commit()
+                self.db.close()
+                self.db = None
@@ -0,0 +1,272 @@
+"""
+Deterministic fast path in front of the LLM.
+
+Most alerts belong to a few families that always get the same kind of rule:
+sensitive file reads (/etc/shadow, /etc/passwd, ...), scripts dropped in
+/tmp, recon commands (whoami, id, uname, ...) and shells in a container.
+For those, RuleSynthesizer fills a parameterized template from the event's
+rule, tags and output_fields in microseconds; NeuralBrain only asks Gemini
+for events no template covers.
+
+Templates only use fields the event actually carries (plus the macros
+src/blue_agent/rule_evaluator.py knows), so a synthesized rule always
+matches the alert it was made for and passes RuleManager.validate_rule().
+
+    python -m src.neural_core.templates logs/falco_events.json.backup
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import yaml
+
+from src.blue_agent.condition import And, Macro, Pred, format_condition
+from src.blue_agent.event import FalcoEvent
+
+SENSITIVE_FILES = ('/etc/shadow', '/etc/gshadow', '/etc/passwd', '/etc/sudoers',
+                   '/etc/master.passwd', '/etc/security/opasswd')
+SENSITIVE_PREFIXES = ('/etc/sudoers.d/', '/root/.ssh/', '/etc/ssh/ssh_host_')
+SHELLS = ('sh', 'bash', 'dash', 'ash', 'zsh', 'ksh', 'csh', 'tcsh', 'busybox')
+RECON_COMMANDS = ('whoami', 'id', 'uname', 'hostname', 'groups', 'who', 'w', 'last',
+                  'ps', 'netstat', 'ss', 'ifconfig', 'ip', 'arp', 'route', 'env',
+                  'printenv', 'lsb_release', 'getent')
+TMP_PATH = re.compile(r"(?:/tmp|/var/tmp|/dev/shm)/[\w.\-]+(?:/[\w.\-]+)*")
+
+PRIORITY = 'WARNING'
+OUTPUT_FIELDS = "user=%user.name command=%proc.cmdline container=%container.name id=%container.id"
+MAX_NAME_CMDLINE = 60
+_Dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+def _program(fields):
+    """Process name from proc.name, or the first word of proc.cmdline."""
+    name = fields.get('proc.name')
+    if name:
+        return name
+    cmdline = fields.get('proc.cmdline') or ""
+    words = cmdline.split()
+    return os.path.basename(words[0]) if words else None
+
+
+def _shell_command(fields):
+    """The command of `sh -c <command>`, else None."""
+    words = (fields.get('proc.cmdline') or "").split(None, 2)
+    if len(words) == 3 and os.path.basename(words[0]) in SHELLS and words[1] == '-c':
+        return words[2]
+    return None
+
+
+def _is_sensitive(path):
+    return path in SENSITIVE_FILES or path.startswith(SENSITIVE_PREFIXES)
+
+
+def _container_term(fields):
+    container_id = fields.get('container.id')
+    if container_id and container_id != 'host':
+        return Macro('container')
+    if fields.get('container.name') and fields['container.name'] != 'host':
+        return Pred('container.name', '=', fields['container.name'])
+    return None
+
+
+def _process_terms(fields, cmdline=True):
+    terms = []
+    if fields.get('proc.name'):
+        terms.append(Pred('proc.name', '=', fields['proc.name']))
+    if cmdline and fields.get('proc.cmdline'):
+        terms.append(Pred('proc.cmdline', '=', fields['proc.cmdline']))
+    return terms
+
+
+def _short(text):
+    text = " ".join(str(text).split())
+    return text if len(text) <= MAX_NAME_CMDLINE else text[:MAX_NAME_CMDLINE - 3] + "..."
+
+
+# ----------------------------------------------------------------------
+# Templates: (event, fields, tags) -> (name, desc, terms, output) or None
+# ----------------------------------------------------------------------
+def sensitive_file(event, fields, tags):
+    path = fields.get('fd.name')
+    if path and (_is_sensitive(path) or 'mitre_credential_access' in tags):
+        program = _program(fields) or "process"
+        terms = [Macro('open_read'), Pred('fd.name', '=', path)] + _process_terms(fields, cmdline=False)
+        return (f"Sensitive file {path} read by {program}",
+                f"Detects {program} opening {path} for reading (credential access).",
+                terms,
+                f"Sensitive file read (file=%fd.name process=%proc.name {OUTPUT_FIELDS})")
+
+    # Process events only carry the command line: "cat /etc/shadow"
+    cmdline = fields.get('proc.cmdline') or ""
+    paths = [w for w in cmdline.split() if _is_sensitive(w)]
+    if not paths:
+        return None
+    program = _program(fields)
+    terms = [Macro('spawned_process')] + _process_terms(fields, cmdline=False)
+    terms.append(Pred('proc.cmdline', 'contains', paths[0]))
+    return (f"Sensitive file {paths[0]} accessed by {program}",
+            f"Detects {program} started with {paths[0]} on its command line (credential access).",
+            terms,
+            f"Sensitive file access ({OUTPUT_FIELDS})")
+
+
+def tmp_script(event, fields, tags):
+    match = TMP_PATH.search(fields.get('proc.cmdline') or "")
+    if not match:
+        return None
+    path = match.group(0)
+    program = _program(fields)
+    terms = [Macro('spawned_process')]
+    if fields.get('proc.name'):
+        terms.append(Pred('proc.name', '=', fields['proc.name']))
+    terms.append(Pred('proc.cmdline', 'contains', path))
+    return (f"Script {path} used by {program}",
+            f"Detects {program} writing or running {path}, a script dropped in a temporary directory.",
+            terms,
+            f"Script activity in temporary directory ({OUTPUT_FIELDS})")
+
+
+def recon_command(event, fields, tags):
+    program = _program(fields)
+    inner = _shell_command(fields)
+    if program and (program in RECON_COMMANDS or ('mitre_discovery' in tags and program not in SHELLS)):
+        command = program
+    elif inner and os.path.basename(inner.split()[0]) in RECON_COMMANDS:
+        command = os.path.basename(inner.split()[0])
+    else:
+        return None
+    terms = [Macro('spawned_process')] + _process_terms(fields)
+    return (f"Reconnaissance command {_short(fields.get('proc.cmdline') or command)}",
+            f"Detects the discovery command {command} being run.",
+            terms,
+            f"Reconnaissance command executed ({OUTPUT_FIELDS})")
+
+
+def shell(event, fields, tags):
+    program = _program(fields)
+    if program not in SHELLS:
+        return None
+    terms = [Macro('spawned_process')] + _process_terms(fields)
+    if _shell_command(fields) is None and fields.get('proc.pname'):
+        # Interactive shell: the parent (runc, containerd-shim, sshd) is what tells it apart
+        terms.append(Pred('proc.pname', '=', fields['proc.pname']))
+    return (f"Shell {_short(fields.get('proc.cmdline') or program)}",
+            f"Detects the shell {program} started with this command line.",
+            terms,
+            f"Shell spawned ({OUTPUT_FIELDS})")
+
+
+# First match wins: a shell running `cat /etc/shadow` is a sensitive read
+TEMPLATES = (
+    ('sensitive_file', sensitive_file),
+    ('tmp_script', tmp_script),
+    ('recon_command', recon_command),
+    ('shell', shell),
+)
+
+
+class RuleSynthesizer:
+    """
+    Template rules for common alert families, with hit ratio and latency
+    saved. Thread safe: the pipeline calls it from several analysis workers.
+    """
+
+    def __init__(self, templates=TEMPLATES):
+        self.templates = templates
+        self.lock = threading.Lock()
+
+        self.hits = {name: 0 for name, _ in templates}
+        self.misses = 0
+        self.synth_seconds = 0.0
+        # Cost of the LLM on fallbacks, used to estimate saved latency
+        self.llm_seconds = 0.0
+        self.llm_samples = 0
+
+    def match(self, event):
+        """(template name, rule dict) for a decoded event, or (None, None)."""
+        if isinstance(event, FalcoEvent):
+            fields, tags = event.fields, event.tags
+        else:
+            fields, tags = event.get('output_fields') or {}, event.get('tags') or []
+        for name, template in self.templates:
+            filled = template(event, fields, set(tags))
+            if filled is None:
+                continue
+            rule_name, desc, terms, output = filled
+            container = _container_term(fields)
+            if container is not None:
+                terms.insert(1, container)
+            return name, {
+                'rule': rule_name,
+                'desc': desc,
+                'condition': format_condition(And(terms)),
+                'output': output,
+                'priority': PRIORITY,
+            }
+        return None, None
+
+    def synthesize(self, log_entry):
+        """Rule YAML for a JSON log string or event dict, or None if no template applies."""
+        started = time.perf_counter()
+        event = log_entry
+        if isinstance(log_entry, (str, bytes)):
+            try:
+                event = json.loads(log_entry)
+            except (TypeError, ValueError):
+                event = None
+        name, rule = self.match(event) if isinstance(event, (dict, FalcoEvent)) else (None, None)
+        rule_yaml = None
+        if rule is not None:
+            rule_yaml = yaml.dump([rule], Dumper=_Dumper, sort_keys=False, width=1000).strip()
+
+        with self.lock:
+            self.synth_seconds += time.perf_counter() - started
+            if name is None:
+                self.misses += 1
+            else:
+                self.hits[name] += 1
+        return rule_yaml
+
+    def record_llm_latency(self, seconds):
+        with self.lock:
+            self.llm_seconds += seconds
+            self.llm_samples += 1
+
+    def stats(self):
+        with self.lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            avg_llm = self.llm_seconds / self.llm_samples if self.llm_samples else 0.0
+            avg_synth = self.synth_seconds / lookups if lookups else 0.0
+            return {
+                'hits': hits,
+                'misses': self.misses,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'by_template': {name: n for name, n in self.hits.items() if n},
+                'avg_synth_seconds': avg_synth,
+                'avg_llm_seconds': avg_llm,
+                'saved_seconds': hits * max(avg_llm - avg_synth, 0.0),
+            }
+
+
+def coverage(path, synthesizer=None):
+    """Run every event of a Falco log through the templates; returns stats()."""
+    synthesizer = synthesizer or RuleSynthesizer()
+    with open(path, 'rb') as f:
+        for line in f:
+            event = FalcoEvent.from_bytes(line.rstrip(b"\n")) if line.strip() else None
+            if event is not None:
+                synthesizer.synthesize(event)
+    return synthesizer.stats()
+
+
+if __name__ == "__main__":
+    corpus = sys.argv[1] if len(sys.argv) > 1 else "logs/falco_events.json.backup"
+    stats = coverage(corpus)
+    print(f"{stats['hits']}/{stats['hits'] + stats['misses']} events covered by templates "
+          f"({stats['hit_ratio']:.0%}), {stats['avg_synth_seconds'] * 1e6:.0f}us per event")
+    for name, n in sorted(stats['by_template'].items(), key=lambda item: -item[1]):
+        print(f"  {name:<16} {n}")
@@ -1,66 +1,129 @@
 import time
 import json
 import os
+import threading
 from rich.console import Console
 from rich.live import Live
 from rich.table import Table
 
-from src.blue_agent.monitor import LogMonitor # Cần implement class này để tail file log
+from src.blue_agent.archive import ARCHIVE_DIR, EventArchive
+from src.blue_agent.backfill import tail_events
+from src.blue_agent.correlation import DEPLOY_LOG, DeploymentLog
+from src.blue_agent.event import FalcoEvent
+from src.blue_agent.monitor import LogMonitor
+from src.blue_agent.pipeline import AnalysisPipeline
+from src.blue_agent.reload_manager import FalcoReloadManager
+from src.blue_agent.rule_evaluator import load_preflight
 from src.blue_agent.rule_manager import RuleManager
 from src.neural_core.gemini_client import NeuralBrain
+from src.utils.metrics import METRICS_PORT, MetricsServer, SamplingProfiler
 
 
 console = Console()
 class KerneuralOrchestrator:
-    def __init__(self):
-        self.brain = NeuralBrain()
-        self.rule_manager = RuleManager()
-        self.log_file = "logs/falco_events.json"
+    def __init__(self, workers=4, batch_size=1, brain=None, rule_manager=None,
+                 log_file="logs/falco_events.json", verbose=True, backfill_events=0,
+                 metrics_port=METRICS_PORT, deploy_log=DEPLOY_LOG, archive_dir=ARCHIVE_DIR):
+        # brain / rule_manager can be replaced by stand-ins (see src/benchmark)
+        self.brain = brain or NeuralBrain()
+        self.reload_manager = FalcoReloadManager()
+        self.rule_manager = rule_manager or RuleManager(
+            reload_manager=self.reload_manager,
+            preflight=load_preflight(),
+        )
+        self.log_file = log_file
+        self.verbose = verbose
+        self.backfill_events = backfill_events
+        self.monitor = None
+        # Deployed rules with their triggering event, for time-to-rule in src/blue_agent/correlation.py
+        self.deployments = DeploymentLog(deploy_log) if deploy_log else None
+        # This tailer owns rolling the live log into compressed segments (src/blue_agent/archive.py);
+        # dashboards never roll
+        self.archive = EventArchive(archive_dir) if archive_dir else None
+        # Prometheus text on http://127.0.0.1:<port>/metrics, profiler under /profile
+        self.metrics = MetricsServer(metrics_port, profiler=SamplingProfiler()) if metrics_port else None
+
+        # ingest -> filter -> N analysis workers -> 1 deploy thread
+        self.pipeline = AnalysisPipeline(
+            self.brain,
+            self.rule_manager,
+            workers=workers,
+            batch_size=batch_size,
+            on_analyze=self.on_analyze,
+            on_rule=self.on_rule,
+            on_deployed=self.on_deployed,
+        )
 
     def start(self):
         console.print("[bold green]Kerneural System Started...[/bold green]")
-
-
-
-        with open(self.log_file,'r') as f:
-            # di chuyen den cuoi file
-            f.seek(0, os.SEEK_END)
-
-            while True:
-                line = f.readline()
-                if not line:
-                    time.sleep(0.5)
-                    continue
-                try:
-                    log_entry = json.loads(line)
+        self.reload_manager.start()
+        self.pipeline.start()
+        if self.metrics is not None:
+            # The profiler samples this thread: the ingest loop
+            self.metrics.profiler.thread_id = threading.get_ident()
+            self.metrics.start()
+
+        # Tail log file tu cuoi, doc theo batch khi co su kien inotify
+        self.monitor = LogMonitor(self.log_file, start_offset=self.backfill(),
+                                  decoder=FalcoEvent.from_bytes)
+        try:
+            for batch in self.monitor.batches():
+                for log_entry in batch:
                     self.process_event(log_entry)
-                except json.JSONDecodeError:
-                    continue
-
+                if self.archive is not None:
+                    self.archive.maybe_roll(self.log_file)
+        finally:
+            if self.archive is not None:
+                self.archive.wait()
+            self.pipeline.stop()
+            self.reload_manager.stop()
+            if self.metrics is not None:
+                self.metrics.stop()
+
+    def backfill(self):
+        """Print the last events before tailing. They are history only and never reach the pipeline."""
+        if not self.backfill_events or not os.path.exists(self.log_file):
+            return None
+        entries, offset = tail_events(self.log_file, max_events=self.backfill_events)
+        if self.verbose:
+            for _, log_entry in entries:
+                console.print(f"[dim]HISTORY: {log_entry.get('rule')} ({log_entry.get('priority')})[/dim]")
+        return offset
+
+    def stop(self):
+        if self.monitor is not None:
+            self.monitor.stop()
 
     def process_event(self, log_entry):
         priority = log_entry.get('priority')
         rule_name=log_entry.get('rule')
 
-        console.print(f"[red]ALERT:[/red] {rule_name} ({priority})")
-
-        # chi xu ly cac canh bao quan trong va chu aco trong whitelist
+        if self.verbose:
+            console.print(f"[red]ALERT:[/red] {rule_name} ({priority})")
 
-        if priority in ['Warning', 'Error', 'Critical', 'Notice']:
-            console.print("[yellow]Analyzing threat with Gemini...[/yellow]")
+        # chi dua vao hang doi, phan tich chay o worker thread nen khong chan viec doc log
+        if not self.pipeline.submit(log_entry) and self.verbose:
+            console.print("[dim]Pipeline full, event dropped[/dim]")
 
-            #1. Gui Ai sinh rule
-            new_rule=self.brain.analyze_log_and_generate_rule(json.dumps(log_entry))
-            if new_rule:
-                console.print(f"[cyan]Generated Vaccine:[/cyan]\n{new_rule}")
+    def on_analyze(self, log_entry, repeats=1):
+        if not self.verbose:
+            return
+        seen = f" (seen {repeats}x)" if repeats > 1 else ""
+        console.print(f"[yellow]Analyzing threat with Gemini...[/yellow] {log_entry.get('rule')}{seen}")
 
-                #2. apply rule
-                self.rule_manager.add_rule(new_rule)
-                self.rule_manager.reload_falco()
+    def on_rule(self, log_entry, new_rule):
+        if not self.verbose:
+            return
+        console.print(f"[cyan]Generated Vaccine:[/cyan]\n{new_rule}")
 
-                console.print("[bold green]System Immunized![/bold green]")
+    def on_deployed(self, log_entry, new_rule):
+        if self.deployments is not None:
+            self.deployments.record(log_entry)
+        if not self.verbose:
+            return
+        console.print("[bold green]System Immunized![/bold green]")
 
 
 if __name__ == "__main__":
     app=KerneuralOrchestrator()
-    app.start()
\ No newline at end of file
+    app.start()
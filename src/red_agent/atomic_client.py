@@ -1,62 +1,412 @@
-import yaml
+"""
+Atomic Red Team tests from a local mirror, with an optional network refresh.
+
+The mirror is a checkout of redcanaryco/atomic-red-team (or just its atomics/
+directory) or a tarball of it, e.g. the GitHub archive. Every Linux test is
+parsed once into an AtomicIndex and saved to INDEX_PATH; later runs load the
+index instead of touching YAML, and rebuild it only when the mirror changes.
+
+Index file: HEADER (magic, version, payload length) + zlib-compressed compact
+JSON. Tests are stored as rows (see FIELDS); lookups by technique, tactic and
+executor are rebuilt in memory on load.
+
+Techniques missing from the mirror can be fetched from GitHub into CACHE_DIR
+(same layout as atomics/) with conditional requests on a pooled session, so
+refreshing an unchanged technique costs one 304.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import struct
+import tarfile
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
 import requests
-from typing import List, Dict, Any
+import yaml
+
+MIRROR_PATH = os.getenv("ATOMICS_MIRROR", "atomics")
+CACHE_DIR = "logs/atomics"
+INDEX_PATH = "logs/atomic_index.bin"
+
+HEADER = struct.Struct("<4sHI")
+MAGIC = b"KNAI"
+VERSION = 1
+
+FIELDS = ('technique', 'name', 'guid', 'description', 'executor', 'command', 'cleanup', 'arguments', 'elevation')
+TECHNIQUE_FILE = re.compile(r"(?:^|/)(T\d{4}(?:\.\d{3})?)/\1\.yaml$")
+ARGUMENT = re.compile(r"#\{([^}]+)\}")
+
+# libyaml when available, ~10x faster than the pure Python loader
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def substitute(template, values):
+    """Replace every #{name} in one pass; unknown names are left as they are."""
+    if not template or '#{' not in template:
+        return template
+    return ARGUMENT.sub(lambda m: str(values[m.group(1)]) if m.group(1) in values else m.group(0), template)
+
+
+def parse_technique(data):
+    """Linux tests of one technique YAML as rows in FIELDS order, plus the technique name."""
+    technique = data.get('attack_technique')
+    rows = []
+    for test in data.get('atomic_tests') or []:
+        if 'linux' not in (test.get('supported_platforms') or []):
+            continue
+        executor = test.get('executor') or {}
+        arguments = {name: (spec or {}).get('default', 'test_value')
+                     for name, spec in (test.get('input_arguments') or {}).items()}
+        rows.append([
+            technique,
+            test.get('name'),
+            test.get('auto_generated_guid'),
+            test.get('description') or "",
+            executor.get('name'),
+            (executor.get('command') or "").strip(),
+            (executor.get('cleanup_command') or "").strip(),
+            arguments,
+            bool(executor.get('elevation_required')),
+        ])
+    return data.get('display_name'), rows
+
+
+def _parse_tactics(text):
+    """technique -> [tactic] from Indexes/Indexes-CSV/linux-index.csv."""
+    tactics = {}
+    for row in csv.DictReader(io.StringIO(text)):
+        technique, tactic = row.get('Technique #'), row.get('Tactic')
+        if technique and tactic and tactic not in tactics.setdefault(technique, []):
+            tactics[technique].append(tactic)
+    return tactics
+
+
+def _atomics_dir(path):
+    nested = os.path.join(path, 'atomics')
+    return nested if os.path.isdir(nested) else path
+
+
+def source_signature(path):
+    """Cheap change detector: size + mtime for a tarball, newest technique YAML for a directory."""
+    if os.path.isfile(path):
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    count, newest = 0, 0
+    for entry in os.scandir(_atomics_dir(path)):
+        if entry.is_dir() and entry.name.startswith('T'):
+            try:
+                mtime = os.stat(os.path.join(entry.path, entry.name + '.yaml')).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            count += 1
+            newest = max(newest, mtime)
+    return [count, newest]
+
+
+def iter_source(path):
+    """Yield (technique YAML text | None, tactics CSV text | None) from a directory or tarball."""
+    if os.path.isfile(path):
+        with tarfile.open(path, 'r:*') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                if TECHNIQUE_FILE.search(member.name):
+                    yield tar.extractfile(member).read().decode('utf-8'), None
+                elif member.name.endswith('Indexes-CSV/linux-index.csv'):
+                    yield None, tar.extractfile(member).read().decode('utf-8')
+        return
+    atomics = _atomics_dir(path)
+    for entry in sorted(os.scandir(atomics), key=lambda e: e.name):
+        if entry.is_dir() and entry.name.startswith('T'):
+            file = os.path.join(entry.path, entry.name + '.yaml')
+            if os.path.isfile(file):
+                with open(file, 'r', encoding='utf-8') as f:
+                    yield f.read(), None
+    csv_path = os.path.join(atomics, 'Indexes', 'Indexes-CSV', 'linux-index.csv')
+    if os.path.isfile(csv_path):
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            yield None, f.read()
+
+
+class AtomicIndex:
+    def __init__(self, tests=None, names=None, tactics=None, sources=None):
+        self.tests = tests or []          # rows in FIELDS order
+        self.names = names or {}          # technique -> display name
+        self.tactics = tactics or {}      # technique -> [tactic]
+        self.sources = sources or []      # [[path, signature], ...] the index was built from
+        self._reindex()
+
+    def _reindex(self):
+        self.by_technique, self.by_executor = {}, {}
+        for i, row in enumerate(self.tests):
+            self.by_technique.setdefault(row[0], []).append(i)
+            self.by_executor.setdefault(row[4], []).append(i)
+        self.by_tactic = {}
+        for technique, tactics in self.tactics.items():
+            for tactic in tactics:
+                self.by_tactic.setdefault(tactic, []).extend(self.by_technique.get(technique, []))
+
+    @classmethod
+    def build(cls, paths):
+        """Parse every source; a technique in a later source replaces the earlier one."""
+        rows_by_technique, names, tactics, sources = {}, {}, {}, []
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            for text, tactics_csv in iter_source(path):
+                if tactics_csv is not None:
+                    tactics.update(_parse_tactics(tactics_csv))
+                    continue
+                try:
+                    data = yaml.load(text, Loader=_Loader) or {}
+                except yaml.YAMLError:
+                    continue
+                name, rows = parse_technique(data)
+                technique = data.get('attack_technique')
+                if technique:
+                    rows_by_technique[technique] = rows
+                    names[technique] = name
+            sources.append([path, source_signature(path)])
+        tests = [row for technique in sorted(rows_by_technique) for row in rows_by_technique[technique]]
+        return cls(tests, names, tactics, sources)
+
+    def replace_technique(self, technique, data):
+        name, rows = parse_technique(data)
+        self.tests = [row for row in self.tests if row[0] != technique] + rows
+        self.names[technique] = name
+        self._reindex()
+        return len(rows)
+
+    def save(self, path):
+        payload = zlib.compress(json.dumps(
+            {'tests': self.tests, 'names': self.names, 'tactics': self.tactics, 'sources': self.sources},
+            separators=(',', ':')).encode('utf-8'), 6)
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".atomic_index.")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(payload)))
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved index, or None if it is missing, damaged or from another version."""
+        try:
+            with open(path, 'rb') as f:
+                magic, version, length = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or version != VERSION:
+                    return None
+                data = json.loads(zlib.decompress(f.read(length)))
+        except (OSError, struct.error, zlib.error, ValueError):
+            return None
+        return cls(data['tests'], data['names'], data['tactics'], data['sources'])
+
+    def is_current(self, paths):
+        existing = [path for path in paths if os.path.exists(path)]
+        return [s[0] for s in self.sources] == existing and \
+            all(source_signature(path) == signature for path, signature in self.sources)
+
+    def find(self, technique=None, tactic=None, executor=None):
+        """Tests matching every given key, as dicts."""
+        selected = None
+        for table, key in ((self.by_technique, technique), (self.by_tactic, tactic), (self.by_executor, executor)):
+            if key is None:
+                continue
+            ids = table.get(key, [])
+            if selected is None:
+                selected = ids
+            else:
+                wanted = set(ids)
+                selected = [i for i in selected if i in wanted]
+        ids = range(len(self.tests)) if selected is None else selected
+        return [self.test(i) for i in ids]
+
+    def test(self, i):
+        row = dict(zip(FIELDS, self.tests[i]))
+        row['tactics'] = self.tactics.get(row['technique'], [])
+        return row
+
 
 class AtomicClient:
     """
-    Client to fetch and parse Atomic Red Team tests directly from GitHub.
+    Atomic Red Team tests for Linux, from the local mirror first. online=False
+    never touches the network (air-gapped hosts).
     """
     BASE_URL = "https://raw.githubusercontent.com/redcanaryco/atomic-red-team/master/atomics"
 
+    def __init__(self, mirror=MIRROR_PATH, cache_dir=CACHE_DIR, index_path=INDEX_PATH, online=True):
+        self.mirror = mirror
+        self.cache_dir = cache_dir
+        self.index_path = index_path
+        self.online = online
+        self.session = None
+        self.lock = threading.Lock()
+        self.index = self._load_index()
+
+    @property
+    def sources(self):
+        # Refreshed techniques override the mirror
+        return [path for path in (self.mirror, self.cache_dir) if path]
+
+    def _load_index(self):
+        index = AtomicIndex.load(self.index_path)
+        if index is not None and index.is_current(self.sources):
+            return index
+        index = AtomicIndex.build(self.sources)
+        if index.tests:
+            print(f"[*] Indexed {len(index.tests)} Linux Atomic tests from {', '.join(s[0] for s in index.sources)}")
+            index.save(self.index_path)
+        return index
+
     def fetch_technique(self, technique_id: str) -> List[Dict[str, Any]]:
         """
-        Fetches and parses the Atomic Red Team YAML for a given technique ID.
-        Returns a list of executable tests for Linux.
+        Executable Linux tests for a technique, with input arguments set to
+        their defaults. Fetched from GitHub only if the mirror does not have it.
         """
-        # Handle sub-techniques (e.g., T1059.004)
-        # The URL structure is .../T1059.004/T1059.004.yaml
-        url = f"{self.BASE_URL}/{technique_id}/{technique_id}.yaml"
-        
-        print(f"[*] Fetching Atomic Test from: {url}")
-        
-        try:
-            response = requests.get(url)
-            if response.status_code == 404:
-                print(f"[!] Technique {technique_id} not found in Atomic Red Team library.")
-                return []
-            
-            response.raise_for_status()
-            data = yaml.safe_load(response.text)
-            
-            linux_tests = []
-            for test in data.get('atomic_tests', []):
-                if 'linux' in test.get('supported_platforms', []):
-                    # Extract executor details
-                    executor = test.get('executor', {})
-                    command = executor.get('command', '')
-                    cleanup = executor.get('cleanup_command', '')
-                    
-                    # Check if it requires manual input (arguments)
-                    # For automation, we might need to replace default args
-                    args = test.get('input_arguments', {})
-                    if args:
-                        for arg_name, arg_data in args.items():
-                            default_val = arg_data.get('default', 'test_value')
-                            # Replace #{arg_name} with default value
-                            command = command.replace(f"#{{{arg_name}}}", str(default_val))
-                            if cleanup:
-                                cleanup = cleanup.replace(f"#{{{arg_name}}}", str(default_val))
-
-                    linux_tests.append({
-                        'name': test.get('name'),
-                        'description': test.get('description'),
-                        'commands': command.strip(),
-                        'cleanup': cleanup.strip() if cleanup else None
-                    })
-            
+        if technique_id not in self.index.by_technique and self.online:
+            self.refresh([technique_id])
+
+        linux_tests = []
+        for test in self.index.find(technique=technique_id):
+            cleanup = substitute(test['cleanup'], test['arguments'])
+            linux_tests.append({
+                'name': test['name'],
+                'description': test['description'],
+                'commands': substitute(test['command'], test['arguments']),
+                'cleanup': cleanup or None,
+                'guid': test['guid'],
+                'executor': test['executor'],
+                'tactics': test['tactics'],
+            })
+        if linux_tests:
             print(f"[+] Found {len(linux_tests)} Linux tests for {technique_id}")
-            return linux_tests
-            
-        except Exception as e:
-            print(f"[!] Error fetching Atomic Test {technique_id}: {e}")
-            return []
+        else:
+            print(f"[!] Technique {technique_id} not found in the Atomic Red Team mirror.")
+        return linux_tests
+
+    # ------------------------------------------------------------------
+    # Network refresh
+    # ------------------------------------------------------------------
+    def _session(self):
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=8)
+            self.session.mount("https://", adapter)
+        return self.session
+
+    def _validators_path(self):
+        return os.path.join(self.cache_dir, "validators.json")
+
+    def _load_validators(self):
+        try:
+            with open(self._validators_path(), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _fetch(self, technique_id, validators):
+        """Conditional GET of one technique. Returns (status, text or None, new validators)."""
+        url = f"{self.BASE_URL}/{technique_id}/{technique_id}.yaml"
+        headers = {}
+        known = validators.get(technique_id) or {}
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+        response = self._session().get(url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return 304, None, known
+        if response.status_code == 404:
+            return 404, None, None
+        response.raise_for_status()
+        return 200, response.text, {'etag': response.headers.get('ETag'),
+                                    'last_modified': response.headers.get('Last-Modified')}
+
+    def refresh(self, technique_ids=None, workers=8):
+        """
+        Re-download techniques (default: every indexed one) into cache_dir.
+        Unchanged techniques cost a 304. Returns {technique: status}.
+        """
+        if not self.online:
+            return {}
+        technique_ids = list(technique_ids or self.index.by_technique)
+        validators = self._load_validators()
+        results = {}
+
+        def fetch(technique_id):
+            try:
+                return technique_id, self._fetch(technique_id, validators)
+            except requests.RequestException as e:
+                print(f"[!] Error fetching Atomic Test {technique_id}: {e}")
+                return technique_id, (None, None, validators.get(technique_id))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(technique_ids)))) as pool:
+            fetched = list(pool.map(fetch, technique_ids))
+
+        changed = False
+        with self.lock:
+            for technique_id, (status, text, new_validators) in fetched:
+                results[technique_id] = status
+                if new_validators is None:
+                    validators.pop(technique_id, None)
+                else:
+                    validators[technique_id] = new_validators
+                if text is None:
+                    continue
+                try:
+                    data = yaml.load(text, Loader=_Loader) or {}
+                except yaml.YAMLError as e:
+                    print(f"[!] Bad YAML for {technique_id}: {e}")
+                    continue
+                directory = os.path.join(self.cache_dir, technique_id)
+                os.makedirs(directory, exist_ok=True)
+                with open(os.path.join(directory, technique_id + '.yaml'), 'w', encoding='utf-8') as f:
+                    f.write(text)
+                self.index.replace_technique(technique_id, data)
+                changed = True
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._validators_path(), 'w') as f:
+                json.dump(validators, f)
+            if changed:
+                self.index.sources = [[path, source_signature(path)] for path in self.sources
+                                      if os.path.exists(path)]
+                self.index.save(self.index_path)
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atomic Red Team mirror and index")
+    parser.add_argument("--mirror", default=MIRROR_PATH, help="atomics directory, repo checkout or tarball")
+    parser.add_argument("--index", default=INDEX_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="(re)build the index from the mirror")
+    refresh = sub.add_parser("refresh", help="conditionally re-download techniques from GitHub")
+    refresh.add_argument("techniques", nargs="*")
+    listing = sub.add_parser("list", help="list indexed tests")
+    listing.add_argument("--technique")
+    listing.add_argument("--tactic")
+    listing.add_argument("--executor")
+    args = parser.parse_args()
+
+    if args.command == "build" and os.path.exists(args.index):
+        os.unlink(args.index)
+    client = AtomicClient(mirror=args.mirror, index_path=args.index, online=args.command == "refresh")
+    if args.command == "build":
+        print(f"{len(client.index.tests)} tests, {len(client.index.by_technique)} techniques, "
+              f"{len(client.index.by_tactic)} tactics")
+    elif args.command == "refresh":
+        results = client.refresh(args.techniques or None)
+        for status in (200, 304, 404, None):
+            print(f"{status}: {sum(1 for s in results.values() if s == status)}")
+    else:
+        for test in client.index.find(args.technique, args.tactic, args.executor):
+            print(f"{test['technique']:<12} {test['executor'] or '-':<8} {','.join(test['tactics']) or '-':<24} {test['name']}")
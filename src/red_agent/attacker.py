@@ -1,23 +1,53 @@
-import subprocess
+import time
 from rich.console import Console
 from src.red_agent.scenarios import ATTACK_SCENARIOS
+from src.red_agent.session import SESSION_TIMEOUT, ShellSession
+from src.utils.docker_client import DockerError, get_client
+from src.utils.timeline import COMMAND_LOG, TimelineWriter
 
 console = Console()
 
 class RedAgent:
-    def __init__(self, target_container="victim"):
+    def __init__(self, target_container="victim", session=False, timeout=SESSION_TIMEOUT,
+                 command_log=COMMAND_LOG):
         self.target_container = target_container
-        # Check if container exists using docker inspect
+        self.docker = get_client()
+        # Every command is recorded so src/blue_agent/correlation.py can match it to Falco alerts
+        self.command_log = TimelineWriter(command_log) if command_log else None
+        # session=True: one long-lived shell in the target instead of one exec per command
+        self.session = None
+        # Check if container exists using the Docker API (no CLI process per call)
         try:
-            subprocess.run(
-                ["docker", "inspect", target_container],
-                capture_output=True,
-                check=True
-            )
+            self.docker.inspect_container(target_container)
             console.print(f"[bold green]Connected to target container: {target_container}[/bold green]")
-        except subprocess.CalledProcessError:
+        except (DockerError, OSError):
             console.print(f"[bold red]Container {target_container} not found![/bold red]")
             self.target_container = None
+            return
+        if session:
+            self.session = ShellSession(target_container, client=self.docker, timeout=timeout)
+
+    def run_command(self, cmd):
+        """Run one shell command in the target, returns an ExecResult."""
+        if self.session is not None:
+            return self.session.run(cmd)
+        # We use sh -c to handle shell commands properly
+        return self.docker.exec_run(self.target_container, ["sh", "-c", cmd])
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+        if self.command_log is not None:
+            self.command_log.close()
+
+    def record(self, technique_id, cmd, start, result=None, error=None):
+        if self.command_log is None:
+            return
+        self.command_log.write({
+            'technique': technique_id, 'target': self.target_container, 'phase': 'attack',
+            'command': cmd, 'start': start, 'end': time.time(),
+            'exit_code': result.exit_code if result is not None else None, 'error': error,
+        })
 
     def execute_attack(self, technique_id):
         if not self.target_container:
@@ -32,21 +62,15 @@ class RedAgent:
         
         for cmd in scenario['commands']:
             console.print(f"[cyan]Running cmd:[/cyan] {cmd}")
+            start = time.time()
             try:
-                # Execute command in container using docker exec
-                # We use sh -c to handle shell commands properly
-                full_cmd = ["docker", "exec", self.target_container, "sh", "-c", cmd]
-                
-                result = subprocess.run(
-                    full_cmd,
-                    capture_output=True,
-                    text=True,
-                    encoding='utf-8'
-                )
-                
-                if result.returncode == 0:
+                result = self.run_command(cmd)
+                self.record(technique_id, cmd, start, result)
+
+                if result.exit_code == 0:
                     console.print(f"   [green]Success:[/green] {result.stdout.strip()}")
                 else:
-                    console.print(f"   [red]Failed (Code {result.returncode}):[/red] {result.stderr.strip()}")
+                    console.print(f"   [red]Failed (Code {result.exit_code}):[/red] {result.stderr.strip()}")
             except Exception as e:
-                console.print(f"   [bold red]Error:[/bold red] {str(e)}")
\ No newline at end of file
+                self.record(technique_id, cmd, start, error=str(e))
+                console.print(f"   [bold red]Error:[/bold red] {str(e)}")
@@ -0,0 +1,311 @@
+"""
+Attack campaigns: many techniques x many victim containers, paced.
+
+A campaign file (YAML) looks like:
+
+    name: recon-burst
+    targets: [victim, victim-2, victim-3]
+    rate: 5            # attacks started per second, 0 = as fast as the workers allow
+    workers: 8         # attacks in flight at most
+    repetitions: 2     # default for every technique
+    session: false     # true: one persistent shell per target and worker
+    timeout: 30        # per command (session mode)
+    techniques:
+      - T1059.004                      # built-in scenario (src/red_agent/scenarios.py)
+      - id: T1555
+        repetitions: 5
+        targets: [victim]
+      - id: T1070.004
+        atomic: true                   # Atomic Red Team tests for the technique
+        test: 1                        # 1-based, default: all Linux tests
+      - id: custom-1
+        commands: ["cat /etc/shadow"]
+        cleanup: ["rm -f /tmp/x"]
+
+One attack = one technique on one target, one repetition. Attacks are started
+on a fixed schedule (i / rate) by a bounded worker pool; when every worker is
+busy the schedule slips and the lag shows up in the timeline. An attack's
+cleanup commands always run, also when a command fails or the campaign is
+interrupted.
+
+The timeline is JSONL, one record per command:
+
+    {"campaign", "attack", "technique", "name", "target", "repetition",
+     "phase": "attack"|"cleanup", "command", "scheduled", "start", "end",
+     "exit_code", "error"}
+
+scheduled / start / end are Unix timestamps (seconds), comparable with
+Falco's evt.time / 1e9.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from src.red_agent.scenarios import ATTACK_SCENARIOS
+from src.red_agent.session import SESSION_TIMEOUT, ShellSession
+from src.utils.docker_client import get_client
+from src.utils.timeline import TimelineWriter
+
+TIMELINE_DIR = "logs/campaigns"
+
+
+class Attack:
+    """A resolved technique: the commands to run and the cleanup to run after them."""
+
+    def __init__(self, technique, name, commands, cleanup=(), targets=None, repetitions=1):
+        self.technique = technique
+        self.name = name
+        self.commands = list(commands)
+        self.cleanup = [c for c in cleanup if c]
+        self.targets = targets
+        self.repetitions = repetitions
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def resolve_technique(entry, atomic_client=None):
+    """Turn one `techniques:` entry into a list of Attacks."""
+    if isinstance(entry, str):
+        entry = {'id': entry}
+    technique = str(entry['id'])
+    targets = _as_list(entry.get('targets')) or None
+    repetitions = entry.get('repetitions')
+
+    if 'commands' in entry:
+        return [Attack(technique, entry.get('name', technique), _as_list(entry['commands']),
+                       _as_list(entry.get('cleanup')), targets, repetitions)]
+
+    if entry.get('atomic'):
+        if atomic_client is None:
+            from src.red_agent.atomic_client import AtomicClient
+            atomic_client = AtomicClient()
+        tests = atomic_client.fetch_technique(technique)
+        if entry.get('test') is not None:
+            index = int(entry['test']) - 1
+            tests = tests[index:index + 1] if 0 <= index < len(tests) else []
+        if not tests:
+            raise ValueError(f"No Atomic Red Team Linux tests for {technique}")
+        return [Attack(technique, test['name'], [test['commands']], _as_list(test.get('cleanup')),
+                       targets, repetitions) for test in tests]
+
+    scenario = ATTACK_SCENARIOS.get(technique)
+    if scenario is None:
+        raise ValueError(f"Technique {technique} is not a built-in scenario; "
+                         f"give it `commands:` or `atomic: true`")
+    return [Attack(technique, scenario['name'], scenario['commands'],
+                   _as_list(scenario.get('cleanup')), targets, repetitions)]
+
+
+class Campaign:
+    def __init__(self, name, targets, attacks, rate=0.0, workers=4, session=False,
+                 timeout=SESSION_TIMEOUT):
+        if not targets:
+            raise ValueError("Campaign has no targets")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.name = name
+        self.targets = targets
+        self.attacks = attacks
+        self.rate = rate
+        self.workers = workers
+        self.session = session
+        self.timeout = timeout
+
+    @classmethod
+    def from_dict(cls, data, atomic_client=None):
+        repetitions = int(data.get('repetitions', 1))
+        attacks = []
+        for entry in data.get('techniques') or []:
+            for attack in resolve_technique(entry, atomic_client):
+                if attack.repetitions is None:
+                    attack.repetitions = repetitions
+                attacks.append(attack)
+        if not attacks:
+            raise ValueError("Campaign has no techniques")
+        return cls(
+            name=data.get('name', 'campaign'),
+            targets=_as_list(data.get('targets')),
+            attacks=attacks,
+            rate=float(data.get('rate', 0) or 0),
+            workers=int(data.get('workers', 4)),
+            session=bool(data.get('session', False)),
+            timeout=float(data.get('timeout', SESSION_TIMEOUT)),
+        )
+
+    @classmethod
+    def from_file(cls, path, atomic_client=None):
+        with open(path, 'r') as f:
+            return cls.from_dict(yaml.safe_load(f) or {}, atomic_client)
+
+    def schedule(self):
+        """
+        Yield (offset_seconds, attack, target, repetition). Repetitions are the
+        outer loop and targets the inner one, so load is spread over the victims.
+        """
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        i = 0
+        rounds = max((a.repetitions for a in self.attacks), default=0)
+        for repetition in range(rounds):
+            for attack in self.attacks:
+                if repetition >= attack.repetitions:
+                    continue
+                for target in attack.targets or self.targets:
+                    yield i * interval, attack, target, repetition
+                    i += 1
+
+    def all_targets(self):
+        """Every container the schedule attacks, technique overrides included, in first-use order."""
+        return list(dict.fromkeys(target for _, _, target, _ in self.schedule()))
+
+
+class CampaignRunner:
+    """
+    Runs a Campaign. `execute(target, command)` returns an ExecResult; by default
+    it is a Docker exec per command, or a ShellSession per (worker, target) when
+    the campaign asks for sessions.
+    """
+
+    def __init__(self, campaign, timeline_path=None, execute=None, client=None):
+        self.campaign = campaign
+        if timeline_path is None:
+            timeline_path = os.path.join(TIMELINE_DIR, f"{campaign.name}-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+        self.timeline_path = timeline_path
+        self.client = client
+        self.execute = execute or (self._session_execute if campaign.session else self._exec_execute)
+        self.stopping = threading.Event()
+        self.local = threading.local()
+        self.sessions = []
+        self.sessions_lock = threading.Lock()
+        self.records = []
+        self.lags = []
+
+    # ------------------------------------------------------------------
+    # Executors
+    # ------------------------------------------------------------------
+    def _docker(self):
+        if self.client is None:
+            self.client = get_client()
+        return self.client
+
+    def _exec_execute(self, target, command):
+        return self._docker().exec_run(target, ["sh", "-c", command])
+
+    def _session_execute(self, target, command):
+        # One shell per worker thread and target: a session runs one command at a time
+        sessions = getattr(self.local, 'sessions', None)
+        if sessions is None:
+            sessions = self.local.sessions = {}
+        session = sessions.get(target)
+        if session is None:
+            session = sessions[target] = ShellSession(target, client=self._docker(),
+                                                      timeout=self.campaign.timeout)
+            with self.sessions_lock:
+                self.sessions.append(session)
+        return session.run(command)
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+    def _step(self, base, phase, command):
+        record = dict(base, phase=phase, command=command, start=time.time(),
+                      end=None, exit_code=None, error=None)
+        try:
+            result = self.execute(base['target'], command)
+            record['exit_code'] = result.exit_code
+            if result.exit_code != 0:
+                record['error'] = result.stderr.strip()[-500:] or None
+        except Exception as e:
+            record['error'] = str(e)
+        record['end'] = time.time()
+        self.timeline.write(record)
+        self.records.append(record)
+        return record
+
+    def _run_attack(self, number, attack, target, repetition, scheduled):
+        base = {
+            'campaign': self.campaign.name, 'attack': number, 'technique': attack.technique,
+            'name': attack.name, 'target': target, 'repetition': repetition, 'scheduled': scheduled,
+        }
+        try:
+            for command in attack.commands:
+                if self.stopping.is_set():
+                    break
+                self._step(base, 'attack', command)
+        finally:
+            for command in attack.cleanup:
+                self._step(base, 'cleanup', command)
+
+    def run(self):
+        """Run the whole campaign and return summary(). Ctrl+C stops scheduling; cleanup still runs."""
+        campaign = self.campaign
+        self.timeline = TimelineWriter(self.timeline_path)
+        slots = threading.BoundedSemaphore(campaign.workers)
+        pool = ThreadPoolExecutor(max_workers=campaign.workers, thread_name_prefix="campaign")
+        self.started = self.dispatched = time.time()
+        origin = time.perf_counter()
+        number = 0
+        try:
+            for offset, attack, target, repetition in campaign.schedule():
+                delay = origin + offset - time.perf_counter()
+                if delay > 0 and self.stopping.wait(delay):
+                    break
+                slots.acquire()
+                if self.stopping.is_set():
+                    slots.release()
+                    break
+                scheduled = self.started + offset
+                self.lags.append(max(time.time() - scheduled, 0.0))
+                future = pool.submit(self._run_attack, number, attack, target, repetition, scheduled)
+                future.add_done_callback(lambda _: slots.release())
+                number += 1
+                self.dispatched = time.time()
+        except KeyboardInterrupt:
+            self.stopping.set()
+        finally:
+            # In-flight attacks finish their cleanup before we return
+            pool.shutdown(wait=True)
+            self.finished = time.time()
+            self.timeline.close()
+            with self.sessions_lock:
+                for session in self.sessions:
+                    session.close()
+        self.attacks_started = number
+        return self.summary()
+
+    def stop(self):
+        self.stopping.set()
+
+    def summary(self):
+        attack_steps = [r for r in self.records if r['phase'] == 'attack']
+        cleanup_steps = [r for r in self.records if r['phase'] == 'cleanup']
+        elapsed = max(self.finished - self.started, 1e-9)
+        # Rate over the dispatch window: n attacks started on a 1/rate grid span (n - 1) / rate
+        window = self.dispatched - self.started
+        achieved = (self.attacks_started - 1) / window if self.attacks_started > 1 and window > 0 else 0.0
+        lags = sorted(self.lags)
+
+        def lag(p):
+            return lags[min(len(lags) - 1, int(p / 100.0 * len(lags)))] if lags else 0.0
+
+        return {
+            'campaign': self.campaign.name,
+            'timeline': self.timeline_path,
+            'attacks': self.attacks_started,
+            'commands': len(attack_steps),
+            'failed': sum(1 for r in attack_steps if r['exit_code'] != 0),
+            'cleanup_commands': len(cleanup_steps),
+            'cleanup_failed': sum(1 for r in cleanup_steps if r['exit_code'] != 0),
+            'elapsed_seconds': elapsed,
+            'target_rate': self.campaign.rate,
+            'achieved_rate': achieved,
+            'start_lag_p50': lag(50),
+            'start_lag_p95': lag(95),
+            'interrupted': self.stopping.is_set(),
+        }
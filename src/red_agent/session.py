@@ -0,0 +1,195 @@
+"""
+Long-lived shell inside the target container.
+
+One `sh` is started with stdin attached and every command is written to it,
+so short commands cost a write instead of an exec round trip, and cwd / env
+carry over between steps. Each command is followed by two printf sentinels
+with a random marker, one on stdout carrying $?, one on stderr, which is how
+output and exit codes are split per command.
+
+Detection note: commands still execve() from the session shell, so Falco sees
+them, but "shell spawned in container" fires once per session, not per step.
+
+runc setsid()s every exec, so the session shell leads a process group that
+holds everything it runs. Its PID is read when the session starts; after a
+timeout the replacement shell kills that group, so the hung command does not
+keep running in the container.
+"""
+import threading
+import time
+import uuid
+
+from src.utils.docker_client import STDERR, STDOUT, STREAM_HEADER, ExecResult, get_client
+
+SESSION_TIMEOUT = 30.0
+# Same convention as coreutils timeout(1)
+TIMEOUT_EXIT_CODE = 124
+
+
+class ShellSession:
+    def __init__(self, container, client=None, shell="sh", timeout=SESSION_TIMEOUT):
+        self.container = container
+        self.client = client or get_client()
+        self.shell = shell
+        self.timeout = timeout
+
+        self.sock = None
+        self.reader = None
+        self.alive = False
+        self.pid = None
+        self.buffers = {STDOUT: bytearray(), STDERR: bytearray()}
+        self.cond = threading.Condition()
+        self.lock = threading.Lock()  # one command at a time
+
+        self.starts = 0
+        self.commands = 0
+        self.timeouts = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        exec_id = self.client.exec_create(self.container, [self.shell], stdin=True)
+        sock, leftover = self.client.exec_attach(exec_id)
+        with self.cond:
+            self.sock = sock
+            self.alive = True
+            for buffer in self.buffers.values():
+                buffer.clear()
+        self.reader = threading.Thread(target=self._read_loop, args=(sock, leftover),
+                                       name="shell-session", daemon=True)
+        self.reader.start()
+        self.starts += 1
+        finished, result = self._execute("echo $$", self.timeout)
+        pid = result.stdout.strip()
+        self.pid = int(pid) if finished and result.exit_code == 0 and pid.isdigit() else None
+        return self
+
+    def close(self):
+        with self.cond:
+            sock, self.sock = self.sock, None
+            self.alive = False
+            self.cond.notify_all()
+        if sock is not None:
+            try:
+                sock.sendall(b"exit\n")
+            except OSError:
+                pass
+            sock.close()
+
+    def restart(self):
+        self.close()
+        return self.start()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _read_loop(self, sock, data):
+        """Demultiplex the attached output stream into the stdout / stderr buffers."""
+        data = bytearray(data)
+        try:
+            while True:
+                while len(data) >= STREAM_HEADER.size:
+                    kind, size = STREAM_HEADER.unpack_from(data)
+                    if len(data) < STREAM_HEADER.size + size:
+                        break
+                    payload = bytes(data[STREAM_HEADER.size:STREAM_HEADER.size + size])
+                    del data[:STREAM_HEADER.size + size]
+                    with self.cond:
+                        self.buffers[STDERR if kind == STDERR else STDOUT].extend(payload)
+                        self.cond.notify_all()
+                chunk = sock.recv(1 << 16)
+                if not chunk:
+                    break
+                data.extend(chunk)
+        except OSError:
+            pass
+        finally:
+            with self.cond:
+                if self.sock is sock:
+                    self.alive = False
+                self.cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------------
+    def run(self, command, timeout=None):
+        """
+        Run one command in the session shell and return an ExecResult.
+        A command that does not finish in time gets exit code 124, its process
+        group is killed and the session is restarted (cwd / env are lost).
+        Stdin is /dev/null.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self.lock:
+            if not self.alive:
+                self.start()
+            self.commands += 1
+            finished, result = self._execute(command, timeout)
+            if finished:
+                return result
+
+            self.timeouts += 1
+            hung = self.pid
+            self.restart()
+            if hung is not None:
+                # Closing the old shell's stdin does not stop the command it is stuck in
+                self._execute(f"kill -s KILL -- -{hung} 2>/dev/null", self.timeout)
+            return ExecResult(TIMEOUT_EXIT_CODE, result.stdout,
+                              result.stderr + f"timed out after {timeout:.0f}s, session restarted")
+
+    def _execute(self, command, timeout):
+        """
+        Send one command and wait for its sentinels. Returns (finished, result):
+        finished is False on timeout, with the output so far in result.
+        """
+        marker = f"__KERNEURAL_{uuid.uuid4().hex}__"
+        # Brace group, not a subshell, so cd / export persist
+        script = (
+            f"{{ {command}\n}} </dev/null\n"
+            f"__kn_rc=$?\n"
+            f"printf '\\n{marker} %d\\n' \"$__kn_rc\"\n"
+            f"printf '\\n{marker}\\n' >&2\n"
+        )
+        out_token = f"\n{marker} ".encode()
+        err_token = f"\n{marker}\n".encode()
+
+        with self.cond:
+            for buffer in self.buffers.values():
+                buffer.clear()
+        try:
+            self.sock.sendall(script.encode("utf-8"))
+        except OSError:
+            self.close()
+            return True, ExecResult(-1, "", "session closed before the command was sent")
+
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while True:
+                out, err = self.buffers[STDOUT], self.buffers[STDERR]
+                i = out.find(out_token)
+                end = out.find(b"\n", i + len(out_token)) if i >= 0 else -1
+                j = err.find(err_token)
+                if end >= 0 and j >= 0:
+                    exit_code = int(out[i + len(out_token):end])
+                    result = ExecResult(exit_code, out[:i].decode("utf-8", "replace"),
+                                        err[:j].decode("utf-8", "replace"))
+                    out.clear()
+                    err.clear()
+                    return True, result
+                remaining = deadline - time.monotonic()
+                if not self.alive or remaining <= 0:
+                    partial_out = out.decode("utf-8", "replace")
+                    partial_err = err.decode("utf-8", "replace")
+                    break
+                self.cond.wait(remaining)
+
+        if not self.alive:
+            # The command ended the shell (e.g. `exit`); next run starts a new one
+            self.close()
+            return True, ExecResult(-1, partial_out, partial_err + "session closed")
+        return False, ExecResult(TIMEOUT_EXIT_CODE, partial_out, partial_err)
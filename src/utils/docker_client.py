@@ -0,0 +1,316 @@
+"""
+Minimal Docker Engine API client over the local Unix socket.
+
+Forking the docker CLI costs 50-150 ms per command (process start, config
+load, API handshake). This client speaks HTTP/1.1 to /var/run/docker.sock
+directly and keeps idle keep-alive connections in a small pool, so a command
+is one request on an already open socket.
+
+Only what Kerneural needs: container state, kill/restart, logs, and
+exec create / start (streamed, or attached with stdin) / inspect.
+"""
+import http.client
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+from urllib.parse import quote, urlencode
+
+DOCKER_SOCKET = "/var/run/docker.sock"
+API_VERSION = "v1.41"
+
+# Multiplexed stream header (exec / logs without a TTY): stream, 0, 0, 0, size
+STREAM_HEADER = struct.Struct(">BxxxI")
+STDOUT, STDERR = 1, 2
+
+
+class DockerError(RuntimeError):
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=60):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class ExecResult:
+    __slots__ = ('exit_code', 'stdout', 'stderr')
+
+    def __init__(self, exit_code, stdout, stderr):
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+
+    @property
+    def output(self):
+        return self.stdout + self.stderr
+
+
+def demux(data):
+    """Split a complete multiplexed payload into (stdout, stderr) bytes."""
+    out, err = [], []
+    pos = 0
+    while pos + STREAM_HEADER.size <= len(data):
+        kind, size = STREAM_HEADER.unpack_from(data, pos)
+        pos += STREAM_HEADER.size
+        (err if kind == STDERR else out).append(data[pos:pos + size])
+        pos += size
+    return b"".join(out), b"".join(err)
+
+
+def _read_exact(response, n):
+    chunks = []
+    while n > 0:
+        chunk = response.read(n)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+class DockerClient:
+    def __init__(self, socket_path=None, timeout=60, pool_size=4, api_version=API_VERSION):
+        if socket_path is None:
+            host = os.getenv("DOCKER_HOST", "")
+            socket_path = host[len("unix://"):] if host.startswith("unix://") else DOCKER_SOCKET
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.api_version = api_version
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+        self.connections_opened = 0
+        self.lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Connection pool
+    # ------------------------------------------------------------------
+    def _acquire(self):
+        try:
+            return self.pool.get_nowait(), True
+        except queue.Empty:
+            with self.lock:
+                self.connections_opened += 1
+            return UnixHTTPConnection(self.socket_path, self.timeout), False
+
+    def _release(self, conn):
+        try:
+            self.pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _url(self, path, params=None):
+        url = f"/{self.api_version}{path}"
+        if params:
+            url += "?" + urlencode({k: v for k, v in params.items() if v is not None})
+        return url
+
+    def _send(self, method, path, params=None, body=None):
+        """Send a request and return (connection, response). The body is not read yet."""
+        url = self._url(path, params)
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        conn, reused = self._acquire()
+        try:
+            conn.request(method, url, body=payload, headers=headers)
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            conn.close()
+            if not reused:
+                raise
+            # The daemon closed an idle pooled connection, retry once on a fresh one
+            conn = UnixHTTPConnection(self.socket_path, self.timeout)
+            with self.lock:
+                self.connections_opened += 1
+            conn.request(method, url, body=payload, headers=headers)
+            return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def _finish(self, conn, response):
+        """Return the connection to the pool if the server will keep it open."""
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+    def request(self, method, path, params=None, body=None, expect=(200, 201, 204)):
+        conn, response = self._send(method, path, params, body)
+        try:
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+        self._finish(conn, response)
+        if response.status not in expect:
+            raise DockerError(response.status, self._error_message(data))
+        if data and response.getheader("Content-Type", "").startswith("application/json"):
+            return json.loads(data)
+        return data
+
+    @staticmethod
+    def _error_message(data):
+        try:
+            return json.loads(data).get("message", "")
+        except (ValueError, AttributeError):
+            return data.decode("utf-8", "replace").strip()
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    # ------------------------------------------------------------------
+    # Containers
+    # ------------------------------------------------------------------
+    def ping(self):
+        return self.request("GET", "/_ping") == b"OK"
+
+    def inspect_container(self, name):
+        return self.request("GET", f"/containers/{quote(name)}/json")
+
+    def container_running(self, name):
+        try:
+            return bool(self.inspect_container(name).get("State", {}).get("Running"))
+        except (DockerError, OSError):
+            return False
+
+    def kill(self, name, signal="SIGKILL"):
+        self.request("POST", f"/containers/{quote(name)}/kill", {"signal": signal})
+
+    def restart(self, name, timeout=10):
+        self.request("POST", f"/containers/{quote(name)}/restart", {"t": timeout})
+
+    def logs(self, name, since=None, tail=None):
+        """
+        stdout + stderr of a (non-TTY) container as text. `since` is a UNIX
+        time; a float keeps its sub-second part.
+        """
+        if isinstance(since, float):
+            since = f"{since:.9f}"
+        data = self.request("GET", f"/containers/{quote(name)}/logs",
+                            {"stdout": 1, "stderr": 1, "since": since, "tail": tail})
+        out, err = demux(data)
+        return (out + err).decode("utf-8", "replace")
+
+    # ------------------------------------------------------------------
+    # Exec
+    # ------------------------------------------------------------------
+    def exec_create(self, name, cmd, env=None, workdir=None, user=None, stdin=False, tty=False):
+        body = {
+            "Cmd": cmd,
+            "AttachStdout": True,
+            "AttachStderr": True,
+            "AttachStdin": stdin,
+            "Tty": tty,
+        }
+        if env:
+            body["Env"] = [f"{k}={v}" for k, v in env.items()]
+        if workdir:
+            body["WorkingDir"] = workdir
+        if user:
+            body["User"] = user
+        return self.request("POST", f"/containers/{quote(name)}/exec", body=body)["Id"]
+
+    def exec_stream(self, exec_id):
+        """
+        Start an exec and yield (STDOUT|STDERR, bytes) frames as they arrive.
+        Docker hijacks the connection for the output stream, so it is closed
+        afterwards instead of going back to the pool.
+        """
+        conn, response = self._send("POST", f"/exec/{exec_id}/start", body={"Detach": False, "Tty": False})
+        try:
+            if response.status != 200:
+                raise DockerError(response.status, self._error_message(response.read()))
+            while True:
+                header = _read_exact(response, STREAM_HEADER.size)
+                if len(header) < STREAM_HEADER.size:
+                    break
+                kind, size = STREAM_HEADER.unpack(header)
+                yield (STDERR if kind == STDERR else STDOUT), _read_exact(response, size)
+        finally:
+            conn.close()
+
+    def exec_attach(self, exec_id):
+        """
+        Start an exec with stdin attached and hijack the connection.
+        Returns (socket, leftover): stdin bytes are written to the socket, output
+        arrives multiplexed (see demux); leftover is output read with the headers.
+        """
+        body = json.dumps({"Detach": False, "Tty": False}).encode("utf-8")
+        head = (
+            f"POST {self._url(f'/exec/{exec_id}/start')} HTTP/1.1\r\n"
+            "Host: localhost\r\n"
+            "Content-Type: application/json\r\n"
+            "Connection: Upgrade\r\n"
+            "Upgrade: tcp\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode("ascii")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(head + body)
+            data = b""
+            while b"\r\n\r\n" not in data:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    raise DockerError(0, "connection closed during exec attach")
+                data += chunk
+            header, leftover = data.split(b"\r\n\r\n", 1)
+            status = int(header.split(b" ", 2)[1])
+            if status not in (101, 200):
+                raise DockerError(status, leftover.decode("utf-8", "replace").strip())
+            sock.settimeout(None)
+            return sock, leftover
+        except Exception:
+            sock.close()
+            raise
+
+    def exec_inspect(self, exec_id):
+        return self.request("GET", f"/exec/{exec_id}/json")
+
+    def exec_run(self, name, cmd, on_output=None, **kwargs):
+        """
+        Run a command to completion. on_output(stream, bytes) sees output while
+        it is produced. cmd may be a string (run with sh -c) or an argv list.
+        """
+        if isinstance(cmd, str):
+            cmd = ["sh", "-c", cmd]
+        exec_id = self.exec_create(name, cmd, **kwargs)
+        out, err = [], []
+        for stream, data in self.exec_stream(exec_id):
+            (err if stream == STDERR else out).append(data)
+            if on_output is not None:
+                on_output(stream, data)
+        exit_code = self.exec_inspect(exec_id).get("ExitCode")
+        return ExecResult(exit_code if exit_code is not None else -1,
+                          b"".join(out).decode("utf-8", "replace"),
+                          b"".join(err).decode("utf-8", "replace"))
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client, so every helper shares one connection pool."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = DockerClient()
+        return _default_client
@@ -1,13 +1,14 @@
-import subprocess
-import sys
+from src.utils.docker_client import DockerError, get_client
 
 class DockerHelper:
+    # All helpers share one pooled Docker API connection instead of forking the CLI
+
     @staticmethod
     def restart_container(container_name):
         try:
-            subprocess.run(["docker", "restart", container_name], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            get_client().restart(container_name)
             return True
-        except subprocess.CalledProcessError:
+        except (DockerError, OSError):
             return False
 
     @staticmethod
@@ -18,19 +19,11 @@ class DockerHelper:
         """
         try:
             # Use 'sh -c' to handle complex commands with pipes/redirects
-            cmd = ["docker", "exec", container_name, "sh", "-c", command]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return result.returncode, result.stdout + result.stderr
+            result = get_client().exec_run(container_name, ["sh", "-c", command])
+            return result.exit_code, result.output
         except Exception as e:
             return -1, str(e)
 
     @staticmethod
     def is_container_running(container_name):
-        try:
-            result = subprocess.run(
-                ["docker", "inspect", "-f", "{{.State.Running}}", container_name],
-                capture_output=True, text=True
-            )
-            return result.stdout.strip() == "true"
-        except:
-            return False
+        return get_client().container_running(container_name)
@@ -0,0 +1,227 @@
+"""
+Length-prefixed JSON messages over a local Unix socket, one writer to many readers.
+
+Frame: 4-byte big-endian payload length, then compact UTF-8 JSON.
+
+FanoutServer.publish() never blocks: each subscriber has its own bounded queue
+and sender thread. When a subscriber's queue is full new frames are dropped for
+that subscriber only and it is told how many it missed ({"type": "dropped"})
+once it catches up. The engine never waits on a slow console.
+"""
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME = 16 << 20
+
+
+def encode_frame(message):
+    payload = json.dumps(message, separators=(',', ':'), default=str).encode('utf-8')
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    """Incremental decoder: feed() bytes, get back the complete messages."""
+
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, data):
+        self.buffer += data
+        messages = []
+        while len(self.buffer) >= FRAME_HEADER.size:
+            (length,) = FRAME_HEADER.unpack_from(self.buffer)
+            if length > MAX_FRAME:
+                raise ValueError(f"frame of {length} bytes exceeds limit")
+            end = FRAME_HEADER.size + length
+            if len(self.buffer) < end:
+                break
+            messages.append(json.loads(self.buffer[FRAME_HEADER.size:end]))
+            self.buffer = self.buffer[end:]
+        return messages
+
+
+class _Subscriber:
+    def __init__(self, conn, max_queue, on_close):
+        self.conn = conn
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.reported = 0
+        self.sent = 0
+        self.alive = True
+        self.on_close = on_close
+        self.thread = threading.Thread(target=self._send_loop, name="fanout-sender", daemon=True)
+
+    def offer(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _send_loop(self):
+        try:
+            while self.alive:
+                try:
+                    frame = self.queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if frame is None:
+                    break
+                if self.dropped != self.reported:
+                    missed = self.dropped - self.reported
+                    self.reported = self.dropped
+                    self.conn.sendall(encode_frame({'type': 'dropped', 'count': missed}))
+                self.conn.sendall(frame)
+                self.sent += 1
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        if not self.alive:
+            return
+        self.alive = False
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        self.on_close(self)
+
+
+class FanoutServer:
+    """
+    Unix socket publisher. on_connect() may return a list of messages that is
+    sent to a new subscriber before anything else (e.g. a state snapshot).
+    It runs under the subscriber lock, so it must not call publish().
+    """
+
+    def __init__(self, path, max_queue=1000, on_connect=None):
+        self.path = path
+        self.max_queue = max_queue
+        self.on_connect = on_connect
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.sock = None
+        self.thread = None
+        self.running = False
+        self.published = 0
+
+    def start(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            # Stale socket from a previous run; refuse to steal a live one
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                probe.close()
+                raise RuntimeError(f"Another daemon is already listening on {self.path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)
+            finally:
+                probe.close()
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self.sock.listen(16)
+        self.sock.settimeout(0.5)
+        self.running = True
+        self.thread = threading.Thread(target=self._accept_loop, name="fanout-accept", daemon=True)
+        self.thread.start()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(None)
+            subscriber = _Subscriber(conn, self.max_queue, self._remove)
+            # Snapshot and registration in one critical section: a publish() that
+            # runs meanwhile waits and is queued after the snapshot, never missed
+            with self.lock:
+                for message in (self.on_connect() if self.on_connect else None) or []:
+                    subscriber.offer(encode_frame(message))
+                self.subscribers.append(subscriber)
+            subscriber.thread.start()
+
+    def _remove(self, subscriber):
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def publish(self, message):
+        """Queue a message for every subscriber. Returns the number that accepted it."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            return 0
+        # Encode once, share the bytes between subscribers
+        frame = encode_frame(message)
+        self.published += 1
+        return sum(1 for s in subscribers if s.offer(frame))
+
+    def stats(self):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        return {
+            'subscribers': len(subscribers),
+            'published': self.published,
+            'dropped': sum(s.dropped for s in subscribers),
+        }
+
+    def stop(self):
+        self.running = False
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class FanoutClient:
+    """Read-only subscriber. messages() yields dicts, or None every `timeout` seconds of silence."""
+
+    def __init__(self, path):
+        self.path = path
+        self.sock = None
+        self.decoder = FrameDecoder()
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+        return self
+
+    def messages(self, timeout=None):
+        self.sock.settimeout(timeout)
+        while True:
+            try:
+                data = self.sock.recv(1 << 16)
+            except socket.timeout:
+                yield None
+                continue
+            if not data:
+                return
+            yield from self.decoder.feed(data)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
@@ -0,0 +1,283 @@
+"""
+Low-overhead stage timing for the detect -> analyze -> immunize loop.
+
+- Histogram: fixed log-spaced buckets, observe() is a bisect plus two adds
+- REGISTRY: process-wide set of histograms, rendered in Prometheus text format
+- MetricsServer: local HTTP endpoint (/metrics, /profile, /profile/start, /profile/stop)
+- SamplingProfiler: samples one thread's stack from a side thread; off until started
+
+Stage names used across the code base:
+
+    kerneural_event_read_lag_seconds     evt.time -> line read by LogMonitor
+    kerneural_monitor_batch_seconds      read + decode of one LogMonitor batch
+    kerneural_llm_request_seconds        one Gemini round trip
+    kerneural_rule_add_seconds           RuleManager.add_rule
+    kerneural_falco_reload_seconds       reload request -> Falco live again
+    kerneural_syscall_to_rule_seconds    evt.time -> generated rule deployed
+"""
+import bisect
+import collections
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+
+# 100us .. ~100s, four buckets per decade
+DEFAULT_BUCKETS = tuple(round(10 ** (e / 4.0), 6) for e in range(-16, 9))
+
+STAGES = (
+    ('kerneural_event_read_lag_seconds', "Falco evt.time to line read by LogMonitor"),
+    ('kerneural_monitor_batch_seconds', "Read and decode of one LogMonitor batch"),
+    ('kerneural_llm_request_seconds', "One Gemini request"),
+    ('kerneural_rule_add_seconds', "RuleManager.add_rule (validate, optimize, preflight, save)"),
+    ('kerneural_falco_reload_seconds', "Falco reload request until rules are live"),
+    ('kerneural_syscall_to_rule_seconds', "Falco evt.time to generated rule deployed"),
+)
+
+
+class Histogram:
+    """Cumulative-on-render histogram with fixed bucket bounds (seconds)."""
+
+    def __init__(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0 if empty)."""
+        with self.lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+        rank = p / 100.0 * total
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank and c:
+                return self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+        return self.bounds[-1]
+
+    def snapshot(self):
+        with self.lock:
+            count, value_sum = self.count, self.sum
+        return {
+            'count': count,
+            'avg': value_sum / count if count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+        }
+
+    def render(self):
+        with self.lock:
+            counts = list(self.counts)
+            total, value_sum = self.count, self.sum
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, c in zip(self.bounds, counts):
+            cumulative += c
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {total}')
+        lines.append(f"{self.name}_sum {value_sum:.6f}")
+        lines.append(f"{self.name}_count {total}")
+        return "\n".join(lines)
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def histogram(self, name, help_text=""):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram(name, help_text))
+        return histogram
+
+    def render(self):
+        return "\n".join(h.render() for h in list(self.histograms.values())) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+for _name, _help in STAGES:
+    REGISTRY.histogram(_name, _help)
+
+
+def histogram(name):
+    return REGISTRY.histogram(name)
+
+
+def observe_event_lag(name, event, now=None):
+    """Observe now - evt.time for a Falco event (dict or FalcoEvent). Ignores events without evt.time."""
+    fields = event.get('output_fields') or {}
+    evt_time = fields.get('evt.time')
+    if not isinstance(evt_time, int):
+        return
+    now = time.time() if now is None else now
+    REGISTRY.histogram(name).observe(max(now - evt_time / 1e9, 0.0))
+
+
+def engine_stats(pipeline, brain, reload_manager):
+    """Everything the status panels show, as plain JSON-friendly dicts (daemon and local dashboard)."""
+    cache = getattr(brain, 'cache', None)
+    synthesizer = getattr(brain, 'synthesizer', None)
+    return {
+        'pipeline': pipeline.stats(),
+        'cache': cache.stats() if cache is not None else None,
+        'templates': synthesizer.stats() if synthesizer is not None else None,
+        'reload': reload_manager.stats(),
+        'latency': {name: REGISTRY.histogram(name).snapshot() for name, _ in STAGES},
+    }
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread (e.g. the ingest loop). A side thread
+    reads sys._current_frames() every `interval` seconds and counts the
+    innermost frames; nothing is done on the profiled thread itself.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005, depth=3):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.depth = depth
+        self.samples = collections.Counter()
+        self.total = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running or self.thread_id is None:
+            return False
+        self.samples.clear()
+        self.total = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+        return self.running
+
+    def _loop(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None and len(stack) < self.depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[" <- ".join(stack)] += 1
+                self.total += 1
+            time.sleep(self.interval)
+
+    def report(self, n=20):
+        lines = [f"# {self.total} samples, running={self.running}"]
+        for stack, count in self.samples.most_common(n):
+            lines.append(f"{count / max(self.total, 1):6.1%}  {stack}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves REGISTRY in Prometheus text format on a local port, plus profiler controls."""
+
+    def __init__(self, port=METRICS_PORT, host=METRICS_HOST, registry=REGISTRY, profiler=None):
+        self.port = port
+        self.host = host
+        self.registry = registry
+        self.profiler = profiler
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        server_self = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                profiler = server_self.profiler
+                if path == '/metrics':
+                    body = server_self.registry.render()
+                    content_type = "text/plain; version=0.0.4"
+                elif path.startswith('/profile') and profiler is not None:
+                    if path == '/profile/start':
+                        profiler.start()
+                    elif path == '/profile/stop':
+                        profiler.stop()
+                    body = profiler.report()
+                    content_type = "text/plain"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"Metrics endpoint disabled ({self.host}:{self.port}): {e}")
+            return False
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,32 @@
+"""
+Append-only JSONL records shared by the red side (RedAgent, run_atomic.py,
+campaign timelines) and the correlation that reads them back
+(src/blue_agent/correlation.py).
+"""
+import json
+import os
+import threading
+
+COMMAND_LOG = "logs/commands.jsonl"
+
+
+class TimelineWriter:
+    """Thread-safe JSONL writer, flushed per record so a killed run keeps its timeline."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.f = open(path, 'a')
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, separators=(',', ':'))
+        with self.lock:
+            self.f.write(line + "\n")
+            self.f.flush()
+
+    def close(self):
+        with self.lock:
+            self.f.close()
@@ -0,0 +1,44 @@
+from src.blue_agent.alert_store import OTHER, AlertStore
+
+
+def make_event(rule="Shell in container", priority="Warning", container="victim"):
+    return {
+        "time": "2025-12-09T09:14:16.123456789Z",
+        "rule": rule,
+        "priority": priority,
+        "output": "x" * 500,
+        "output_fields": {"container.name": container, "proc.cmdline": "bash"},
+    }
+
+
+def test_ring_buffer_is_bounded_and_newest_first():
+    store = AlertStore(capacity=10)
+    for i in range(25):
+        store.add(make_event(rule=f"rule {i}"))
+
+    assert store.total == 25
+    assert len(store.recent_alerts) == 10
+    assert [a.rule for a in store.recent(3)] == ["rule 24", "rule 23", "rule 22"]
+    assert len(store.recent(50)) == 10
+
+
+def test_counters_and_key_limit():
+    store = AlertStore(max_keys=2)
+    store.add(make_event(rule="a", priority="Notice"))
+    store.add(make_event(rule="a"))
+    store.add(make_event(rule="b"))
+    store.add(make_event(rule="c", container=None))
+
+    assert store.by_rule.counts == {"a": 2, "b": 1, OTHER: 1}
+    assert store.by_priority.counts == {"Notice": 1, "Warning": 3}
+    assert store.by_container.counts == {"victim": 3, "N/A": 1}
+    assert store.by_rule.top(1) == [("a", 2)]
+
+
+def test_rate_forgets_old_buckets():
+    store = AlertStore(rate_window=60)
+    for _ in range(30):
+        store.add(make_event(), now=1000.0)
+    assert store.rate(now=1000.0) == 0.5
+    assert store.rate(now=1059.0) == 0.5
+    assert store.rate(now=1061.0) == 0.0
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+
+from src.blue_agent.archive import EventArchive, SegmentIndex
+
+
+def _write(path, start, count):
+    with open(path, "a") as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({
+                "rule": f"rule-{i % 4}",
+                "priority": "Warning",
+                "tags": ["container"] if i % 2 else ["host"],
+                "output_fields": {"evt.time": (1000 + i) * 10**9, "container.name": f"c{i % 3}"},
+            }) + "\n")
+
+
+def test_roll_builds_segments_and_indexes(tmp_path):
+    log = tmp_path / "falco_events.json"
+    archive = EventArchive(str(tmp_path / "archive"), max_segment_bytes=600, block_events=10, roll_grace=0)
+    _write(log, 0, 100)
+
+    assert archive.roll(str(log)) == 100
+    assert log.exists() and log.stat().st_size == 0
+
+    paths = archive.segment_paths()
+    assert len(paths) > 1
+    index = SegmentIndex(paths[0][:-len(".jsonl.gz")] + ".idx")
+    offset, length, count, tmin, tmax = index.block(0)
+    assert (offset, count, tmin) == (0, 10, 1000 * 10**9)
+    assert index.blocks_for("rules", "rule-1") == set(range(index.count))
+    assert index.blocks_for("rules", "missing") == set()
+    index.close()
+
+
+def test_query_filters_by_time_rule_container_and_tag(tmp_path):
+    log = tmp_path / "falco_events.json"
+    archive = EventArchive(str(tmp_path / "archive"), block_events=8, roll_grace=0)
+    _write(log, 0, 40)
+    archive.roll(str(log))
+    _write(log, 40, 40)
+    archive.roll(str(log))
+
+    # Second roll appends to the same segment
+    assert len(archive.segment_paths()) == 1
+    assert len(list(archive.query())) == 80
+
+    hits = list(archive.query(start=1010, end=1019, container="c0"))
+    assert [e["output_fields"]["evt.time"] // 10**9 for e in hits] == [1012, 1015, 1018]
+
+    hits = list(archive.query(rule="rule-1", tag="container"))
+    assert len(hits) == 20
+    assert list(archive.query(rule="missing")) == []
+    assert len(list(archive.query(limit=5))) == 5
+
+
+def test_tailer_rolls_on_size_and_age(tmp_path):
+    log = tmp_path / "falco_events.json"
+    archive = EventArchive(str(tmp_path / "archive"), roll_seconds=60, roll_bytes=4096, roll_grace=0)
+    _write(log, 0, 5)
+    assert not archive.maybe_roll(str(log), now=archive.last_roll + 1)
+
+    # Big enough: rolled and archived off the caller's thread
+    _write(log, 5, 50)
+    assert archive.maybe_roll(str(log), now=archive.last_roll + 2)
+    archive.wait()
+    assert log.stat().st_size == 0 and len(list(archive.query())) == 55
+
+    # Small but old: rolled only because roll_seconds is set
+    _write(log, 55, 5)
+    assert not EventArchive(str(tmp_path / "other")).maybe_roll(str(log), now=time.monotonic() + 10**6)
+    assert not archive.maybe_roll(str(log), now=archive.last_roll + 30)
+    assert archive.maybe_roll(str(log), now=archive.last_roll + 61)
+    archive.wait()
+    assert len(list(archive.query())) == 60
+
+
+def test_rule_query_matches_json_escaped_names(tmp_path):
+    log = tmp_path / "falco_events.json"
+    names = ['Read "shadow" file', 'Path C:\\temp', "Đọc file nhạy cảm"]
+    with open(log, "w", encoding="utf-8") as f:
+        for i, name in enumerate(names):
+            event = {"rule": name, "output_fields": {"evt.time": (1000 + i) * 10**9}}
+            # Falco writes UTF-8 as is; other writers escape it
+            f.write(json.dumps(event, ensure_ascii=i != 2) + "\n")
+        f.write(json.dumps({"rule": names[2], "output_fields": {"evt.time": 1003 * 10**9}}) + "\n")
+    archive = EventArchive(str(tmp_path / "archive"), roll_grace=0)
+    archive.roll(str(log))
+
+    for name in names:
+        assert {e["rule"] for e in archive.query(rule=name)} == {name}
+    assert len(list(archive.query(rule=names[2]))) == 2
+
+
+def test_concurrent_rollers_never_corrupt_the_archive(tmp_path):
+    directory = str(tmp_path / "archive")
+    # Two processes sharing one directory, e.g. the daemon and the roll CLI
+    first, second = (EventArchive(directory, block_events=8, roll_grace=0),
+                     EventArchive(directory, block_events=8, roll_grace=0))
+    logs = [tmp_path / "a.json", tmp_path / "b.json"]
+    start = 0
+    for _ in range(5):
+        for log in logs:
+            _write(log, start, 30)
+            start += 30
+        # A roll left half done: the other process recovers it while this one rolls
+        os.makedirs(directory, exist_ok=True)
+        _write(tmp_path / "archive" / f"incoming-{start}.json", start, 30)
+        start += 30
+        threads = [threading.Thread(target=first.roll, args=(str(logs[0]),)),
+                   threading.Thread(target=second.recover),
+                   threading.Thread(target=second.roll, args=(str(logs[1]),))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    times = sorted(e["output_fields"]["evt.time"] for e in first.query())
+    assert times == [(1000 + i) * 10**9 for i in range(start)]
+    assert not [n for n in os.listdir(directory) if n.startswith(("incoming-", "claimed-"))]
+
+
+def test_damaged_block_is_skipped(tmp_path):
+    log = tmp_path / "falco_events.json"
+    archive = EventArchive(str(tmp_path / "archive"), block_events=10, roll_grace=0)
+    _write(log, 0, 30)
+    archive.roll(str(log))
+    path = archive.segment_paths()[0]
+    index = SegmentIndex(path[:-len(".jsonl.gz")] + ".idx")
+    offset, length, _, _, _ = index.block(1)
+    index.close()
+    with open(path, "r+b") as f:
+        f.seek(offset + length // 2)
+        f.write(b"\0" * 8)
+    assert len(list(archive.query())) == 20
+
+
+def test_write_in_flight_during_roll_is_archived(tmp_path):
+    log = tmp_path / "falco_events.json"
+    archive = EventArchive(str(tmp_path / "archive"), roll_grace=0.5)
+    _write(log, 0, 10)
+    # Falco opened the file just before the rename and writes after it
+    late = open(log, "a")
+    roller = threading.Thread(target=archive.roll, args=(str(log),))
+    roller.start()
+    time.sleep(0.1)
+    late.write(json.dumps({"rule": "late", "output_fields": {"evt.time": 2000 * 10**9}}) + "\n")
+    late.close()
+    roller.join()
+    assert len(list(archive.query())) == 11
+    assert [e["rule"] for e in archive.query(rule="late")] == ["late"]
@@ -0,0 +1,120 @@
+import os
+import tarfile
+
+from src.red_agent.atomic_client import AtomicClient, AtomicIndex, substitute
+
+T1059 = """
+attack_technique: T1059.004
+display_name: 'Command and Scripting Interpreter: Bash'
+atomic_tests:
+- name: Create and Execute Bash Shell Script
+  auto_generated_guid: 7e7ac3ed-f795-4fa5-b711-09d6fbe9b873
+  description: Creates and executes a simple sh script.
+  supported_platforms: [macos, linux]
+  input_arguments:
+    script_path:
+      type: path
+      default: /tmp/art.sh
+  executor:
+    name: sh
+    command: |
+      sh -c "echo 'echo Hello from the Atomic Red Team' > #{script_path}"
+      sh #{script_path} #{missing}
+    cleanup_command: 'rm #{script_path}'
+- name: Windows only
+  supported_platforms: [windows]
+  executor: {name: powershell, command: whoami}
+"""
+
+T1555 = """
+attack_technique: T1555
+display_name: Credentials from Password Stores
+atomic_tests:
+- name: Read shadow
+  auto_generated_guid: 1111
+  description: cat shadow
+  supported_platforms: [linux]
+  executor: {name: bash, command: cat /etc/shadow, elevation_required: true}
+"""
+
+TACTICS = """Tactic,Technique #,Technique Name,Test #,Test Name,Test GUID,Executor Name
+execution,T1059.004,Bash,1,Create and Execute Bash Shell Script,7e7a,sh
+credential-access,T1555,Credentials from Password Stores,1,Read shadow,1111,bash
+"""
+
+
+def _mirror(root):
+    for technique, text in (("T1059.004", T1059), ("T1555", T1555)):
+        os.makedirs(root / "atomics" / technique)
+        (root / "atomics" / technique / f"{technique}.yaml").write_text(text)
+    os.makedirs(root / "atomics" / "Indexes" / "Indexes-CSV")
+    (root / "atomics" / "Indexes" / "Indexes-CSV" / "linux-index.csv").write_text(TACTICS)
+    return root
+
+
+def test_substitute_is_single_pass():
+    assert substitute("a #{x} #{y} #{z}", {'x': '#{y}', 'y': 2}) == "a #{y} 2 #{z}"
+
+
+def test_index_from_directory_and_tarball(tmp_path):
+    mirror = _mirror(tmp_path / "art")
+    index_path = str(tmp_path / "index.bin")
+    client = AtomicClient(mirror=str(mirror), cache_dir=str(tmp_path / "cache"), index_path=index_path, online=False)
+
+    tests = client.fetch_technique("T1059.004")
+    assert len(tests) == 1
+    assert tests[0]['commands'].splitlines()[1] == "sh /tmp/art.sh #{missing}"
+    assert tests[0]['cleanup'] == "rm /tmp/art.sh"
+    assert tests[0]['tactics'] == ['execution']
+    assert [t['name'] for t in client.index.find(tactic='credential-access', executor='bash')] == ["Read shadow"]
+    assert client.index.find(tactic='execution', executor='bash') == []
+    assert client.fetch_technique("T9999") == []
+
+    # Unchanged mirror: the saved index is loaded, not rebuilt
+    built = os.stat(index_path).st_mtime_ns
+    again = AtomicClient(mirror=str(mirror), cache_dir=str(tmp_path / "cache"), index_path=index_path, online=False)
+    assert os.stat(index_path).st_mtime_ns == built
+    assert again.index.tests == client.index.tests
+
+    tarball = tmp_path / "art.tar.gz"
+    with tarfile.open(tarball, "w:gz") as tar:
+        tar.add(mirror, arcname="atomic-red-team-master")
+    from_tar = AtomicIndex.build([str(tarball)])
+    assert from_tar.tests == client.index.tests and from_tar.tactics == client.index.tactics
+
+
+class FakeResponse:
+    def __init__(self, status, text="", headers=None):
+        self.status_code = status
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls.append((url.rsplit("/", 1)[-1], dict(headers or {})))
+        if "T1555" not in url:
+            return FakeResponse(404)
+        if headers.get('If-None-Match') == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(200, T1555, {'ETag': '"v1"'})
+
+
+def test_refresh_uses_conditional_requests(tmp_path):
+    index_path = str(tmp_path / "index.bin")
+    client = AtomicClient(mirror=str(tmp_path / "missing"), cache_dir=str(tmp_path / "cache"), index_path=index_path)
+    client.session = FakeSession()
+
+    assert [t['name'] for t in client.fetch_technique("T1555")] == ["Read shadow"]
+    assert client.refresh(["T1555", "T0000"]) == {"T1555": 304, "T0000": 404}
+    assert client.session.calls[-2:] == [("T1555.yaml", {'If-None-Match': '"v1"'}), ("T0000.yaml", {})]
+
+    offline = AtomicClient(mirror=str(tmp_path / "missing"), cache_dir=str(tmp_path / "cache"),
+                           index_path=index_path, online=False)
+    assert [t['name'] for t in offline.fetch_technique("T1555")] == ["Read shadow"]
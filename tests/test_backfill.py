@@ -0,0 +1,51 @@
+import json
+
+from src.blue_agent.alert_store import AlertStore
+from src.blue_agent.backfill import SummarySnapshot, backfill, tail_events
+
+
+def _write(path, start, count, partial=False):
+    with open(path, "a") as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({
+                "rule": f"rule-{i % 3}",
+                "priority": "Warning",
+                "output_fields": {"evt.time": (1000 + i) * 10**9, "container.name": "victim"},
+            }) + "\n")
+        if partial:
+            f.write('{"rule": "half')
+
+
+def test_tail_reads_backwards_across_blocks(tmp_path):
+    log = tmp_path / "falco_events.json"
+    _write(log, 0, 50, partial=True)
+
+    entries, end = tail_events(str(log), max_events=5, block_size=64)
+    times = [e["output_fields"]["evt.time"] // 10**9 for _, e in entries]
+    assert times == [1045, 1046, 1047, 1048, 1049]
+    # Partial last line is left for the tailer
+    assert log.read_bytes()[end:] == b'{"rule": "half'
+    for offset, event in entries:
+        assert json.loads(log.read_bytes()[offset:].split(b"\n")[0]) == event
+
+    entries, _ = tail_events(str(log), max_events=None, since=1040, block_size=64)
+    assert len(entries) == 10
+
+
+def test_counters_come_from_snapshot_plus_newer_events(tmp_path):
+    log = tmp_path / "falco_events.json"
+    summary = SummarySnapshot(str(tmp_path / "summary.json"))
+    _write(log, 0, 30)
+
+    first = AlertStore()
+    assert backfill(first, str(log), summary, max_events=10) == log.stat().st_size
+    assert first.total == 10
+    first.restore({"total": 30, "by_rule": {"rule-0": 10, "rule-1": 10, "rule-2": 10}})
+    assert summary.save(first, str(log), log.stat().st_size)
+
+    _write(log, 30, 20)
+    second = AlertStore()
+    backfill(second, str(log), summary, max_events=5)
+    assert second.total == 50
+    assert sum(second.by_rule.counts.values()) == 50
+    assert len(second.recent_alerts) == 20
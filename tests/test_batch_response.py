@@ -0,0 +1,46 @@
+from src.neural_core.gemini_client import NeuralBrain
+
+
+def _brain():
+    # Parsing does not need the Gemini client
+    return NeuralBrain.__new__(NeuralBrain)
+
+
+def test_split_keeps_good_rules_when_one_is_malformed():
+    text = """```yaml
+### EVENT 1
+- rule: Detect Cat Shadow
+  desc: d
+  condition: spawned_process and proc.name = "cat"
+  output: "x=%proc.name"
+  priority: WARNING
+### EVENT 2
+- rule: Broken
+  condition: [unclosed
+### EVENT 3
+SKIP
+### EVENT 4
+- rule: Detect Whoami
+  desc: d
+  condition: spawned_process and proc.name = "whoami"
+  output: "x=%proc.name"
+  priority: WARNING
+```"""
+    rules = _brain().split_batch_response(text, 4)
+    assert rules[0].startswith("- rule: Detect Cat Shadow")
+    assert rules[1] is None
+    assert rules[2] is None
+    assert rules[3].startswith("- rule: Detect Whoami")
+
+
+def test_cache_key_covers_the_batch_prompt(monkeypatch):
+    from src.neural_core import gemini_client
+    from src.neural_core.encoder import PromptEncoder
+
+    brain = _brain()
+    brain.model_name = "test"
+    brain.encoder = PromptEncoder()
+    log_entry = '{"rule": "r", "output_fields": {"proc.cmdline": "id"}}'
+    before = brain._cache_key(log_entry)
+    monkeypatch.setattr(gemini_client, "BATCH_RULE_GENERATION_PROMPT", "changed {count} {events_block}")
+    assert brain._cache_key(log_entry) != before
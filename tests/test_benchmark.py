@@ -0,0 +1,9 @@
+from src.benchmark.harness import run_benchmark
+
+
+def test_replay_smoke():
+    result = run_benchmark("logs/falco_events.json.backup", mode="bursty", rate=5000, burst=50,
+                           workers=2, brain_latency=0.01, drain_timeout=10.0)
+    assert result["events_read"] == result["events_written"] == 237
+    assert result["rules_deployed"] == result["llm_calls"] > 0
+    assert result["rule_latency_ms"][99] >= result["rule_latency_ms"][50] > 0
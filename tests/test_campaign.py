@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.red_agent.campaign import Campaign, CampaignRunner
+from src.utils.docker_client import ExecResult
+
+CAMPAIGN = {
+    'name': 'test',
+    'targets': ['victim-1', 'victim-2'],
+    'rate': 50,
+    'workers': 2,
+    'repetitions': 2,
+    'techniques': [
+        'T1059.004',
+        {'id': 'custom', 'repetitions': 1, 'targets': ['victim-1'],
+         'commands': ['touch /tmp/x', 'explode'], 'cleanup': ['rm -f /tmp/x']},
+    ],
+}
+
+
+class FakeExecutor:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, target, command):
+        with self.lock:
+            self.calls.append((target, command))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if command == 'explode':
+                raise RuntimeError("exec failed")
+            return ExecResult(0 if command != 'cat /etc/shadow' else 1, "", "")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_schedule_spreads_repetitions_over_targets():
+    campaign = Campaign.from_dict(CAMPAIGN)
+    plan = [(round(offset, 3), attack.technique, target, rep) for offset, attack, target, rep in campaign.schedule()]
+    assert plan == [
+        (0.0, 'T1059.004', 'victim-1', 0), (0.02, 'T1059.004', 'victim-2', 0),
+        (0.04, 'custom', 'victim-1', 0),
+        (0.06, 'T1059.004', 'victim-1', 1), (0.08, 'T1059.004', 'victim-2', 1),
+    ]
+    with pytest.raises(ValueError):
+        Campaign.from_dict({'targets': ['victim'], 'techniques': ['T9999']})
+
+
+def test_all_targets_include_technique_overrides():
+    data = dict(CAMPAIGN, techniques=CAMPAIGN['techniques'] + [
+        {'id': 'lateral', 'targets': ['victim-3'], 'commands': ['id']}])
+    assert Campaign.from_dict(data).all_targets() == ['victim-1', 'victim-2', 'victim-3']
+
+
+def test_runner_paces_bounds_workers_and_always_cleans_up(tmp_path):
+    campaign = Campaign.from_dict(CAMPAIGN)
+    executor = FakeExecutor(delay=0.01)
+    timeline = tmp_path / "timeline.jsonl"
+    result = CampaignRunner(campaign, timeline_path=str(timeline), execute=executor).run()
+
+    assert result['attacks'] == 5
+    assert result['commands'] == 4 * 4 + 2
+    assert result['failed'] == 1
+    assert result['cleanup_commands'] == 1 and result['cleanup_failed'] == 0
+    assert executor.max_in_flight <= 2
+    assert 20 <= result['achieved_rate'] <= 55
+
+    records = [json.loads(line) for line in timeline.read_text().splitlines()]
+    assert len(records) == 19
+    custom = [r for r in records if r['technique'] == 'custom']
+    assert [r['phase'] for r in custom] == ['attack', 'attack', 'cleanup']
+    assert custom[1]['error'] == "exec failed" and custom[1]['exit_code'] is None
+    assert all(r['scheduled'] <= r['start'] <= r['end'] for r in records)
+
+
+def test_stop_skips_remaining_attacks_but_runs_cleanup(tmp_path):
+    campaign = Campaign.from_dict({
+        'targets': ['victim'], 'rate': 0, 'workers': 1,
+        'techniques': [{'id': 'slow', 'commands': ['a', 'b', 'c'], 'cleanup': ['undo']}],
+    })
+    runner = CampaignRunner(campaign, timeline_path=str(tmp_path / "t.jsonl"), execute=FakeExecutor(delay=0.1))
+    threading.Timer(0.05, runner.stop).start()
+    result = runner.run()
+
+    assert [r['command'] for r in runner.records] == ['a', 'undo']
+    assert result['interrupted']
@@ -0,0 +1,91 @@
+import json
+
+from src.blue_agent.correlation import Correlator, cmdline_score, correlate_files
+
+T0 = 1_700_000_000.0
+
+
+def _event(t, container, cmdline, rule="Read sensitive file untrusted"):
+    return {'rule': rule, 'priority': 'Warning',
+            'output_fields': {'evt.time': int((T0 + t) * 1e9), 'container.name': container,
+                              'proc.cmdline': cmdline}}
+
+
+def _command(t, technique, command, target="victim", duration=0.5, phase='attack'):
+    return {'technique': technique, 'target': target, 'command': command, 'phase': phase,
+            'start': T0 + t, 'end': T0 + t + duration}
+
+
+def test_cmdline_score():
+    assert cmdline_score("cat /etc/shadow", "cat /etc/shadow") == 2
+    assert cmdline_score("cat /etc/shadow | head -1", "head -1") == 2
+    assert cmdline_score("cat /etc/shadow | head -1", "/usr/bin/head -n1") == 1
+    assert cmdline_score("cat /etc/shadow", "nginx: worker process") == 0
+    assert cmdline_score("id", "sh -c id") == 2
+    assert cmdline_score("sh -c 'cat /etc/shadow'", "cat /etc/shadow") == 2
+
+
+def test_short_event_cmdlines_do_not_match_substrings():
+    # The session shell / "Terminal shell in container" event is a bare `sh`
+    assert cmdline_score("cat /etc/shadow", "sh") == 0
+    assert cmdline_score("cat /proc/1/pid_max", "id") == 0
+    assert cmdline_score("sh /tmp/art.sh", "sh") == 0
+    assert cmdline_score("whoami", "whoami") == 2
+
+    c = Correlator(slack=0.5, lateness=5.0)
+    c.add_command(_command(0, "T1555", "cat /etc/shadow"))
+    assert c.add_event(_event(0.1, "victim", "sh", rule="Terminal shell in container")) is None
+    assert c.report()['techniques']['T1555']['detected'] == 0
+
+
+def test_events_are_joined_by_container_time_and_cmdline():
+    c = Correlator(slack=0.5, lateness=5.0)
+    c.add_command(_command(0, "T1555", "cat /etc/shadow"))
+    c.add_command(_command(0, "T1555", "cat /etc/shadow", target="victim-2"))
+    c.add_command(_command(0.1, "T1059.004", "whoami", duration=0.2))
+    c.add_command(_command(10, "T1555", "cat /etc/passwd"))
+    c.add_command(_command(20, "T1555", "rm -f /tmp/x", phase='cleanup'))
+
+    assert c.add_event(_event(0.2, "victim", "whoami", rule="Shell recon")).command == "whoami"
+    assert c.add_event(_event(0.3, "victim", "cat /etc/shadow"), arrived=T0 + 1.5).command == "cat /etc/shadow"
+    # Wrong container, outside every window, unrelated process
+    assert c.add_event(_event(0.3, "other", "cat /etc/shadow")) is None
+    assert c.add_event(_event(5.0, "victim", "cat /etc/shadow")) is None
+    assert c.add_event(_event(10.1, "victim", "nginx: worker process")) is None
+    assert not c.add_event(_event(20.1, "victim", "rm -f /tmp/x")).counted
+
+    c.add_deployment({'time': T0 + 4.0, 'rule': "Read sensitive file untrusted", 'container': "victim"})
+    report = c.report()
+
+    assert (report['commands'], report['detected']) == (4, 2)
+    t1555 = report['techniques']['T1555']
+    assert (t1555['commands'], t1555['detected']) == (3, 1)
+    assert abs(t1555['time_to_detect']['p50'] - 1.5) < 1e-6
+    assert abs(t1555['time_to_rule']['p50'] - 4.0) < 1e-6
+    assert t1555['rules'] == {"Read sensitive file untrusted": 1}
+    assert report['techniques']['T1059.004']['coverage'] == 1.0
+    assert report['techniques']['T1059.004']['time_to_rule']['count'] == 0
+
+
+def test_event_before_command_record_and_eviction():
+    c = Correlator(slack=0.5, lateness=2.0, evict_every=1)
+    # Falco alert read before the red side wrote its record
+    assert c.add_event(_event(1.0, "victim", "id")) is None
+    c.add_command(_command(0.9, "T1059.004", "id"))
+    assert c.report()['detected'] == 1
+
+    for i in range(100):
+        c.add_command(_command(10 + i, "T1059.004", "id", duration=0.1))
+        c.add_event(_event(10 + i + 0.05, "victim", "id"))
+    lane = c.lanes["victim"]
+    assert len(lane.commands) <= 4 and not lane.events
+    assert c.report()['detected'] == 101
+
+
+def test_correlate_files(tmp_path):
+    commands = tmp_path / "commands.jsonl"
+    commands.write_text("\n".join(json.dumps(_command(i, "T1555", "cat /etc/shadow")) for i in range(3)) + "\n")
+    events = tmp_path / "falco.json"
+    events.write_text(json.dumps(_event(1.2, "victim", "cat /etc/shadow")) + "\nnot json\n")
+    report = correlate_files([str(commands)], [str(events)], [str(tmp_path / "missing.jsonl")])
+    assert (report['commands'], report['detected'], report['events']) == (3, 1, 1)
@@ -0,0 +1,54 @@
+import threading
+
+from src.dashboard import KerneuralDashboard
+
+
+def _dashboard():
+    # Attached consoles own no brain, rule manager or pipeline
+    dashboard = KerneuralDashboard(attach="/nonexistent.sock")
+    dashboard.builds = {"alerts": 0, "neural_core": 0}
+
+    def counting(panel, generate):
+        def build():
+            dashboard.builds[panel] += 1
+            return generate()
+        return build
+
+    dashboard.generate_alert_table = counting("alerts", dashboard.generate_alert_table)
+    dashboard.generate_neural_panel = counting("neural_core", dashboard.generate_neural_panel)
+    return dashboard
+
+
+def test_panels_rebuild_only_when_dirty():
+    dashboard = _dashboard()
+    layout = dashboard.make_layout()
+    assert {"alerts", "neural_core"} <= dashboard.render(layout, now=1.0)
+    assert dashboard.builds == {"alerts": 1, "neural_core": 1}
+
+    # Nothing marked: later ticks leave both panels alone
+    for now in (2.0, 3.0):
+        assert not {"alerts", "neural_core"} & dashboard.render(layout, now=now)
+    dashboard.mark_dirty("neural_core")
+    dashboard.render(layout, now=4.0)
+    assert dashboard.builds == {"alerts": 1, "neural_core": 2}
+
+
+def test_burst_of_marks_rebuilds_once_per_tick():
+    dashboard = _dashboard()
+    layout = dashboard.make_layout()
+    dashboard.render(layout, now=1.0)
+
+    def burst():
+        for _ in range(1000):
+            dashboard.mark_dirty("alerts", "status")
+
+    threads = [threading.Thread(target=burst) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Inside the same refresh tick nothing is rebuilt yet
+    assert dashboard.render(layout, now=1.1) == set()
+    assert "alerts" in dashboard.render(layout, now=2.0)
+    assert dashboard.render(layout, now=2.1) == set()
+    assert dashboard.builds["alerts"] == 2
@@ -0,0 +1,50 @@
+import json
+
+from src.blue_agent.dedup import EventDeduplicator, event_signature
+
+
+def _event(cmdline, tags=("container",)):
+    return {
+        "rule": "Container Root Shell Executes LS LA TMP",
+        "priority": "Warning",
+        "output_fields": {"proc.cmdline": cmdline, "container.name": "victim", "evt.time": 1},
+        "tags": list(tags),
+    }
+
+
+def test_signature_ignores_noise_but_not_content():
+    a = _event("ls  -la /tmp", tags=("b", "a"))
+    b = _event("ls -la /tmp", tags=("a", "b"))
+    b["output_fields"]["evt.time"] = 2
+    assert event_signature(a) == event_signature(b)
+    assert event_signature(a) != event_signature(_event("ls -la /etc", tags=("a", "b")))
+
+
+def test_repeats_collapse_within_window_and_expire():
+    dedup = EventDeduplicator(window=10.0)
+    sig, dup = dedup.check(_event("ls -la /tmp"), now=0.0)
+    assert not dup
+    for t in (1.0, 2.0, 3.0):
+        assert dedup.check(_event("ls -la /tmp"), now=t)[1]
+    assert dedup.hits(sig) == 4
+
+    # Window is measured from the first hit
+    assert not dedup.check(_event("ls -la /tmp"), now=10.5)[1]
+    assert dedup.stats()["suppressed"] == 3
+
+
+def test_index_is_bounded():
+    dedup = EventDeduplicator(window=1000.0, max_entries=5)
+    for i in range(50):
+        dedup.check(_event(f"cmd {i}"), now=float(i))
+    stats = dedup.stats()
+    assert stats["entries"] == 5
+    assert stats["evicted"] == 45
+
+
+def test_recorded_corpus_collapses():
+    dedup = EventDeduplicator(window=3600.0 * 24 * 365)
+    with open("logs/falco_events.json.backup") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    analyzed = sum(1 for e in events if not dedup.check(e, now=0.0)[1])
+    assert analyzed < len(events) / 5
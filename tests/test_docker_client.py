@@ -0,0 +1,125 @@
+import json
+import socketserver
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from src.utils.docker_client import STDERR, STDOUT, DockerClient, DockerError
+
+
+def _frame(stream, data):
+    return struct.pack(">BxxxI", stream, len(data)) + data
+
+
+class FakeDocker(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.connections = 0
+        self.requests = []
+        self.killed = []
+        super().__init__(path, FakeHandler)
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def address_string(self):
+        return "fake"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        if self.path == "/v1.41/containers/victim/json":
+            self._json(200, {"State": {"Running": True}})
+        elif self.path == "/v1.41/exec/e1/json":
+            self._json(200, {"ExitCode": 3, "Running": False})
+        elif self.path.startswith("/v1.41/containers/falco/logs"):
+            data = _frame(STDERR, b"Loading rules from /etc/falco/falco_rules.yaml\n")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._json(404, {"message": "No such container: ghost"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        self.server.requests.append(("POST", self.path))
+        if self.path == "/v1.41/containers/victim/exec":
+            assert body["Cmd"] == ["sh", "-c", "cat /etc/shadow"]
+            self._json(201, {"Id": "e1"})
+        elif self.path == "/v1.41/exec/e1/start":
+            # Docker hijacks the connection: raw multiplexed stream until close
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+            self.end_headers()
+            self.wfile.write(_frame(STDOUT, b"root:x:0:0\n") + _frame(STDERR, b"warn\n") + _frame(STDOUT, b"done\n"))
+            self.close_connection = True
+        elif self.path.startswith("/v1.41/containers/falco/kill"):
+            self.server.killed.append(self.path.split("signal=")[1])
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._json(404, {"message": "not found"})
+
+
+@pytest.fixture
+def docker(tmp_path):
+    server = FakeDocker(str(tmp_path / "docker.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = DockerClient(socket_path=server.server_address)
+    yield server, client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_one_pooled_connection(docker):
+    server, client = docker
+    for _ in range(5):
+        assert client.container_running("victim")
+    client.kill("falco", signal="SIGHUP")
+    assert server.killed == ["SIGHUP"]
+    assert server.connections == 1
+    assert client.connections_opened == 1
+
+    assert "Loading rules" in client.logs("falco", since=1700000000.25)
+    assert "since=1700000000.250000000" in server.requests[-1][1]
+
+    assert not client.container_running("ghost")
+    with pytest.raises(DockerError) as err:
+        client.inspect_container("ghost")
+    assert err.value.status == 404 and "ghost" in err.value.message
+
+
+def test_exec_streams_output_and_reports_exit_code(docker):
+    server, client = docker
+    seen = []
+    result = client.exec_run("victim", "cat /etc/shadow", on_output=lambda s, d: seen.append((s, d)))
+
+    assert result.exit_code == 3
+    assert result.stdout == "root:x:0:0\ndone\n"
+    assert result.stderr == "warn\n"
+    assert seen[0] == (STDOUT, b"root:x:0:0\n")
+    assert [r[1] for r in server.requests] == [
+        "/v1.41/containers/victim/exec", "/v1.41/exec/e1/start", "/v1.41/exec/e1/json"]
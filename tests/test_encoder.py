@@ -0,0 +1,79 @@
+import json
+
+from src.benchmark.prompt import load, measure
+from src.neural_core.encoder import PromptEncoder, count_tokens
+from src.neural_core.gemini_client import NeuralBrain
+
+EVENT = {
+    "hostname": "57c33aa631ef",
+    "output": "06:21:54.405053994: Warning Sensitive file opened for reading by non-trusted program | file=/etc/shadow ...",
+    "output_fields": {"evt.time": 1764829314405053994, "evt.type": "openat", "fd.name": "/etc/shadow",
+                      "proc.aname[2]": None, "proc.aname[3]": None, "proc.cmdline": "cat /etc/shadow",
+                      "proc.exepath": "/usr/bin/cat", "proc.name": "cat", "proc.pname": "bash",
+                      "user.name": "root", "user.uid": 0, "container.id": "ce34", "container.name": "ce34"},
+    "priority": "Warning",
+    "rule": "Read sensitive file untrusted",
+    "source": "syscall",
+    "tags": ["T1555", "container", "filesystem", "mitre_credential_access"],
+    "time": "2025-12-04T06:21:54.405053994Z",
+}
+
+
+def test_projection_drops_noise_nulls_and_duplicates():
+    encoded = json.loads(PromptEncoder().encode(json.dumps(EVENT)))
+    assert set(encoded) == {"rule", "priority", "output_fields"}
+    fields = encoded["output_fields"]
+    assert list(fields)[:3] == ["proc.cmdline", "proc.name", "fd.name"]
+    assert "evt.time" not in fields and "user.uid" not in fields and "proc.aname[2]" not in fields
+    # container.id repeats container.name
+    assert fields["container.name"] == "ce34" and "container.id" not in fields
+
+
+def test_proc_name_survives_when_it_equals_cmdline():
+    event = {"rule": "Terminal shell in container",
+             "output_fields": {"proc.cmdline": "bash", "proc.name": "bash", "proc.pname": "runc"}}
+    fields = json.loads(PromptEncoder().encode(event))["output_fields"]
+    assert fields == {"proc.cmdline": "bash", "proc.name": "bash", "proc.pname": "runc"}
+
+
+def test_budget_drops_least_useful_fields_then_shortens():
+    encoder = PromptEncoder(budget=40)
+    text = encoder.encode(json.dumps(EVENT))
+    assert count_tokens(text) <= 40
+    assert list(json.loads(text)["output_fields"]) == ["proc.cmdline", "proc.name", "fd.name"]
+
+    event = dict(EVENT, output_fields={"proc.name": "sh", "proc.cmdline": "sh -c " + "A" * 2000})
+    text = encoder.encode(event)
+    assert count_tokens(text) <= 40
+    assert json.loads(text)["output_fields"]["proc.cmdline"].endswith("...")
+
+    texts = PromptEncoder(budget=80).encode_batch([event, event])
+    assert all(count_tokens(t) <= 40 for t in texts)
+
+
+def test_corpus_gets_smaller():
+    stats = measure(load("logs/falco_events.json.backup"), PromptEncoder())
+    assert stats["event_tokens_after"] < stats["event_tokens_before"] / 2
+
+
+class _Model:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return type("Response", (), {"text": "SKIP"})()
+
+
+def test_brain_sends_encoded_event():
+    brain = NeuralBrain.__new__(NeuralBrain)
+    brain.model_name = "test"
+    brain.model = _Model()
+    brain.cache = None
+    brain.synthesizer = None
+    brain.encoder = PromptEncoder()
+
+    brain.analyze_log_and_generate_rule(json.dumps(EVENT))
+    prompt = brain.model.prompts[0]
+    assert '"proc.cmdline":"cat /etc/shadow"' in prompt
+    assert "hostname" not in prompt and "non-trusted program" not in prompt
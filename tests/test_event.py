@@ -0,0 +1,48 @@
+import json
+
+from src.blue_agent.dedup import event_signature
+from src.blue_agent.event import FalcoEvent, event_json, output_field
+from src.blue_agent.monitor import LogMonitor
+
+EVENT = {
+    "hostname": "57c33aa631ef",
+    "output": "Warning Sensitive file opened for reading (file=/etc/shadow command=cat \"/etc/shadow\")",
+    "output_fields": {"container.name": "victim", "evt.time": 1764829314405053994,
+                      "fd.name": "/etc/shadow", "proc.cmdline": "cat /etc/shadow", "user.loginuid": None},
+    "priority": "Warning",
+    "rule": "Read sensitive file untrusted",
+    "source": "syscall",
+    "tags": ["T1555", "filesystem"],
+    "time": "2025-12-04T06:21:54.405053994Z",
+}
+
+
+def test_decodes_hot_fields_and_keeps_raw():
+    raw = json.dumps(EVENT).encode()
+    event = FalcoEvent.from_bytes(raw)
+
+    assert (event.rule, event.priority, event.source) == ("Read sensitive file untrusted", "Warning", "syscall")
+    assert event.container == "victim"
+    assert event.evt_time == 1764829314405053994
+    assert output_field(event, "user.loginuid", "N/A") == output_field(EVENT, "user.loginuid", "N/A") == "N/A"
+    assert event_json(event) == raw.decode()
+    # Dict-style access still works, 'output' is parsed lazily from the raw bytes
+    assert event["output"] == EVENT["output"]
+    assert "missing" not in event
+    assert event_signature(event) == event_signature(EVENT)
+
+
+def test_invalid_lines_are_rejected():
+    assert FalcoEvent.from_bytes(b'{"rule": "half') is None
+    assert FalcoEvent.from_bytes(b'[1, 2]') is None
+
+
+def test_monitor_yields_typed_events(tmp_path):
+    log = tmp_path / "falco_events.json"
+    log.write_text(json.dumps(EVENT) + "\nnot json\n")
+
+    monitor = LogMonitor(str(log), from_start=True, decoder=FalcoEvent.from_bytes)
+    batch = next(monitor.batches(idle_timeout=0.05))
+    monitor.stop()
+    assert [type(e) for e in batch] == [FalcoEvent]
+    assert monitor.bad_lines == 1
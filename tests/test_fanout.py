@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+from src.benchmark.stubs import StubBrain, StubRuleManager
+from src.daemon import KerneuralDaemon
+from src.utils.fanout import FanoutClient, FanoutServer, FrameDecoder, encode_frame
+
+
+def _collect(messages, kind, limit=50):
+    for message in messages:
+        if message is not None and message.get('type') == kind:
+            return message
+        limit -= 1
+        if limit == 0:
+            return None
+
+
+def test_frames_survive_arbitrary_splits():
+    data = encode_frame({"type": "event", "n": 1}) + encode_frame({"type": "stats", "n": 2})
+    decoder = FrameDecoder()
+    messages = []
+    for i in range(len(data)):
+        messages.extend(decoder.feed(data[i:i + 1]))
+    assert messages == [{"type": "event", "n": 1}, {"type": "stats", "n": 2}]
+
+
+def test_message_published_during_snapshot_is_not_missed(tmp_path):
+    server = None
+
+    def hello():
+        # The engine keeps publishing while the snapshot is being built
+        threading.Thread(target=server.publish, args=({"type": "event", "n": 1},)).start()
+        time.sleep(0.1)
+        return [{"type": "hello"}]
+
+    server = FanoutServer(str(tmp_path / "k.sock"), on_connect=hello)
+    server.start()
+    client = FanoutClient(server.path).connect()
+    try:
+        messages = client.messages(timeout=1.0)
+        assert next(messages) == {"type": "hello"}
+        assert _collect(messages, "event") == {"type": "event", "n": 1}
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_slow_subscriber_never_blocks_publisher(tmp_path):
+    server = FanoutServer(str(tmp_path / "k.sock"), max_queue=10,
+                          on_connect=lambda: [{"type": "hello"}])
+    server.start()
+    client = FanoutClient(server.path).connect()
+    try:
+        deadline = time.monotonic() + 2
+        while server.stats()['subscribers'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # The client does not read: its socket buffer fills, then its queue
+        started = time.perf_counter()
+        payload = "x" * 4096
+        for i in range(2000):
+            server.publish({"type": "event", "i": i, "payload": payload})
+        assert time.perf_counter() - started < 2.0
+        assert server.stats()['dropped'] > 0
+
+        messages = client.messages(timeout=1.0)
+        assert next(messages) == {"type": "hello"}
+        assert _collect(messages, "dropped", limit=5000)['count'] > 0
+    finally:
+        client.close()
+        server.stop()
+    assert not os.path.exists(server.path)
+
+
+def test_daemon_publishes_events_and_decisions(tmp_path):
+    log = tmp_path / "falco_events.json"
+    log.write_text("")
+    daemon = KerneuralDaemon(socket_path=str(tmp_path / "k.sock"), stats_interval=0.1,
+                             brain=StubBrain(latency=0.0), rule_manager=StubRuleManager(),
+                             log_file=str(log), metrics_port=None,
+                             deploy_log=str(tmp_path / "deployments.jsonl"),
+                             archive_dir=str(tmp_path / "archive"))
+    runner = threading.Thread(target=daemon.start, daemon=True)
+    runner.start()
+    try:
+        deadline = time.monotonic() + 5
+        while (daemon.monitor is None or not daemon.monitor.running) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client = FanoutClient(daemon.fanout.path).connect()
+        messages = client.messages(timeout=0.5)
+        assert _collect(messages, "hello")['counters']['total'] == 0
+
+        with open(log, "a") as f:
+            f.write(json.dumps({"rule": "Terminal shell in container", "priority": "Notice",
+                                "output_fields": {"container.name": "victim", "proc.cmdline": "bash"}}) + "\n")
+
+        assert _collect(messages, "event")['alert']['container'] == "victim"
+        assert _collect(messages, "deployed")['rule'] == "Terminal shell in container"
+        deployed = json.loads((tmp_path / "deployments.jsonl").read_text())
+        assert (deployed['rule'], deployed['container']) == ("Terminal shell in container", "victim")
+        assert 'pipeline' in _collect(messages, "stats")
+        client.close()
+    finally:
+        daemon.stop()
+        runner.join(5)
@@ -0,0 +1,54 @@
+import threading
+import time
+import urllib.request
+
+from src.utils.metrics import (REGISTRY, Histogram, MetricsRegistry, MetricsServer, SamplingProfiler,
+                               observe_event_lag)
+
+
+def test_histogram_buckets_and_percentiles():
+    h = Histogram("test_seconds", "test", buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        h.observe(value)
+
+    assert h.count == 5
+    assert h.percentile(50) == 0.1
+    assert h.percentile(95) == 1.0
+    text = h.render()
+    assert 'test_seconds_bucket{le="0.1"} 3' in text
+    assert 'test_seconds_bucket{le="+Inf"} 5' in text
+    assert "test_seconds_count 5" in text
+
+
+def test_event_lag_uses_evt_time():
+    before = REGISTRY.histogram('kerneural_syscall_to_rule_seconds').count
+    event = {"output_fields": {"evt.time": int((time.time() - 2) * 1e9)}}
+    observe_event_lag('kerneural_syscall_to_rule_seconds', event)
+    observe_event_lag('kerneural_syscall_to_rule_seconds', {"output_fields": {}})
+    h = REGISTRY.histogram('kerneural_syscall_to_rule_seconds')
+    assert h.count == before + 1
+    assert h.sum >= 2.0
+
+
+def test_endpoint_serves_metrics_and_profiler():
+    registry = MetricsRegistry()
+    registry.histogram("demo_seconds", "demo").observe(0.2)
+
+    done = threading.Event()
+    worker = threading.Thread(target=lambda: done.wait(2.0))
+    worker.start()
+    server = MetricsServer(port=0, registry=registry, profiler=SamplingProfiler(worker.ident, interval=0.001))
+    assert server.start()
+    try:
+        base = f"http://127.0.0.1:{server.port}"
+        body = urllib.request.urlopen(base + "/metrics").read().decode()
+        assert "demo_seconds_count 1" in body
+        urllib.request.urlopen(base + "/profile/start").read()
+        time.sleep(0.05)
+        report = urllib.request.urlopen(base + "/profile/stop").read().decode()
+        assert "running=False" in report
+        assert server.profiler.total > 0
+    finally:
+        server.stop()
+        done.set()
+        worker.join()
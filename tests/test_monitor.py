@@ -0,0 +1,76 @@
+import json
+import os
+
+from src.blue_agent.monitor import LogMonitor
+
+
+def _line(i):
+    return json.dumps({"rule": f"rule-{i}", "priority": "Warning"}) + "\n"
+
+
+def _next_events(gen, tries=20):
+    for _ in range(tries):
+        batch = next(gen)
+        if batch:
+            return batch
+    return []
+
+
+def test_reads_appended_lines_in_batches(tmp_path):
+    log = tmp_path / "falco_events.json"
+    log.write_text(_line(0))  # existing history is skipped
+
+    monitor = LogMonitor(str(log), batch_size=2)
+    gen = monitor.batches(idle_timeout=0.05)
+    assert next(gen) == []
+
+    with open(log, "a") as f:
+        f.write(_line(1) + _line(2) + _line(3))
+
+    first = _next_events(gen)
+    # The third event is read but not handed out yet: position is not safe to save
+    assert len(first) == 2 and not monitor.drained
+    second = _next_events(gen)
+    assert monitor.drained and monitor.position == os.path.getsize(log)
+    assert [e["rule"] for e in first + second] == ["rule-1", "rule-2", "rule-3"]
+    monitor.stop()
+
+
+def test_partial_line_is_kept_until_complete(tmp_path):
+    log = tmp_path / "falco_events.json"
+    log.write_text("")
+    monitor = LogMonitor(str(log))
+    gen = monitor.batches(idle_timeout=0.05)
+    next(gen)
+
+    data = _line(1)
+    with open(log, "a") as f:
+        f.write(data[:10])
+    assert next(gen) == []
+
+    with open(log, "a") as f:
+        f.write(data[10:])
+    assert [e["rule"] for e in _next_events(gen)] == ["rule-1"]
+    monitor.stop()
+
+
+def test_truncation_and_rotation(tmp_path):
+    log = tmp_path / "falco_events.json"
+    log.write_text("")
+    monitor = LogMonitor(str(log))
+    gen = monitor.batches(idle_timeout=0.05)
+    next(gen)
+
+    with open(log, "a") as f:
+        f.write(_line(1) + _line(2))
+    assert len(_next_events(gen)) == 2
+
+    # Truncate and write a shorter file
+    log.write_text(_line(3))
+    assert [e["rule"] for e in _next_events(gen)] == ["rule-3"]
+
+    # Rotate: rename away and create a new file
+    os.rename(log, tmp_path / "falco_events.json.1")
+    log.write_text(_line(4))
+    assert [e["rule"] for e in _next_events(gen)] == ["rule-4"]
+    monitor.stop()
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from src.blue_agent.pipeline import AnalysisPipeline, StageStats
+
+
+class SlowBrain:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def analyze_log_and_generate_rule(self, log_entry):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls += 1
+        return "- rule: Test\n"
+
+
+class RecordingRuleManager:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.added = 0
+        self.reloads = 0
+
+    def add_rule(self, rule_yaml):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        time.sleep(0.001)
+        self.added += 1
+        self.active -= 1
+        return True
+
+    def reload_falco(self):
+        self.reloads += 1
+
+
+def _wait_idle(pipeline, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if pipeline.idle():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_submit_does_not_wait_for_analysis():
+    brain = SlowBrain(delay=0.05)
+    rules = RecordingRuleManager()
+    pipeline = AnalysisPipeline(brain, rules, workers=4).start()
+
+    events = [{"rule": f"r{i}", "priority": "Warning"} for i in range(20)]
+    events.append({"rule": "debug", "priority": "Debug"})
+
+    start = time.perf_counter()
+    assert pipeline.submit_batch(events) == len(events)
+    assert time.perf_counter() - start < 0.05
+
+    assert _wait_idle(pipeline)
+    pipeline.stop()
+
+    stats = pipeline.stats()
+    assert brain.calls == 20
+    assert rules.added == 20
+    assert rules.max_active == 1
+    assert stats['filter']['dropped'] == 1
+    assert stats['deploy']['processed'] == 20
+
+
+def test_full_ingest_queue_drops_instead_of_blocking():
+    pipeline = AnalysisPipeline(SlowBrain(), RecordingRuleManager(), queue_size=2)
+    # Not started: nothing drains the ingest queue
+    results = [pipeline.submit({"priority": "Warning"}) for _ in range(5)]
+    assert results == [True, True, False, False, False]
+    assert pipeline.stats()['ingest']['dropped'] == 3
+
+
+class BatchBrain(SlowBrain):
+    def __init__(self):
+        super().__init__(delay=0.0)
+        self.batches = []
+
+    def analyze_logs_and_generate_rules(self, log_entries):
+        self.batches.append(len(log_entries))
+        return [None if '"bad"' in entry else "- rule: Test\n" for entry in log_entries]
+
+
+def test_batches_flush_on_count_and_keep_good_rules():
+    brain = BatchBrain()
+    rules = RecordingRuleManager()
+    pipeline = AnalysisPipeline(brain, rules, workers=1, batch_size=4, batch_timeout=0.2).start()
+
+    events = [{"rule": f"r{i}", "priority": "Warning"} for i in range(7)]
+    events.append({"rule": "bad", "priority": "Warning"})
+    pipeline.submit_batch(events)
+
+    assert _wait_idle(pipeline)
+    pipeline.stop()
+    assert sum(brain.batches) == 8
+    assert max(brain.batches) <= 4
+    assert rules.added == 7
+
+
+def test_analyzed_event_carries_its_repeats():
+    from src.blue_agent.scheduler import PriorityScheduler
+
+    pipeline = AnalysisPipeline(SlowBrain(), RecordingRuleManager(),
+                                scheduler=PriorityScheduler(maxsize=10, shed_at=0, sample_every=1))
+    event = {"rule": "r", "priority": "Notice", "output_fields": {"proc.cmdline": "id", "container.name": "c"}}
+    for _ in range(3):
+        pipeline.deduplicator.check(event)
+    assert pipeline.analysis_q.offer(event) == (True, 0)
+    # Same rule and container while the job waits: folded into it
+    other = dict(event, output_fields={"proc.cmdline": "whoami", "container.name": "c"})
+    assert pipeline.analysis_q.offer(other) == (False, 0)
+
+    job = pipeline.analysis_q.get_job(timeout=0)
+    assert job.item is event and pipeline.repeats(job) == 4
+
+
+def test_stage_rate_is_shared_by_every_reader():
+    stats = StageStats('ingest')
+    t0 = stats.started
+    stats.add(100)
+    assert stats.snapshot(now=t0 + 2)['rate'] == pytest.approx(50)
+    # A second reader right after sees the same window, not an empty one
+    assert stats.snapshot(now=t0 + 2.01)['rate'] == pytest.approx(100 / 2.01)
+    stats.add(60)
+    assert stats.snapshot(now=t0 + 8)['rate'] == pytest.approx(60 / 6)
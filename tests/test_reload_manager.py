@@ -0,0 +1,53 @@
+import time
+
+from src.blue_agent.reload_manager import FalcoReloadManager
+
+
+class FakeReloadManager(FalcoReloadManager):
+    def __init__(self, **kwargs):
+        super().__init__(health_check=self._live, **kwargs)
+        self.signals = 0
+        self.since = []
+
+    def _live(self, since):
+        self.since.append(since)
+        return True
+
+    def _signal_reload(self):
+        self.signals += 1
+        return True
+
+
+def _wait(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_burst_is_coalesced_into_one_reload():
+    manager = FakeReloadManager(debounce=0.1, max_delay=1.0).start()
+    for _ in range(10):
+        manager.request_reload()
+    assert _wait(lambda: manager.stats()['reloads'] == 1)
+    manager.stop()
+
+    stats = manager.stats()
+    assert manager.signals == 1
+    assert stats['coalesced_rules'] == 10
+    # Log timestamps are compared with the exact signal time, not its second
+    assert isinstance(manager.since[0], float)
+    assert stats['pending'] == 0
+
+
+def test_max_delay_bounds_a_continuous_stream():
+    manager = FakeReloadManager(debounce=0.2, max_delay=0.3).start()
+    deadline = time.time() + 0.8
+    while time.time() < deadline:
+        manager.request_reload()
+        time.sleep(0.05)
+    assert manager.stats()['reloads'] >= 1
+    manager.stop()
+    assert manager.stats()['pending'] == 0
@@ -0,0 +1,47 @@
+from src.neural_core.rule_cache import RuleCache, cache_key
+
+
+def test_key_depends_on_prompt_and_model():
+    base = cache_key("sig", "prompt v1", "gemini-2.5-flash")
+    assert base == cache_key("sig", "prompt v1", "gemini-2.5-flash")
+    assert base != cache_key("sig", "prompt v2", "gemini-2.5-flash")
+    assert base != cache_key("sig", "prompt v1", "gemini-other")
+
+
+def test_memory_then_disk_hits_survive_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = RuleCache(path, memory_size=2)
+    assert cache.get("k1", now=0) is None
+    cache.put("k1", "- rule: A", now=0)
+    assert cache.get("k1", now=1) == "- rule: A"
+    cache.close()
+
+    restarted = RuleCache(path, memory_size=2)
+    assert restarted.get("k1", now=2) == "- rule: A"
+    assert restarted.get("k1", now=3) == "- rule: A"
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    cache = RuleCache(str(tmp_path / "cache.db"), memory_size=1, max_entries=3, ttl=100)
+    for i in range(5):
+        cache.put(f"k{i}", f"rule {i}", now=i)
+    count = cache.db.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+    assert count == 3
+    assert cache.get("k0", now=10) is None
+
+    # Expired entries are not returned
+    assert cache.get("k4", now=200) is None
+
+
+def test_memory_hits_keep_keys_hot_on_disk(tmp_path):
+    cache = RuleCache(str(tmp_path / "cache.db"), memory_size=4, max_entries=2)
+    cache.put("k0", "rule 0", now=0)
+    cache.put("k1", "rule 1", now=1)
+    # Served from memory only; sqlite must still see k0 as the most recent
+    assert cache.get("k0", now=5) == "rule 0"
+    cache.put("k2", "rule 2", now=6)
+    keys = {row[0] for row in cache.db.execute("SELECT key FROM rules")}
+    assert keys == {"k0", "k2"}
@@ -0,0 +1,75 @@
+from src.blue_agent.rule_evaluator import EventCorpus, RulePreflight, load_definitions
+
+EVENTS = [
+    {"rule": "Terminal shell in container", "priority": "Notice",
+     "output_fields": {"container.id": "ce34", "proc.name": "sh", "proc.cmdline": "sh -c whoami"}},
+    {"rule": "Terminal shell in container", "priority": "Notice",
+     "output_fields": {"container.id": "ce34", "proc.name": "sh", "proc.cmdline": "sh -c id"}},
+    {"rule": "Read sensitive file untrusted", "priority": "Warning",
+     "output_fields": {"evt.type": "openat", "fd.name": "/etc/shadow", "proc.name": "cat",
+                       "proc.cmdline": "cat /etc/shadow", "proc.tty": 34816}},
+]
+
+
+def _rule(condition):
+    return {"rule": "Candidate", "condition": condition}
+
+
+def _preflight():
+    return RulePreflight(EventCorpus(EVENTS), max_match_ratio=0.9)
+
+
+def test_match_counts():
+    preflight = _preflight()
+    report = preflight.check_rule(_rule('spawned_process and proc.name = "sh" and proc.cmdline contains "whoami"'))
+    assert report.ok and report.matches == 1
+
+    report = preflight.check_rule(_rule('evt.type = openat and fd.name in ("/etc/shadow", "/etc/passwd") and not proc.name startswith "sh"'))
+    assert report.matches == 1
+
+    report = preflight.check_rule(_rule('container and proc.name != "cat" and proc.tty > 0'))
+    assert report.matches == 0
+    assert report.matched_nothing
+
+
+def test_bad_syntax_is_an_error_unknown_macro_a_warning():
+    preflight = _preflight()
+    assert preflight.check_rule(_rule('spawned_process and (proc.name = "sh"')).errors
+
+    # Stock macros and operators we cannot evaluate must not block deployment
+    for condition in ('in_container and proc.name = "sh"', 'proc.name = "sh" and fd.name intersects (a, b)'):
+        report = preflight.check_rule(_rule(condition))
+        assert report.ok and not report.checked and not report.matched_nothing
+        assert any("match check skipped" in w for w in report.warnings)
+    report = preflight.check_rule(_rule('evt.dir = < and spawned_process'))
+    assert report.ok and report.checked
+
+
+def test_macros_and_lists_from_rules_files(tmp_path):
+    rules = tmp_path / "falco_rules.yaml"
+    rules.write_text(
+        "- list: shell_binaries\n  items: [bash, zsh]\n"
+        "- list: shell_binaries\n  items: [sh]\n  append: true\n"
+        "- macro: shell_procs\n  condition: proc.name in (shell_binaries)\n"
+        "- list: sensitive_dirs\n  items: [/etc]\n")
+    preflight = RulePreflight(EventCorpus(EVENTS), max_match_ratio=0.9)
+    preflight.macros, preflight.lists = load_definitions([str(rules)])
+
+    report = preflight.check_rule(_rule('spawned_process and shell_procs'))
+    assert report.ok and report.matches == 2
+    report = preflight.check_rule(_rule('fd.name pmatch (sensitive_dirs)'))
+    assert report.ok and report.matches == 1
+
+
+def test_too_broad_rule_is_flagged():
+    preflight = RulePreflight(EventCorpus(EVENTS), max_match_ratio=0.5)
+    report = preflight.check_rule(_rule("proc.name exists"))
+    assert report.matches == 3
+    assert any("false positives" in w for w in report.warnings)
+
+
+def test_contradictory_rule_in_repo_matches_nothing():
+    # spawned_process (execve) and evt.type = openat can never both hold
+    report = RulePreflight.from_file("logs/falco_events.json.backup").check_rule(
+        _rule('spawned_process and evt.type = "openat" and proc.name = "cat"'))
+    assert report.matched_nothing
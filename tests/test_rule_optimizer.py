@@ -0,0 +1,43 @@
+from src.blue_agent.rule_optimizer import optimize_condition
+
+
+def test_cheap_selective_terms_move_first():
+    result = optimize_condition(
+        'proc.cmdline contains "/tmp/" and spawned_process and proc.name = "sh"')
+    assert result.condition == 'spawned_process and proc.name = "sh" and proc.cmdline contains "/tmp/"'
+    assert result.cost < result.original_cost
+    assert result.guard is None
+
+
+def test_missing_guard_is_inferred():
+    result = optimize_condition('proc.name = "cat" and fd.name = "/etc/shadow"')
+    assert result.guard == 'evt.type in ("open", "openat", "openat2")'
+    assert result.condition.startswith('evt.type in ("open", "openat", "openat2") and ')
+
+    result = optimize_condition('proc.cmdline contains "whoami"')
+    assert result.condition == 'spawned_process and proc.cmdline contains "whoami"'
+
+
+def test_network_rule_gets_no_open_guard():
+    result = optimize_condition('proc.name = nc and fd.sport = 4444')
+    assert result.guard is None
+    assert "evt.type" not in result.condition
+    assert any("no evt.type filter" in w for w in result.warnings)
+
+
+def test_unchanged_condition_keeps_its_text():
+    condition = 'spawned_process and proc.name in (shell_binaries)'
+    result = optimize_condition(condition)
+    assert result.condition == condition and not result.changed
+
+    result = optimize_condition('proc.cmdline contains "x" and spawned_process and proc.name in (shell_binaries)')
+    assert result.condition == 'spawned_process and proc.name in (shell_binaries) and proc.cmdline contains "x"'
+
+
+def test_contradiction_and_cost_flags():
+    result = optimize_condition('spawned_process and evt.type = "openat" and proc.name = "cat"')
+    assert any("contradictory" in w for w in result.warnings)
+
+    result = optimize_condition('user.name regex ".*" or user.name icontains "root"', hot_path_limit=5.0)
+    assert any("no evt.type filter" in w for w in result.warnings)
+    assert any("hot path" in w for w in result.warnings)
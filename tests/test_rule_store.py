@@ -0,0 +1,67 @@
+import shutil
+
+import yaml
+
+from src.blue_agent.condition import format_condition, parse_condition
+from src.blue_agent.rule_manager import RuleManager
+from src.blue_agent.rule_store import RuleStore
+
+
+def _rule(name, condition, priority="WARNING"):
+    return {
+        "rule": name,
+        "desc": "test",
+        "condition": condition,
+        "output": "cmd=%proc.cmdline",
+        "priority": priority,
+    }
+
+
+def test_condition_round_trip():
+    text = 'spawned_process and (proc.cmdline contains "/tmp/" or proc.args contains "/tmp/") and not proc.name in (sh, "bash")'
+    formatted = format_condition(parse_condition(text))
+    assert formatted == 'spawned_process and (proc.cmdline contains "/tmp/" or proc.args contains "/tmp/") and not proc.name in (sh, "bash")'
+    assert format_condition(parse_condition(formatted)) == formatted
+
+
+def test_bare_operands_keep_their_meaning():
+    # shell_binaries is a list reference, `<` an event direction: neither may become a string
+    text = 'evt.dir = < and proc.name in (shell_binaries) and fd.name pmatch (sensitive_dirs) and evt.type = openat'
+    assert format_condition(parse_condition(text)) == text
+    assert format_condition(parse_condition(text), canonical=True) == (
+        'evt.dir = "<" and proc.name in ("shell_binaries") and fd.name pmatch ("sensitive_dirs") and evt.type = "openat"')
+
+
+def test_duplicates_rejected_and_siblings_merged(tmp_path):
+    path = tmp_path / "rules.yaml"
+    store = RuleStore(str(path))
+    assert store.add(_rule("Whoami", 'spawned_process and proc.name = "whoami"')) == "added"
+    # Same condition, different spacing / name
+    assert store.add(_rule("Whoami 2", "spawned_process and proc.name=whoami")) == "duplicate"
+    # Sibling: differs only in the proc.name constant
+    assert store.add(_rule("Id", 'spawned_process and proc.name = "id"')) == "merged"
+    assert store.add(_rule("Uname", 'spawned_process and proc.name in ("uname", "id")')) == "merged"
+    # Different priority is not merged
+    assert store.add(_rule("Hostname", 'spawned_process and proc.name = "hostname"', "NOTICE")) == "added"
+    store.save()
+
+    rules = yaml.safe_load(path.read_text())
+    assert [r["rule"] for r in rules] == ["Whoami", "Hostname"]
+    assert rules[0]["condition"] == 'spawned_process and proc.name in ("whoami", "id", "uname")'
+    assert store.rules_matching("proc.name", "uname") == {"Whoami"}
+    assert not list(tmp_path.glob(".rules-*"))
+
+
+def test_rule_manager_writes_through_store(tmp_path):
+    path = tmp_path / "falco_rules.local.yaml"
+    shutil.copy("configs/falco_rules.local.yaml", path)
+    manager = RuleManager(rule_file=str(path))
+
+    rule_yaml = yaml.safe_dump([_rule("Cat Passwd", 'spawned_process and proc.name = "cat" and fd.name = "/etc/passwd"')])
+    assert manager.add_rule(rule_yaml) is True
+    assert manager.add_rule(rule_yaml) is False
+    assert manager.add_rule("- rule: broken\n") is False
+
+    text = path.read_text()
+    assert text.count("- rule:") == 6
+    assert "Cat Passwd" in text
@@ -0,0 +1,106 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from src.blue_agent.pipeline import AnalysisPipeline
+from src.blue_agent.scheduler import PriorityScheduler
+
+
+def _event(priority, rule="r", container="victim"):
+    return {'priority': priority, 'rule': rule, 'output_fields': {'container.name': container}}
+
+
+def test_weighted_fair_order_and_aging():
+    s = PriorityScheduler(maxsize=100, weights={'Critical': 3, 'Notice': 1}, aging=0)
+    for i in range(6):
+        s.offer(_event('Notice', f"n{i}"), now=0)
+    for i in range(6):
+        s.offer(_event('Critical', f"c{i}"), now=0)
+    order = [s.get_job(now=0).item['priority'][0] for _ in range(8)]
+    assert order == list("CCNCCCNC")
+
+    s = PriorityScheduler(maxsize=100, aging=5.0)
+    s.offer(_event('Notice', "old"), now=0)
+    for i in range(6):
+        s.offer(_event('Critical', f"c{i}"), now=0)
+    # Notice -> Warning -> Error, but never above the protected level
+    assert s.get_job(now=5).item['rule'] == "c0"
+    assert [job.level for job in s.queues[4]] == [4]
+    # As an Error job it gets 8 of every 24 picks against Critical
+    assert [s.get_job(now=t).item["rule"] for t in (10, 15, 20)] == ["c1", "old", "c2"]
+    assert s.promoted == 2
+    assert s.stats()['dispatched'] == {'Critical': 3, 'Notice': 1}
+    with pytest.raises(queue.Empty):
+        PriorityScheduler().get(timeout=0.01)
+
+
+def test_low_priority_is_shed_under_pressure():
+    s = PriorityScheduler(maxsize=10, shed_at=0.5, sample_every=4)
+    assert all(s.offer(_event('Notice', f"n{i}"), now=0)[0] for i in range(5))
+    # Above shed_at: same rule+container folds into the queued job, others are sampled
+    assert s.offer(_event('Notice', "n1"), now=0) == (False, 0)
+    assert s.queues[5][1].merged == 1
+    admitted = sum(s.offer(_event('Notice', f"x{i}"), now=0)[0] for i in range(8))
+    assert admitted == 2 and s.shed['sampled'] == 6
+
+    # Protected priorities are never sampled; at capacity they evict low priority work
+    for i in range(6):
+        s.offer(_event('Critical', f"c{i}"), now=0)
+    assert s.qsize() == 10 and s.shed['evicted'] == 3
+    assert s.stats()['levels'] == {'Critical': 6, 'Notice': 4}
+    for i in range(6):
+        s.offer(_event('Critical', f"d{i}"), now=0)
+    assert s.stats()['levels'] == {'Critical': 10}
+    assert s.offer(_event('Critical', "full"), now=0) == (False, 0)
+    assert s.shed['dropped'] == 3
+
+
+def test_protected_jobs_are_never_evicted():
+    s = PriorityScheduler(maxsize=2, protect='Error')
+    s.offer(_event('Error', "e0"), now=0)
+    s.offer(_event('Error', "e1"), now=0)
+    # Error is protected: a Critical arrival is dropped rather than evict it
+    assert s.offer(_event('Critical', "c0"), now=0) == (False, 0)
+    assert s.stats()['levels'] == {'Error': 2}
+    assert s.shed['evicted'] == 0 and s.shed['dropped'] == 1
+
+
+def test_summarized_alerts_are_reported_with_their_job():
+    s = PriorityScheduler(maxsize=10, shed_at=0, sample_every=1)
+    s.offer(_event('Notice', "n"), now=0)
+    s.offer(_event('Notice', "n"), now=0)
+    s.offer(_event('Notice', "n"), now=0)
+    assert s.get_job(now=0).merged == 2
+    assert s.stats()['merged_dispatched'] == 2
+
+
+class TimedBrain:
+    def __init__(self, delay):
+        self.delay = delay
+        self.done = {}
+
+    def analyze_log_and_generate_rule(self, log_entry):
+        time.sleep(self.delay)
+        if '"Critical"' in log_entry:
+            self.done['critical'] = time.perf_counter()
+        return None
+
+
+def test_critical_alert_skips_notice_storm():
+    brain = TimedBrain(delay=0.01)
+    pipeline = AnalysisPipeline(brain, None, workers=2, dedup_window=0).start()
+    try:
+        pipeline.submit_batch([_event('Notice', f"storm-{i}") for i in range(300)])
+        time.sleep(0.05)
+        submitted = time.perf_counter()
+        pipeline.submit(_event('Critical', "Read sensitive file"))
+        deadline = time.time() + 5
+        while 'critical' not in brain.done and time.time() < deadline:
+            time.sleep(0.005)
+        # FIFO would need ~300 x 10ms / 2 workers = 1.5s
+        assert brain.done['critical'] - submitted < 0.3
+        assert pipeline.stats()['scheduler']['dispatched']['Critical'] == 1
+    finally:
+        pipeline.stop()
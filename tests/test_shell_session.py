@@ -0,0 +1,150 @@
+import json
+import socket
+import socketserver
+import struct
+import subprocess
+import threading
+import time
+
+import pytest
+
+from src.red_agent.session import TIMEOUT_EXIT_CODE, ShellSession
+from src.utils.docker_client import DockerClient
+
+
+class FakeDocker(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Exec create + attached start, backed by a local `sh` per exec."""
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.execs = 0
+        super().__init__(path, AttachHandler)
+
+
+class AttachHandler(socketserver.StreamRequestHandler):
+    def _read_request(self):
+        head = b""
+        while b"\r\n\r\n" not in head:
+            chunk = self.request.recv(1)
+            if not chunk:
+                return None, None
+            head += chunk
+        lines = head.decode().split("\r\n")
+        path = lines[0].split(" ")[1]
+        length = next((int(l.split(":")[1]) for l in lines if l.lower().startswith("content-length")), 0)
+        body = b""
+        while len(body) < length:
+            body += self.request.recv(length - len(body))
+        return path, body
+
+    def handle(self):
+        while True:
+            path, body = self._read_request()
+            if path is None:
+                return
+            if path == "/v1.41/containers/victim/exec":
+                assert json.loads(body)["AttachStdin"] is True
+                self.server.execs += 1
+                data = json.dumps({"Id": f"e{self.server.execs}"}).encode()
+                self.request.sendall(b"HTTP/1.1 201 Created\r\nContent-Type: application/json\r\n"
+                                     b"Content-Length: %d\r\n\r\n" % len(data) + data)
+            else:
+                self.request.sendall(b"HTTP/1.1 101 UPGRADED\r\nConnection: Upgrade\r\nUpgrade: tcp\r\n\r\n")
+                self._bridge()
+                return
+
+    def _bridge(self):
+        # runc setsid()s every exec: the shell leads its own process group
+        proc = subprocess.Popen(["sh"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                start_new_session=True)
+        lock = threading.Lock()
+
+        def pump(pipe, stream):
+            try:
+                for chunk in iter(lambda: pipe.read1(4096), b""):
+                    with lock:
+                        self.request.sendall(struct.pack(">BxxxI", stream, len(chunk)) + chunk)
+            except OSError:
+                pass
+
+        pumps = [threading.Thread(target=pump, args=(proc.stdout, 1), daemon=True),
+                 threading.Thread(target=pump, args=(proc.stderr, 2), daemon=True)]
+        for t in pumps:
+            t.start()
+
+        def hang_up():
+            # Like dockerd: the stream ends when the process exits
+            for t in pumps:
+                t.join()
+            try:
+                self.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        threading.Thread(target=hang_up, daemon=True).start()
+        try:
+            for chunk in iter(lambda: self.request.recv(4096), b""):
+                proc.stdin.write(chunk)
+                proc.stdin.flush()
+        except OSError:
+            pass
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+@pytest.fixture
+def docker(tmp_path):
+    server = FakeDocker(str(tmp_path / "docker.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = DockerClient(socket_path=server.server_address)
+    yield server, client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_commands_share_one_shell_and_split_output(docker):
+    server, client = docker
+    with ShellSession("victim", client=client, timeout=5) as session:
+        result = session.run("echo out; echo err >&2; false")
+        assert (result.exit_code, result.stdout, result.stderr) == (1, "out\n", "err\n")
+
+        # cwd and env carry over, output without a trailing newline is kept intact
+        session.run("cd /tmp && export KN_STEP=2")
+        result = session.run("printf '%s:%s' \"$PWD\" \"$KN_STEP\"")
+        assert (result.exit_code, result.stdout, result.stderr) == (0, "/tmp:2", "")
+
+        assert session.run("exit 7").exit_code == -1
+        assert session.run("echo back").stdout == "back\n"
+
+    assert server.execs == 2
+    assert session.starts == 2
+
+
+def test_hung_command_times_out_and_restarts_session(docker):
+    server, client = docker
+    with ShellSession("victim", client=client, timeout=5) as session:
+        session.run("export KN_STATE=old")
+        result = session.run("echo partial; sleep 30", timeout=0.5)
+        assert result.exit_code == TIMEOUT_EXIT_CODE
+        assert result.stdout == "partial\n"
+        assert "timed out" in result.stderr
+
+        result = session.run("echo \"state=$KN_STATE\"")
+        assert (result.exit_code, result.stdout) == (0, "state=\n")
+    assert session.timeouts == 1 and session.starts == 2
+
+
+def test_hung_command_is_killed_on_timeout(docker, tmp_path):
+    server, client = docker
+    marker = tmp_path / "still-running"
+    with ShellSession("victim", client=client, timeout=5) as session:
+        hung = session.pid
+        assert hung is not None
+        result = session.run(f"sleep 1; touch {marker}", timeout=0.3)
+        assert result.exit_code == TIMEOUT_EXIT_CODE
+        assert session.pid not in (None, hung)
+    time.sleep(1.5)
+    assert not marker.exists()
@@ -0,0 +1,96 @@
+import json
+
+import yaml
+
+from src.blue_agent.rule_evaluator import EventCorpus, RulePreflight
+from src.blue_agent.rule_manager import RuleManager
+from src.neural_core.encoder import PromptEncoder
+from src.neural_core.gemini_client import NeuralBrain
+from src.neural_core.templates import RuleSynthesizer, coverage
+
+EVENTS = {
+    'sensitive_file': {"rule": "Read sensitive file untrusted", "tags": ["mitre_credential_access"],
+                       "output_fields": {"evt.type": "openat", "fd.name": "/etc/shadow", "proc.name": "cat",
+                                         "proc.cmdline": "cat /etc/shadow", "container.id": "ce34"}},
+    'tmp_script': {"rule": "Terminal shell in container", "tags": ["container", "shell"],
+                   "output_fields": {"proc.name": "sh", "container.id": "ce34",
+                                     "proc.cmdline": "sh -c echo 'ping -c 4 8.8.8.8' >> /tmp/art.sh"}},
+    'recon_command': {"rule": "Detect Reconnaissance Commands (whoami)", "tags": ["mitre_discovery"],
+                      "output_fields": {"proc.cmdline": "whoami", "container.name": "victim"}},
+    'shell': {"rule": "Terminal shell in container", "tags": ["container", "shell"],
+              "output_fields": {"proc.name": "bash", "proc.cmdline": "bash", "proc.pname": "runc",
+                                "container.id": "ce34"}},
+}
+NETWORK = {"rule": "Outbound connection", "output_fields": {"proc.name": "curl", "fd.rip": "10.0.0.1"}}
+
+
+def _manager():
+    # Validation does not need a rules file
+    return RuleManager.__new__(RuleManager)
+
+
+def test_each_family_is_valid_and_matches_its_event():
+    synthesizer = RuleSynthesizer()
+    for family, event in EVENTS.items():
+        name, rule = synthesizer.match(event)
+        assert name == family
+        rule_yaml = synthesizer.synthesize(json.dumps(event))
+        assert _manager().validate_rule(rule_yaml)
+        assert RulePreflight(EventCorpus([event])).check_rule(yaml.safe_load(rule_yaml)[0]).matches == 1
+
+    assert synthesizer.synthesize(json.dumps(NETWORK)) is None
+    assert synthesizer.synthesize("not json") is None
+    stats = synthesizer.stats()
+    assert stats['hits'] == 4 and stats['misses'] == 2
+    assert stats['by_template'] == {name: 1 for name in EVENTS}
+
+
+def test_rule_names_and_conditions():
+    synthesizer = RuleSynthesizer()
+    _, rule = synthesizer.match(EVENTS['sensitive_file'])
+    assert rule['condition'] == 'open_read and container and fd.name = "/etc/shadow" and proc.name = "cat"'
+    _, rule = synthesizer.match(EVENTS['tmp_script'])
+    assert rule['condition'].endswith('proc.cmdline contains "/tmp/art.sh"')
+    _, rule = synthesizer.match(EVENTS['recon_command'])
+    assert rule['condition'] == 'spawned_process and container.name = "victim" and proc.cmdline = "whoami"'
+    _, rule = synthesizer.match(EVENTS['shell'])
+    assert rule['condition'].endswith('proc.pname = "runc"')
+
+
+def test_recorded_corpus_is_mostly_covered():
+    stats = coverage("logs/falco_events.json.backup")
+    assert stats['hit_ratio'] > 0.9
+
+
+class _Response:
+    text = "- rule: From LLM\n  desc: d\n  condition: spawned_process\n  output: x\n  priority: WARNING"
+
+
+class _Model:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        return _Response()
+
+
+def test_brain_only_calls_llm_for_uncovered_events():
+    brain = NeuralBrain.__new__(NeuralBrain)
+    brain.model_name = "test"
+    brain.model = _Model()
+    brain.cache = None
+    brain.synthesizer = RuleSynthesizer()
+    brain.encoder = PromptEncoder()
+
+    assert "Sensitive file /etc/shadow" in brain.analyze_log_and_generate_rule(json.dumps(EVENTS['sensitive_file']))
+    assert brain.model.calls == 0
+    assert "From LLM" in brain.analyze_log_and_generate_rule(json.dumps(NETWORK))
+    assert brain.model.calls == 1
+
+    rules = brain.analyze_logs_and_generate_rules([json.dumps(e) for e in EVENTS.values()] + [json.dumps(NETWORK)])
+    assert all(rules) and brain.model.calls == 2
+
+    stats = brain.synthesizer.stats()
+    assert stats['hits'] == 5 and stats['misses'] == 2
+    assert stats['avg_llm_seconds'] > 0 and stats['saved_seconds'] >= 0